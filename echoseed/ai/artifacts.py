@@ -0,0 +1,194 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from echoseed.profiling import span
+
+logger = logging.getLogger("echoseed.artifacts")
+
+base_dir = Path(__file__).resolve().parents[2]
+package_dir = base_dir / "echoseed"
+
+ARTIFACT_PATHS = {
+    "scaler": package_dir / "model" / "clustering" / "scaler.joblib",
+    "model": package_dir / "model" / "clustering" / "kmeans_model.joblib",
+    "mood_map": base_dir / "cluster_mood_map.json",
+    "dataset": package_dir / "data" / "processed" / "clustered_tracks.csv",
+    "mood_cache": base_dir / "mood_cache.json",
+    "mood_pools": package_dir / "data" / "processed" / "mood_pools.npz",
+    "feature_store": package_dir / "data" / "features",
+    "shard_cache": package_dir / "data" / "processed" / "shards",
+    "artist_graph": package_dir / "data" / "artist_graph.npz",
+}
+MANIFEST_FILE = package_dir / "data" / "artifacts_manifest.json"
+
+# Artifacts that must always be published together; the mood cache is a side store.
+VERSIONED = ("scaler", "model", "mood_map", "dataset", "mood_pools")
+
+
+def _load_json(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+def _load_joblib(path):
+    from joblib import load
+    return load(path)
+
+def _load_csv(path):
+    import pandas as pd
+    return pd.read_csv(path)
+
+def _load_text(path):
+    with open(path, "r") as f:
+        return f.read()
+
+def _load_npz(path):
+    import numpy as np
+    with np.load(path, allow_pickle=False) as arrays:
+        return dict(arrays)
+
+def _load_artist_graph(path):
+    from echoseed.ai.artist_graph import ArtistGraph
+    return ArtistGraph.load(path)
+
+LOADERS = {
+    "json": _load_json, "joblib": _load_joblib, "csv": _load_csv, "text": _load_text, "npz": _load_npz,
+    "artist_graph": _load_artist_graph
+}
+ARTIFACT_KINDS = {
+    "scaler": "joblib", "model": "joblib", "mood_map": "json", "dataset": "csv", "mood_cache": "json",
+    "mood_pools": "npz", "artist_graph": "artist_graph"
+}
+
+
+class ArtifactIntegrityError(ValueError):
+    """An artifact's content no longer matches the hash published for it."""
+
+
+def file_hash(path, chunk_size=1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactRegistry:
+    """Single place that resolves, versions and caches the AI subsystem's artifacts.
+
+    Loaded objects are shared by every consumer in the process, so treat them as read-only.
+    """
+
+    def __init__(self, root=None, manifest_path=None):
+        root = root or os.getenv("ECHOSEED_ARTIFACT_DIR")
+        if root:
+            root = Path(root)
+            self.paths = {name: root / path.name for name, path in ARTIFACT_PATHS.items()}
+            self.manifest_path = Path(manifest_path) if manifest_path else root / MANIFEST_FILE.name
+        else:
+            self.paths = dict(ARTIFACT_PATHS)
+            self.manifest_path = Path(manifest_path) if manifest_path else MANIFEST_FILE
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def path(self, name) -> Path:
+        return self.paths[name]
+
+    def read(self, path, kind="json"):
+        """Load a file once and reuse it until it changes on disk.
+
+        Files listed in the manifest are checked against their published sha256 before being cached.
+        """
+        path = Path(path)
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._cache.get(path)
+            if cached and cached[0] == signature:
+                return cached[1]
+
+        logger.info("[ArtifactRegistry] Loading %s", path)
+        expected = self._published_hash(path)
+        with span(f"ArtifactRegistry.read:{path.name}"):
+            if expected is not None and file_hash(path) != expected:
+                raise ArtifactIntegrityError(f"{path} does not match the sha256 published in {self.manifest_path}")
+            value = LOADERS[kind](path)
+        with self._lock:
+            self._cache[path] = (signature, value)
+        return value
+
+    def load(self, name):
+        return self.read(self.paths[name], ARTIFACT_KINDS[name])
+
+    def invalidate(self, name=None):
+        with self._lock:
+            if name is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(self.paths[name], None)
+
+    def _published_hash(self, path):
+        names = [name for name, artifact_path in self.paths.items() if artifact_path == path]
+        artifacts = self.manifest()["artifacts"]
+        return next((artifacts[name]["sha256"] for name in names if name in artifacts), None)
+
+    def manifest(self) -> dict:
+        if not os.path.exists(self.manifest_path):
+            return {"version": 0, "artifacts": {}}
+        return _load_json(self.manifest_path)
+
+    def _write_manifest(self, manifest):
+        os.makedirs(self.manifest_path.parent, exist_ok=True)
+        tmp_path = self.manifest_path.with_name(self.manifest_path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def publish(self, names=VERSIONED) -> dict:
+        """Record content hashes of the current artifacts as a new version."""
+        previous = self.manifest()
+        artifacts = {}
+        for name in names:
+            path = self.paths[name]
+            if os.path.exists(path):
+                artifacts[name] = {"path": str(path), "sha256": file_hash(path)}
+            else:
+                logger.warning("[ArtifactRegistry] %s missing at %s; not versioned", name, path)
+
+        manifest = {"version": previous["version"] + 1, "created_at": time.time(), "artifacts": artifacts}
+        self._write_manifest(manifest)
+        self.invalidate()
+        logger.info("[ArtifactRegistry] Published artifact version %d", manifest["version"])
+        return manifest
+
+    def unpublish(self, names):
+        """Drop the published hashes of artifacts that were rewritten outside publish(); keeps the version."""
+        manifest = self.manifest()
+        if not any(name in manifest["artifacts"] for name in names):
+            return
+        for name in names:
+            manifest["artifacts"].pop(name, None)
+        self._write_manifest(manifest)
+        self.invalidate()
+
+    def verify(self) -> dict:
+        """Compare files on disk with the published hashes. Returns name -> matches."""
+        result = {}
+        for name, entry in self.manifest()["artifacts"].items():
+            path = self.paths[name]
+            result[name] = os.path.exists(path) and file_hash(path) == entry["sha256"]
+        return result
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_registry() -> ArtifactRegistry:
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ArtifactRegistry()
+        return _registry
@@ -0,0 +1,193 @@
+import logging
+import os
+import threading
+import numpy as np
+import scipy.sparse as sp
+from echoseed.ai.artifacts import get_registry
+
+logger = logging.getLogger("echoseed.artist_graph")
+
+
+class ArtistGraph:
+    """Sparse artist x artist co-occurrence counts built from playlist memberships.
+
+    Entry (a, b) counts the playlists containing both artists; the diagonal counts the
+    playlists each artist appears in. Each playlist's artist set is kept so that a changed
+    playlist can be swapped out with a single sparse add.
+    """
+
+    def __init__(self):
+        self.names = []
+        self.index = {}
+        self.matrix = sp.csr_matrix((0, 0), dtype=np.float32)
+        self.playlists = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.names)
+
+    def _ids(self, artists, add=False) -> np.ndarray:
+        ids = []
+        for name in artists:
+            if name not in self.index:
+                if not add:
+                    continue
+                self.index[name] = len(self.names)
+                self.names.append(name)
+            ids.append(self.index[name])
+        return np.unique(np.asarray(ids, dtype=np.int64))
+
+    def _gram(self, rows, size):
+        """Co-occurrence counts contributed by a list of artist-id rows (incidence^T @ incidence)."""
+        offsets = np.cumsum([0] + [len(row) for row in rows])
+        incidence = sp.csr_matrix(
+            (np.ones(offsets[-1], dtype=np.float32), np.concatenate(rows), offsets), shape=(len(rows), size)
+        )
+        return incidence.T @ incidence
+
+    def _apply(self, added, removed):
+        size = len(self.names)
+        if self.matrix.shape[0] < size:
+            self.matrix.resize((size, size))
+        delta = self._gram(added, size) if added else sp.csr_matrix((size, size), dtype=np.float32)
+        if removed:
+            delta = delta - self._gram(removed, size)
+        self.matrix = (self.matrix + delta).tocsr()
+        self.matrix.eliminate_zeros()
+
+    def update_playlists(self, playlists) -> int:
+        """Add or replace (playlist_id, artists, snapshot_id) entries with one sparse add for the batch.
+
+        Playlists whose snapshot_id is unchanged are skipped. Returns how many were applied.
+        """
+        with self._lock:
+            added = []
+            removed = []
+            for playlist_id, artists, snapshot_id in playlists:
+                previous = self.playlists.get(playlist_id)
+                if previous is not None and snapshot_id is not None and previous[0] == snapshot_id:
+                    continue
+                if previous is not None:
+                    removed.append(previous[1])
+                ids = self._ids(artists, add=True)
+                added.append(ids)
+                self.playlists[playlist_id] = (snapshot_id, ids)
+            if added:
+                self._apply(added, removed)
+            return len(added)
+
+    def update_playlist(self, playlist_id, artists, snapshot_id=None) -> bool:
+        return self.update_playlists([(playlist_id, artists, snapshot_id)]) == 1
+
+    def remove_playlists(self, playlist_ids):
+        with self._lock:
+            removed = [self.playlists.pop(playlist_id)[1] for playlist_id in playlist_ids
+                       if playlist_id in self.playlists]
+            if removed:
+                self._apply([], removed)
+
+    def degrees(self) -> np.ndarray:
+        """Number of playlists each artist appears in."""
+        return self.matrix.diagonal()
+
+    def _relatedness(self, seed_ids) -> np.ndarray:
+        """Summed cosine-normalized co-occurrence with the seeds, so popular artists do not dominate."""
+        degrees = self.degrees()
+        scale = np.zeros_like(degrees)
+        np.divide(1.0, np.sqrt(degrees), out=scale, where=degrees > 0)
+        rows = self.matrix[seed_ids]
+        scores = np.asarray(rows.multiply(scale[seed_ids][:, None]).sum(axis=0)).ravel()
+        return scores * scale
+
+    def neighbours(self, seeds, k=20) -> list:
+        """Up to k (artist, score) pairs most associated with the seed artists, seeds excluded."""
+        seed_ids = self._ids(seeds)
+        if not len(seed_ids):
+            return []
+        scores = self._relatedness(seed_ids)
+        scores[seed_ids] = 0.0
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(self.names[i], float(scores[i])) for i in candidates]
+
+    def expand(self, seeds, k=20) -> list:
+        seeds = list(dict.fromkeys(seeds))
+        return seeds + [name for name, _ in self.neighbours(seeds, k)]
+
+    def rank(self, artists, seeds=None) -> list:
+        """Order artists by relatedness to seeds, or by how many playlists they appear in; unknown artists last."""
+        artists = list(dict.fromkeys(artists))
+        if not len(self):
+            return artists
+        seed_ids = self._ids(seeds) if seeds else np.empty(0, dtype=np.int64)
+        scores = self._relatedness(seed_ids) if len(seed_ids) else self.degrees()
+        keyed = [(-scores[self.index[name]] if name in self.index else np.inf, name) for name in artists]
+        order = sorted(range(len(artists)), key=lambda i: keyed[i][0])
+        return [artists[i] for i in order]
+
+    def sync(self, playlist_service) -> int:
+        """Bring the graph up to date with the user's playlists; only changed playlists are re-read."""
+        seen = set()
+        changed = []
+        for playlist in playlist_service.iter_user_playlists():
+            seen.add(playlist.id)
+            previous = self.playlists.get(playlist.id)
+            if previous is not None and playlist.snapshot_id and previous[0] == playlist.snapshot_id:
+                continue
+            artists = {
+                artist["name"]
+                for track in playlist_service.iter_playlist_items(playlist.id)
+                for artist in track.get("artists") or []
+                if artist.get("name")
+            }
+            changed.append((playlist.id, artists, playlist.snapshot_id))
+
+        updated = self.update_playlists(changed)
+        self.remove_playlists(set(self.playlists) - seen)
+        logger.info("[ArtistGraph] %d playlists updated, %d artists", updated, len(self))
+        return updated
+
+    def save(self, path=None):
+        path = str(path or get_registry().path("artist_graph"))
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._lock:
+            matrix = self.matrix.tocsr()
+            playlist_ids = list(self.playlists)
+            members = [self.playlists[playlist_id][1] for playlist_id in playlist_ids]
+            arrays = {
+                "names": np.asarray(self.names, dtype=str),
+                "data": matrix.data,
+                "indices": matrix.indices,
+                "indptr": matrix.indptr,
+                "playlist_ids": np.asarray(playlist_ids, dtype=str),
+                "snapshots": np.asarray([self.playlists[p][0] or "" for p in playlist_ids], dtype=str),
+                "members": np.concatenate(members) if members else np.empty(0, dtype=np.int64),
+                "offsets": np.cumsum([0] + [len(m) for m in members]),
+            }
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=None) -> "ArtistGraph":
+        path = path or get_registry().path("artist_graph")
+        graph = cls()
+        with np.load(path, allow_pickle=False) as arrays:
+            graph.names = arrays["names"].tolist()
+            graph.index = {name: i for i, name in enumerate(graph.names)}
+            size = len(graph.names)
+            graph.matrix = sp.csr_matrix((arrays["data"], arrays["indices"], arrays["indptr"]), shape=(size, size))
+            offsets = arrays["offsets"]
+            for i, (playlist_id, snapshot) in enumerate(zip(arrays["playlist_ids"], arrays["snapshots"])):
+                members = arrays["members"][offsets[i]:offsets[i + 1]].astype(np.int64)
+                graph.playlists[str(playlist_id)] = (str(snapshot) or None, members)
+        return graph
+
+    @classmethod
+    def load_or_create(cls, path=None) -> "ArtistGraph":
+        try:
+            return cls.load(path)
+        except FileNotFoundError:
+            return cls()
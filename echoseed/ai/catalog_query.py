@@ -0,0 +1,211 @@
+import logging
+import re
+import numpy as np
+from echoseed.ai.artifacts import get_registry
+from echoseed.ai.preprocessing.normalize_features import FEATURES, ID_COLUMN
+
+logger = logging.getLogger("echoseed.catalog_query")
+
+# Features whose predicates and targets are written in their original units (BPM) rather than the
+# catalog's normalized 1-10 scale; they are converted through the fitted scaler when one exists.
+RAW_UNITS = ("tempo",)
+
+_OPERATOR = re.compile(r"^(\w+)\s*(>=|<=|>|<|=)\s*(-?[\d.]+)$")
+_RANGE = re.compile(r"^(\w+)\s+(-?[\d.]+)\s*(?:-|–|—|to|\.\.)\s*(-?[\d.]+)$")
+_VALUE = re.compile(r"^(\w+)\s*[\s=:]\s*(.+)$")
+_TARGET = re.compile(r"(\w+)\s*[\s=:]\s*(-?[\d.]+)")
+
+
+def parse_query(text: str) -> dict:
+    """Turn "energy > 7, tempo 120-130, mood chill, near valence 8, limit 30" into query() arguments.
+
+    Clauses are separated by commas or semicolons. Bare "feature value" clauses are exact matches, and
+    near targets are written "feature value" or "feature=value". Raises ValueError for anything else.
+    """
+    where = {}
+    near = {}
+    query = {}
+    for clause in re.split(r"[,;]", text):
+        clause = clause.strip()
+        if not clause:
+            continue
+        if clause.lower().startswith("near "):
+            targets = clause[5:]
+            pairs = _TARGET.findall(targets)
+            if not pairs or _TARGET.sub("", targets).strip():
+                raise ValueError(f"Cannot parse near targets '{targets.strip()}'")
+            for feature, value in pairs:
+                near[_feature(feature)] = float(value)
+            continue
+
+        match = _OPERATOR.match(clause)
+        if match:
+            feature, operator, value = _feature(match.group(1)), match.group(2), float(match.group(3))
+            low, high = where.get(feature, (None, None))
+            if operator in (">", ">="):
+                low = np.nextafter(value, np.inf) if operator == ">" else value
+            elif operator in ("<", "<="):
+                high = np.nextafter(value, -np.inf) if operator == "<" else value
+            else:
+                low = high = value
+            where[feature] = (low, high)
+            continue
+        match = _RANGE.match(clause)
+        if match:
+            low, high = sorted((float(match.group(2)), float(match.group(3))))
+            where[_feature(match.group(1))] = (low, high)
+            continue
+
+        match = _VALUE.match(clause)
+        if not match:
+            raise ValueError(f"Cannot parse query clause '{clause}'")
+        key, value = match.group(1).lower(), match.group(2).strip()
+        if key == "mood":
+            query["mood"] = value
+        elif key in ("cluster", "clusters"):
+            query["clusters"] = [int(cluster) for cluster in re.split(r"[\s|/]+", value)]
+        elif key == "limit":
+            query["limit"] = int(value)
+        else:
+            where[_feature(key)] = (float(value), float(value))
+
+    if where:
+        query["where"] = where
+    if near:
+        query["near"] = near
+    return query
+
+def _feature(name) -> str:
+    name = name.strip().lower()
+    if name not in FEATURES:
+        raise ValueError(f"Unknown feature '{name}'; expected one of {FEATURES}")
+    return name
+
+
+class CatalogIndex:
+    """Read-only index over the clustered catalog for range, cluster/mood and nearest-target queries.
+
+    Each feature column is kept sorted alongside its row order, so a range predicate is two binary
+    searches. Row lists per cluster play the same role for cluster and mood filters. A query starts
+    from its most selective filter and checks the remaining predicates on those rows only.
+    """
+
+    def __init__(self, ids, features, clusters, mood_map=None, scaler=None):
+        self.ids = np.asarray(ids).astype(str)
+        self.features = np.asarray(features, dtype=np.float64)
+        self.clusters = np.asarray(clusters, dtype=np.int64)
+        self.mood_map = {int(cluster): mood for cluster, mood in (mood_map or {}).items()}
+        self.scaler = scaler
+
+        self.order = np.argsort(self.features, axis=0, kind="stable")
+        self.sorted = np.take_along_axis(self.features, self.order, axis=0)
+        by_cluster = np.argsort(self.clusters, kind="stable")
+        labels, starts = np.unique(self.clusters[by_cluster], return_index=True)
+        bounds = np.append(starts, len(by_cluster))
+        self.cluster_rows = {int(label): by_cluster[bounds[i]:bounds[i + 1]] for i, label in enumerate(labels)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_frame(cls, df, mood_map=None, scaler=None) -> "CatalogIndex":
+        return cls(df[ID_COLUMN].to_numpy(), df[FEATURES].to_numpy(), df["cluster"].to_numpy(), mood_map, scaler)
+
+    def to_scaled(self, feature, value):
+        """Map a value in the feature's query units onto the catalog's normalized scale."""
+        if value is None or feature not in RAW_UNITS or self.scaler is None:
+            return value
+        column = FEATURES.index(feature)
+        return value * self.scaler.scale_[column] + self.scaler.min_[column]
+
+    def _range_rows(self, feature, low, high) -> np.ndarray:
+        column = FEATURES.index(feature)
+        values = self.sorted[:, column]
+        start = 0 if low is None else np.searchsorted(values, self.to_scaled(feature, low), side="left")
+        stop = len(values) if high is None else np.searchsorted(values, self.to_scaled(feature, high), side="right")
+        return self.order[start:stop, column]
+
+    def _cluster_rows(self, clusters) -> np.ndarray:
+        rows = [self.cluster_rows[cluster] for cluster in clusters if cluster in self.cluster_rows]
+        return np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+
+    def _matches(self, rows, feature, low, high) -> np.ndarray:
+        values = self.features[rows, FEATURES.index(feature)]
+        mask = np.ones(len(rows), dtype=bool)
+        if low is not None:
+            mask &= values >= self.to_scaled(feature, low)
+        if high is not None:
+            mask &= values <= self.to_scaled(feature, high)
+        return mask
+
+    def query_rows(self, where=None, clusters=None, mood=None, near=None, limit=None) -> np.ndarray:
+        """Row positions matching every filter, nearest to `near` first when given, else in catalog order.
+
+        where maps a feature to an inclusive (low, high) range, either end may be None; mood selects
+        the clusters labelled with it. near maps features to target values; only those features count
+        toward the distance.
+        """
+        where = dict(where or {})
+        if mood is not None:
+            mood_clusters = [cluster for cluster, label in self.mood_map.items() if label == mood]
+            clusters = mood_clusters if clusters is None else sorted(set(clusters) & set(mood_clusters))
+
+        candidates = [(feature, self._range_rows(feature, *bounds)) for feature, bounds in where.items()]
+        if clusters is not None:
+            candidates.append((None, self._cluster_rows(clusters)))
+        if candidates:
+            driver, rows = min(candidates, key=lambda candidate: len(candidate[1]))
+            for feature, bounds in where.items():
+                if feature != driver and len(rows):
+                    rows = rows[self._matches(rows, feature, *bounds)]
+            if driver is not None and clusters is not None:
+                rows = rows[np.isin(self.clusters[rows], list(clusters))]
+        else:
+            rows = np.arange(len(self))
+
+        if near:
+            columns = [FEATURES.index(feature) for feature in near]
+            target = np.array([self.to_scaled(feature, value) for feature, value in near.items()])
+            distances = np.linalg.norm(self.features[np.ix_(rows, columns)] - target, axis=1)
+            if limit is not None and limit < len(rows):
+                nearest = np.argpartition(distances, limit - 1)[:limit]
+                rows, distances = rows[nearest], distances[nearest]
+            return rows[np.argsort(distances, kind="stable")]
+
+        rows = np.sort(rows)
+        return rows if limit is None else rows[:limit]
+
+    def query(self, **query) -> list:
+        """Track ids for query_rows(**query)."""
+        return self.ids[self.query_rows(**query)].tolist()
+
+    def search(self, text: str, limit=None) -> list:
+        query = parse_query(text)
+        if limit is not None:
+            query.setdefault("limit", limit)
+        return self.query(**query)
+
+
+_cached = None
+
+def get_catalog_index(registry=None) -> CatalogIndex:
+    """Index over the registry's clustered catalog, rebuilt only when the catalog file changes."""
+    global _cached
+    registry = registry or get_registry()
+    df = registry.load("dataset")
+    if _cached is not None and _cached[0] is df:
+        return _cached[1]
+
+    try:
+        mood_map = registry.load("mood_map")
+    except FileNotFoundError:
+        mood_map = {}
+    try:
+        scaler = registry.load("scaler")
+    except FileNotFoundError:
+        logger.warning("[CatalogIndex] No scaler found; %s queries use the normalized scale", ", ".join(RAW_UNITS))
+        scaler = None
+    index = CatalogIndex.from_frame(df, mood_map, scaler)
+    logger.info("[CatalogIndex] Indexed %d tracks", len(index))
+    _cached = (df, index)
+    return index
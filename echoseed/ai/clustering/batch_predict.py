@@ -0,0 +1,127 @@
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from echoseed.ai.artifacts import get_registry
+from echoseed.ai.preprocessing.normalize_features import FEATURES, filter_audio_features
+
+logger = logging.getLogger("echoseed.batch_predict")
+
+# Rows each worker labels per task; small enough to balance load, large enough to amortize dispatch.
+SHARD_ROWS = 1_000_000
+# Rows read from or written to the CSVs at a time; bounds the parent's memory.
+CHUNK_ROWS = 250_000
+# Rows per distance computation inside a worker; bounds each worker's memory.
+BLOCK_ROWS = 65_536
+
+_centroids = None
+
+
+def _init_worker(centroids):
+    global _centroids
+    _centroids = np.asarray(centroids, dtype=np.float64)
+
+def nearest_centroid(features, centroids) -> np.ndarray:
+    """Index of the closest centroid per row, same as KMeans.predict: argmin of |c|^2 - 2 x.c."""
+    features = np.asarray(features, dtype=np.float64)
+    scores = (centroids ** 2).sum(axis=1) - 2.0 * features @ centroids.T
+    return scores.argmin(axis=1).astype(np.int32)
+
+def _label_shard(features_path, labels_path, rows, start, stop) -> np.ndarray:
+    """Label rows [start, stop) of the shared feature file in place; returns per-cluster counts."""
+    features = np.memmap(features_path, dtype=np.float32, mode="r", shape=(rows, len(FEATURES)))
+    labels = np.memmap(labels_path, dtype=np.int32, mode="r+", shape=(rows,))
+    for block in range(start, stop, BLOCK_ROWS):
+        end = min(block + BLOCK_ROWS, stop)
+        labels[block:end] = nearest_centroid(features[block:end], _centroids)
+    labels.flush()
+    return np.bincount(labels[start:stop], minlength=len(_centroids))
+
+
+def _read_chunks(input_path, scaler=None):
+    """Normalized chunks of the input; raw catalogs (scaler given) are filtered and scaled on the way."""
+    for chunk in pd.read_csv(input_path, chunksize=CHUNK_ROWS):
+        if scaler is not None:
+            chunk = filter_audio_features(chunk).copy()
+            chunk[FEATURES] = scaler.transform(chunk[FEATURES])
+        yield chunk
+
+def _spill_features(input_path, features_path, scaler=None) -> int:
+    rows = 0
+    with open(features_path, "wb") as f:
+        for chunk in _read_chunks(input_path, scaler):
+            f.write(np.ascontiguousarray(chunk[FEATURES].to_numpy(dtype=np.float32)).tobytes())
+            rows += len(chunk)
+    return rows
+
+def default_output(input_path) -> Path:
+    return get_registry().path("dataset").parent / f"{Path(input_path).stem}_clustered.csv"
+
+
+def batch_predict(input_path, output_path=None, workers=None, raw=False, shard_rows=SHARD_ROWS) -> dict:
+    """Label every row of a large catalog with the saved model and write one merged CSV.
+
+    The features are spilled once to a flat float32 file that worker processes memory-map, so only
+    file names and row bounds cross the process boundary. Labels go to a shared memory-mapped
+    array, and the output is streamed back in chunks, so memory stays flat whatever the row count.
+    """
+    registry = get_registry()
+    centroids = registry.load("model").cluster_centers_
+    scaler = registry.load("scaler") if raw else None
+    output_path = Path(output_path or default_output(input_path))
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(output_path.parent, exist_ok=True)
+
+    work_dir = tempfile.mkdtemp(prefix="batch_predict_", dir=output_path.parent)
+    try:
+        features_path = os.path.join(work_dir, "features.f32")
+        labels_path = os.path.join(work_dir, "labels.i32")
+        rows = _spill_features(input_path, features_path, scaler)
+        logger.info("[BatchPredict] Labelling %d rows with %d workers", rows, workers)
+
+        counts = np.zeros(len(centroids), dtype=np.int64)
+        if rows:
+            np.memmap(labels_path, dtype=np.int32, mode="w+", shape=(rows,)).flush()
+            shards = [(start, min(start + shard_rows, rows)) for start in range(0, rows, shard_rows)]
+            with ProcessPoolExecutor(max_workers=min(workers, len(shards)), initializer=_init_worker,
+                                     initargs=(centroids,)) as executor:
+                futures = [executor.submit(_label_shard, features_path, labels_path, rows, start, stop)
+                           for start, stop in shards]
+                for future in futures:
+                    counts += future.result()
+
+        tmp_path = f"{output_path}.tmp"
+        labels = np.memmap(labels_path, dtype=np.int32, mode="r", shape=(rows,)) if rows else np.empty(0, np.int32)
+        offset = 0
+        header = True
+        for chunk in _read_chunks(input_path, scaler):
+            chunk["cluster"] = labels[offset:offset + len(chunk)]
+            offset += len(chunk)
+            chunk.to_csv(tmp_path, mode="w" if header else "a", header=header, index=False)
+            header = False
+        if header:
+            pd.DataFrame(columns=list(pd.read_csv(input_path, nrows=0).columns) + ["cluster"]).to_csv(
+                tmp_path, index=False
+            )
+        del labels
+        os.replace(tmp_path, output_path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    logger.info("[BatchPredict] Wrote %d labelled rows to %s", rows, output_path)
+    return {"rows": rows, "output": str(output_path), "clusters": {str(i): int(n) for i, n in enumerate(counts)}}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Label a large catalog with the saved clustering model")
+    parser.add_argument("input", help="CSV with the normalized feature columns (or raw ones with --raw)")
+    parser.add_argument("--output")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--raw", action="store_true", help="filter and scale raw audio features first")
+    args = parser.parse_args()
+    print(batch_predict(args.input, args.output, args.workers, args.raw))
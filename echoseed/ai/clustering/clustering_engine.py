@@ -1,9 +1,23 @@
-from echoseed.ai.preprocessing.normalize_features import normalize_audio_features
+import argparse
+import os
+import pandas as pd
+from echoseed.ai.artifacts import get_registry
+from echoseed.ai.mood_pools import refresh_mood_pools
+from echoseed.ai.preprocessing.load_datasets import load_spotify_dataset
+from echoseed.ai.preprocessing.normalize_features import (
+    FEATURES, ID_COLUMN, dedupe_tracks, filter_audio_features, normalize_audio_features, to_normalized_frame
+)
 from sklearn.cluster import KMeans
-import matplotlib.pyplot as plt
 from joblib import dump
 
+registry = get_registry()
+
+# Share of new rows outside the fitted scaler range above which a full retrain is advised.
+DRIFT_THRESHOLD = 0.05
+
 def optimise_k_means(data, max_k):
+    import matplotlib.pyplot as plt
+
     means = []
     inertias = []
 
@@ -23,17 +37,93 @@ def optimise_k_means(data, max_k):
     plt.savefig("inertias.png")
     print("Inertia plot saved as inertias.png")
 
-def cluster_features():
-    df = normalize_audio_features()
+def cluster_features(n_clusters=4, audio_features=None):
+    df, scaler = normalize_audio_features(audio_features, return_scaler=True)
 
-    model = KMeans(n_clusters=4, random_state=42)
-    labels = model.fit_predict(df)
+    model = KMeans(n_clusters=n_clusters, random_state=42)
+    labels = model.fit_predict(df[FEATURES])
 
     df["cluster"] = labels
 
-    df.to_csv("echoseed/data/processed/clustered_tracks.csv", index=False)
-    dump(model, "echoseed/model/clustering/kmeans_model.joblib")
+    clustered_tracks_file = registry.path("dataset")
+    model_file = registry.path("model")
+    os.makedirs(clustered_tracks_file.parent, exist_ok=True)
+    os.makedirs(model_file.parent, exist_ok=True)
+    # The rewritten files no longer match their published hashes.
+    registry.unpublish(("scaler", "model", "dataset"))
+    df.to_csv(clustered_tracks_file, index=False)
+    dump(model, model_file)
+    dump(scaler, registry.path("scaler"))
+
+    # Cluster ids changed, so the mood map is stale until tagging re-publishes the set.
+    registry.invalidate()
+    print("Clusters rebuilt; re-run mood tagging to publish a new artifact version")
 
     return df, model
 
-cluster_features()
\ No newline at end of file
+def check_drift(scaled, scaler) -> dict:
+    """Count rows that land outside the range the scaler was fitted on."""
+    low, high = scaler.feature_range
+    outside = (scaled < low) | (scaled > high)
+    rows_outside = int(outside.any(axis=1).sum())
+    share = rows_outside / len(scaled) if len(scaled) else 0.0
+    return {
+        "rows": len(scaled),
+        "rows_outside_range": rows_outside,
+        "per_feature": {feature: int(count) for feature, count in zip(FEATURES, outside.sum(axis=0))},
+        "drifted": share > DRIFT_THRESHOLD
+    }
+
+def assign_new_tracks(raw_df=None):
+    """Label only tracks not yet in the processed store, using the persisted scaler and model."""
+    if raw_df is None:
+        raw_df = load_spotify_dataset()
+    clustered_tracks_file = registry.path("dataset")
+    model = registry.load("model")
+    scaler = registry.load("scaler")
+
+    raw_df = filter_audio_features(raw_df)
+    store_exists = os.path.exists(clustered_tracks_file)
+    if store_exists and ID_COLUMN in raw_df.columns:
+        known_ids = pd.read_csv(clustered_tracks_file, usecols=[ID_COLUMN])[ID_COLUMN]
+        raw_df = raw_df[~raw_df[ID_COLUMN].isin(known_ids)]
+    raw_df = dedupe_tracks(raw_df)
+
+    if raw_df.empty:
+        print("No new tracks to assign")
+        return raw_df, {"rows": 0, "rows_outside_range": 0, "per_feature": {}, "drifted": False}
+
+    scaled = scaler.transform(raw_df[FEATURES])
+    drift = check_drift(scaled, scaler)
+    if drift["drifted"]:
+        print(f"Drift detected: {drift['rows_outside_range']}/{drift['rows']} new tracks fall outside "
+              f"the fitted feature range {drift['per_feature']}. Consider a full re-cluster.")
+
+    new_df = to_normalized_frame(raw_df, scaled)
+    new_df["cluster"] = model.predict(new_df[FEATURES])
+
+    # The appended file no longer matches its published hash until the publish below.
+    registry.unpublish(("dataset",))
+    if store_exists:
+        columns = pd.read_csv(clustered_tracks_file, nrows=0).columns
+        new_df.reindex(columns=columns).to_csv(clustered_tracks_file, mode="a", header=False, index=False)
+    else:
+        new_df.to_csv(clustered_tracks_file, index=False)
+
+    # Published pools must include the new tracks, or the version would serve pools sampled without them.
+    if refresh_mood_pools(registry):
+        print("Rebuilt mood track pools with the assigned tracks")
+    registry.publish()
+    print(f"Assigned {len(new_df)} new tracks to existing clusters")
+    return new_df, drift
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cluster the track catalog")
+    parser.add_argument("--assign", nargs="?", const="", metavar="RAW_CSV",
+                        help="label new tracks with the saved model instead of refitting")
+    args = parser.parse_args()
+
+    if args.assign is None:
+        cluster_features()
+    else:
+        assign_new_tracks(load_spotify_dataset(args.assign or None))
@@ -0,0 +1,188 @@
+import glob
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import numpy as np
+from echoseed.ai.artifacts import get_registry
+from echoseed.file_lock import FileLock
+from echoseed.profiling import profiled
+
+logger = logging.getLogger("echoseed.feature_store")
+
+COLUMNS = ("tempo", "danceability", "energy", "valence")
+BATCH_SIZE = 100
+MAX_WORKERS = 4
+ID_WIDTH = 22
+
+
+class FeatureStore:
+    """Raw audio features keyed by track id, stored as sorted memory-mapped arrays.
+
+    Each flush writes a new generation of ``ids``/``features`` files and then swaps
+    ``store.json`` atomically, so readers always see a consistent pair. Flushes hold a lock
+    file for their whole read-merge-write, so threads and processes sharing a root never
+    drop each other's rows.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self._ids = None
+        self._features = None
+        self._generation = None
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = FileLock(self.root / "store.lock")
+
+    def _state(self) -> dict:
+        state_path = self.root / "store.json"
+        if not state_path.exists():
+            return {"generation": 0, "count": 0}
+        with open(state_path) as f:
+            return json.load(f)
+
+    def _arrays(self):
+        while True:
+            generation = self._state()["generation"]
+            with self._lock:
+                if generation == self._generation:
+                    return self._ids, self._features
+            if generation == 0:
+                ids = np.empty(0, dtype=f"S{ID_WIDTH}")
+                features = np.empty((0, len(COLUMNS)), dtype=np.float32)
+            else:
+                try:
+                    ids = np.load(self.root / f"ids-{generation}.npy", mmap_mode="r")
+                    features = np.load(self.root / f"features-{generation}.npy", mmap_mode="r")
+                except FileNotFoundError:
+                    continue  # a newer flush replaced this generation; read store.json again
+            with self._lock:
+                self._ids, self._features, self._generation = ids, features, generation
+            return ids, features
+
+    def _save(self, name, array):
+        tmp_path = self.root / f"{name}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, self.root / name)
+
+    def __len__(self):
+        return self._state()["count"]
+
+    def lookup(self, track_ids):
+        """Vectorized lookup. Returns (found mask, features) with NaN rows for unknown ids."""
+        ids, features = self._arrays()
+        keys = np.asarray([str(track_id).encode() for track_id in track_ids], dtype=bytes)
+        result = np.full((len(keys), len(COLUMNS)), np.nan, dtype=np.float32)
+        if len(ids) and len(keys):
+            positions = np.minimum(np.searchsorted(ids, keys), len(ids) - 1)
+            found = ids[positions] == keys
+            result[found] = features[positions[found]]
+        else:
+            found = np.zeros(len(keys), dtype=bool)
+
+        with self._lock:
+            for i, track_id in enumerate(track_ids):
+                if not found[i] and track_id in self._pending:
+                    result[i] = self._pending[track_id]
+                    found[i] = True
+        return found, result
+
+    def get(self, track_id):
+        found, features = self.lookup([track_id])
+        return features[0] if found[0] else None
+
+    def add(self, rows: dict):
+        with self._lock:
+            self._pending.update(rows)
+
+    def flush(self):
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+
+        os.makedirs(self.root, exist_ok=True)
+        try:
+            with self._flush_lock:
+                generation, count = self._write_generation(pending)
+        except BaseException:
+            with self._lock:
+                self._pending = {**pending, **self._pending}
+            raise
+        logger.info("[FeatureStore] Stored %d tracks (generation %d)", count, generation)
+
+    def _write_generation(self, pending):
+        """Merge pending rows into the current generation and publish the next; call with the flush lock held."""
+        ids, features = self._arrays()
+        width = max([ID_WIDTH] + [len(track_id) for track_id in pending])
+        new_ids = np.array([track_id.encode() for track_id in pending], dtype=f"S{width}")
+        new_features = np.array(list(pending.values()), dtype=np.float32)
+
+        keep = ~np.isin(ids.astype(f"S{width}"), new_ids)
+        merged_ids = np.concatenate((ids[keep].astype(f"S{width}"), new_ids))
+        merged_features = np.concatenate((features[keep], new_features))
+        order = np.argsort(merged_ids, kind="stable")
+
+        generation = self._state()["generation"] + 1
+        self._save(f"ids-{generation}.npy", merged_ids[order])
+        self._save(f"features-{generation}.npy", merged_features[order])
+
+        tmp_path = self.root / "store.json.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"generation": generation, "count": len(order), "columns": list(COLUMNS)}, f)
+        os.replace(tmp_path, self.root / "store.json")
+
+        for stale in glob.glob(str(self.root / "*-*.npy")):
+            if not stale.endswith(f"-{generation}.npy"):
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass  # still mapped elsewhere on Windows; removed on a later flush
+        return generation, len(order)
+
+    def _fetch_batch(self, spotify, batch) -> dict:
+        rows = {}
+        for item in spotify.audio_features(batch) or []:
+            if item:
+                rows[item["id"]] = [item[column] for column in COLUMNS]
+        return rows
+
+    @profiled()
+    def fetch(self, spotify, track_ids, max_workers=MAX_WORKERS) -> dict:
+        """Return features for track_ids, requesting only unknown ids in concurrent batches of 100."""
+        unique_ids = [track_id for track_id in dict.fromkeys(track_ids) if track_id]
+        found, _ = self.lookup(unique_ids)
+        missing = [track_id for track_id, known in zip(unique_ids, found) if not known]
+
+        if missing:
+            batches = [missing[i:i + BATCH_SIZE] for i in range(0, len(missing), BATCH_SIZE)]
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for rows in executor.map(lambda batch: self._fetch_batch(spotify, batch), batches):
+                    self.add(rows)
+            logger.info("[FeatureStore] Fetched features for %d tracks in %d requests", len(missing), len(batches))
+            self.flush()
+
+        found, features = self.lookup(unique_ids)
+        return {track_id: features[i].tolist() for i, track_id in enumerate(unique_ids) if found[i]}
+
+    def to_frame(self, track_ids):
+        """Known tracks as a DataFrame with track_id plus raw feature columns."""
+        import pandas as pd
+        found, features = self.lookup(track_ids)
+        df = pd.DataFrame(features[found], columns=COLUMNS)
+        df.insert(0, "track_id", np.asarray(track_ids, dtype=object)[found])
+        return df
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_feature_store(root=None) -> FeatureStore:
+    root = Path(root or get_registry().path("feature_store"))
+    with _stores_lock:
+        if root not in _stores:
+            _stores[root] = FeatureStore(root)
+        return _stores[root]
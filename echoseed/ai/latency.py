@@ -0,0 +1,127 @@
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+logger = logging.getLogger("echoseed.latency")
+
+# Seconds generation may spend waiting on the LLM before falling back to local sources; unset disables it.
+LATENCY_BUDGET = float(os.getenv("ECHOSEED_LATENCY_BUDGET", "0")) or None
+# Fraction of a call's timeout after which a second, hedged request is sent.
+HEDGE_AFTER = float(os.getenv("ECHOSEED_HEDGE_AFTER", "0.5"))
+# Per-call ceiling for LLM requests outside of budget mode.
+LLM_TIMEOUT = float(os.getenv("ECHOSEED_LLM_TIMEOUT", "60"))
+
+# LLM calls served at once without queueing.
+LLM_WORKERS = int(os.getenv("ECHOSEED_LLM_WORKERS", "16"))
+# Abandoned calls (past their deadline, or beaten by the other attempt) that keep running until the
+# client-side timeout ends them. While this many hold a worker, new calls fail fast and hedges are skipped.
+MAX_ABANDONED = int(os.getenv("ECHOSEED_LLM_MAX_ABANDONED", str(LLM_WORKERS)))
+
+# Room for every live call and its hedge, plus the abandoned calls still finishing.
+_executor = ThreadPoolExecutor(max_workers=LLM_WORKERS * 2 + MAX_ABANDONED, thread_name_prefix="echoseed-llm")
+_abandoned = 0
+_abandoned_lock = threading.Lock()
+
+NAME_TEMPLATES = (
+    "{Mood} Hours",
+    "Strictly {Mood}",
+    "{Mood} Rotation",
+    "Late Night {Mood}",
+    "{Mood} Frequencies",
+    "Pure {Mood}",
+    "{Mood} State of Mind",
+    "The {Mood} Tapes",
+    "{Mood} Drift",
+    "Certified {Mood}",
+)
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class Deadline:
+    """Absolute point in time shared by every stage of one generation run."""
+
+    def __init__(self, seconds):
+        self.expires_at = time.perf_counter() + seconds
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.perf_counter(), 0.0)
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+
+def abandoned_calls() -> int:
+    return _abandoned
+
+def _release(_):
+    global _abandoned
+    with _abandoned_lock:
+        _abandoned -= 1
+
+def _abandon(futures):
+    """Cancel attempts that have not started yet; count the running ones until they finish."""
+    global _abandoned
+    for future in futures:
+        if future.cancel():
+            continue
+        with _abandoned_lock:
+            _abandoned += 1
+        future.add_done_callback(_release)
+
+
+def call_with_deadline(func, timeout, hedge=False, hedge_after=HEDGE_AFTER):
+    """Run func() and return (result, attempt) within timeout seconds.
+
+    With hedge=True a second identical request is sent once hedge_after * timeout has passed
+    without an answer; the first of the two to succeed wins and attempt is 2 if it was the hedge.
+    Raises DeadlineExceeded when nothing succeeds in time, or at once while MAX_ABANDONED abandoned
+    calls are still running; raises the last error if every attempt failed.
+    """
+    if timeout <= 0:
+        raise DeadlineExceeded("no time left in the latency budget")
+    if _abandoned >= MAX_ABANDONED:
+        raise DeadlineExceeded(f"{_abandoned} abandoned LLM calls are still running")
+    started = time.perf_counter()
+    attempts = {_executor.submit(func): 1}
+    hedged = not hedge
+    error = None
+
+    try:
+        while attempts:
+            elapsed = time.perf_counter() - started
+            wait_for = (hedge_after * timeout if not hedged else timeout) - elapsed
+            done, _ = wait(attempts, timeout=max(wait_for, 0.0), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                attempt = attempts.pop(future)
+                try:
+                    return future.result(), attempt
+                except Exception as e:
+                    error = e
+
+            if done:
+                continue
+            if hedged:
+                break
+            hedged = True
+            if _abandoned >= MAX_ABANDONED:
+                logger.info("[Latency] %d abandoned calls still running, not hedging", _abandoned)
+                continue
+            logger.info("[Latency] No answer after %.2fs, sending hedged request", hedge_after * timeout)
+            attempts[_executor.submit(func)] = 2
+    finally:
+        _abandon(attempts)
+
+    if not attempts and error is not None:
+        raise error
+    raise DeadlineExceeded(f"no answer within {timeout:.2f}s")
+
+
+def template_name(mood: str, rng=None) -> str:
+    return (rng or random).choice(NAME_TEMPLATES).format(Mood=str(mood).strip().title())
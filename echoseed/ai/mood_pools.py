@@ -0,0 +1,107 @@
+import logging
+import os
+import numpy as np
+from echoseed.ai.artifacts import get_registry
+from echoseed.ai.preprocessing.normalize_features import FEATURES, ID_COLUMN
+from echoseed.ai.tagging.sampling import cluster_centroids
+
+logger = logging.getLogger("echoseed.mood_pools")
+
+# Candidates considered per requested track; a wider window trades closeness for variety.
+CANDIDATE_WINDOW = 4
+# Minimum feature-space gap between two picked tracks (normalized 1-10 scale).
+MIN_FEATURE_GAP = 0.05
+
+
+def build_mood_pools(df, mood_map, centroids) -> dict:
+    """Per mood: track ids, centroid distances and features, nearest first."""
+    features = df[FEATURES].to_numpy(dtype=np.float32)
+    labels = df["cluster"].to_numpy(dtype=int)
+    ids = df[ID_COLUMN].astype(str).to_numpy(dtype=str)
+    distances = np.linalg.norm(features - centroids[labels].astype(np.float32), axis=1)
+
+    arrays = {}
+    for mood in sorted(set(mood_map.values())):
+        clusters = [int(cluster) for cluster, label in mood_map.items() if label == mood]
+        members = np.flatnonzero(np.isin(labels, clusters))
+        members = members[np.argsort(distances[members], kind="stable")]
+        arrays[f"{mood}:ids"] = ids[members]
+        arrays[f"{mood}:distances"] = distances[members]
+        arrays[f"{mood}:features"] = features[members]
+    return arrays
+
+def save_mood_pools(arrays, path):
+    tmp_path = f"{path}.tmp.npz"
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+def refresh_mood_pools(registry=None, mood_map=None) -> bool:
+    """Rebuild the pools from the registry's current dataset, model and mood map (loaded when not given).
+
+    Returns False, writing nothing, when there is no mood map yet or the dataset has no track ids.
+    """
+    registry = registry or get_registry()
+    if mood_map is None:
+        try:
+            mood_map = registry.load("mood_map")
+        except FileNotFoundError:
+            return False
+    df = registry.load("dataset")
+    if ID_COLUMN not in df.columns:
+        logger.warning("[MoodPools] Dataset has no %s column; skipping mood pools", ID_COLUMN)
+        return False
+    try:
+        model = registry.load("model")
+    except FileNotFoundError:
+        model = None
+
+    pools = build_mood_pools(df, {str(c): label for c, label in mood_map.items()}, cluster_centroids(df, model))
+    save_mood_pools(pools, registry.path("mood_pools"))
+    return True
+
+
+class MoodPools:
+    def __init__(self, arrays: dict):
+        self.arrays = arrays
+
+    @classmethod
+    def load(cls, registry=None):
+        return cls((registry or get_registry()).load("mood_pools"))
+
+    def moods(self) -> list:
+        return sorted({key.rsplit(":", 1)[0] for key in self.arrays})
+
+    def pool(self, mood):
+        if f"{mood}:ids" not in self.arrays:
+            raise KeyError(f"No track pool for mood '{mood}'")
+        return self.arrays[f"{mood}:ids"], self.arrays[f"{mood}:distances"], self.arrays[f"{mood}:features"]
+
+    def sample_indices(self, mood, limit, rng=None, window=CANDIDATE_WINDOW, min_gap=MIN_FEATURE_GAP):
+        """Weighted pick from the nearest candidates, skipping ids and feature vectors already taken."""
+        ids, _, features = self.pool(mood)
+        rng = rng or np.random.default_rng()
+        candidates = min(len(ids), limit * window)
+        if candidates == 0:
+            return np.empty(0, dtype=int)
+
+        # Efraimidis-Spirakis keys: earlier (closer) candidates get larger weights.
+        weights = 1.0 / np.arange(1, candidates + 1)
+        keys = rng.random(candidates) ** (1.0 / weights)
+        order = np.argsort(-keys)
+
+        chosen = []
+        seen = set()
+        for index in order:
+            if ids[index] in seen:
+                continue
+            if chosen and np.min(np.abs(features[chosen] - features[index]).sum(axis=1)) < min_gap:
+                continue
+            chosen.append(index)
+            seen.add(ids[index])
+            if len(chosen) == limit:
+                break
+        return np.array(chosen, dtype=int)
+
+    def sample(self, mood, limit, rng=None) -> list:
+        ids, _, _ = self.pool(mood)
+        return ids[self.sample_indices(mood, limit, rng)].tolist()
@@ -0,0 +1,160 @@
+import logging
+import random
+import time
+import numpy as np
+from echoseed.ai.feature_store import get_feature_store
+from echoseed.profiling import profiled
+
+logger = logging.getLogger("echoseed.ordering")
+
+MODES = ("smooth", "ramp_up", "cool_down")
+# Column positions of tempo, energy and valence in the tempo/danceability/energy/valence layout.
+FLOW_COLUMNS = (0, 2, 3)
+ENERGY = 1
+# Above this many tracks the n x n distance matrix is skipped and distances are computed per row.
+FULL_MATRIX_LIMIT = 3000
+# Segment length examined per 2-opt step on large playlists.
+TWO_OPT_WINDOW = 200
+
+
+def _flow_space(features):
+    """Project onto tempo/energy/valence and rescale each column to [0, 1] within the playlist."""
+    points = np.asarray(features, dtype=np.float64)[:, FLOW_COLUMNS]
+    low = points.min(axis=0)
+    span = points.max(axis=0) - low
+    span[span == 0] = 1.0
+    return (points - low) / span
+
+def _distance_matrix(points):
+    squared = (points ** 2).sum(axis=1)
+    gram = squared[:, None] + squared[None, :] - 2.0 * points @ points.T
+    return np.sqrt(np.maximum(gram, 0.0))
+
+def _distances_from(points, index, targets, matrix=None):
+    if matrix is not None:
+        return matrix[index, targets]
+    return np.linalg.norm(points[targets] - points[index], axis=1)
+
+def grid_order(points, cells=8) -> np.ndarray:
+    """Cheap serpentine walk over a coarse grid; used when the greedy tour runs out of time."""
+    cell = np.minimum((points * cells).astype(int), cells - 1)
+    # Flip the direction of every other row so consecutive cells stay adjacent.
+    second = np.where(cell[:, 0] % 2 == 1, cells - 1 - cell[:, 1], cell[:, 1])
+    third = np.where((cell[:, 0] * cells + second) % 2 == 1, cells - 1 - cell[:, 2], cell[:, 2])
+    return np.lexsort((third, second, cell[:, 0]))
+
+def nearest_neighbour_tour(points, start=0, matrix=None, deadline=None) -> np.ndarray:
+    n = len(points)
+    remaining = np.delete(np.arange(n), start)
+    tour = [start]
+    current = start
+    flat = points.astype(np.float32)
+    while len(remaining):
+        if deadline is not None and len(tour) % 256 == 0 and time.perf_counter() >= deadline:
+            rest = remaining[grid_order(points[remaining])]
+            logger.debug("[Ordering] Greedy tour out of time after %d of %d tracks", len(tour), n)
+            return np.concatenate((tour, rest)).astype(int)
+        if matrix is not None:
+            row = matrix[current, remaining]
+        else:
+            row = ((flat[remaining] - flat[current]) ** 2).sum(axis=1)
+        position = int(np.argmin(row))
+        current = int(remaining[position])
+        tour.append(current)
+        remaining[position] = remaining[-1]
+        remaining = remaining[:-1]
+    return np.array(tour, dtype=int)
+
+def two_opt(tour, points, deadline, matrix=None, window=TWO_OPT_WINDOW) -> np.ndarray:
+    """Open-path 2-opt: reverse tour[i+1..j] whenever that shortens the path, until stable or out of time."""
+    tour = tour.copy()
+    n = len(tour)
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for i in range(n - 2):
+            if time.perf_counter() >= deadline:
+                break
+            js = np.arange(i + 2, min(n, i + 2 + window))
+            a, b = tour[i], tour[i + 1]
+            c = tour[js]
+            d = tour[np.minimum(js + 1, n - 1)]
+            at_end = js == n - 1
+
+            d_ab = _distances_from(points, a, np.array([b]), matrix)[0]
+            d_ac = _distances_from(points, a, c, matrix)
+            d_bd = np.where(at_end, 0.0, _distances_from(points, b, d, matrix))
+            d_cd = np.where(at_end, 0.0, np.linalg.norm(points[c] - points[d], axis=1))
+            delta = d_ac + d_bd - d_ab - d_cd
+
+            best = int(np.argmin(delta))
+            if delta[best] < -1e-12:
+                j = js[best]
+                tour[i + 1:j + 1] = tour[i + 1:j + 1][::-1]
+                improved = True
+    return tour
+
+def _order_segment(points, members, start_point, deadline):
+    segment = points[members]
+    matrix = _distance_matrix(segment) if len(members) <= FULL_MATRIX_LIMIT else None
+    start = int(np.argmin(np.linalg.norm(segment - start_point, axis=1)))
+    # Leave part of the budget for 2-opt refinement.
+    greedy_deadline = time.perf_counter() + 0.6 * max(deadline - time.perf_counter(), 0.0)
+    tour = nearest_neighbour_tour(segment, start, matrix, greedy_deadline)
+    tour = two_opt(tour, segment, deadline, matrix)
+    return members[tour]
+
+@profiled()
+def order_tracks(features, mode="smooth", time_budget=0.5, segments=None) -> np.ndarray:
+    """Return indices that arrange tracks into a smooth path through tempo/energy/valence space.
+
+    ``ramp_up`` and ``cool_down`` split the playlist into energy bands and walk them in
+    rising or falling order; ``smooth`` only minimises the jumps between neighbours.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown ordering mode '{mode}', expected one of {MODES}")
+    n = len(features)
+    if n < 3:
+        return np.arange(n)
+
+    deadline = time.perf_counter() + time_budget
+    points = _flow_space(features)
+    energy = points[:, ENERGY]
+
+    if mode == "smooth":
+        bands = [np.arange(n)]
+    else:
+        segments = segments or max(1, min(5, n // 8))
+        ranked = np.argsort(energy, kind="stable")
+        if mode == "cool_down":
+            ranked = ranked[::-1]
+        bands = np.array_split(ranked, segments)
+
+    order = []
+    start_point = points[np.argmin(energy) if mode != "cool_down" else np.argmax(energy)]
+    for band_number, members in enumerate(bands):
+        # Share what is left of the budget evenly between the remaining bands.
+        remaining = max(deadline - time.perf_counter(), 0.0)
+        band_deadline = time.perf_counter() + remaining / (len(bands) - band_number)
+        ordered = _order_segment(points, members, start_point, band_deadline)
+        order.append(ordered)
+        start_point = points[ordered[-1]]
+
+    return np.concatenate(order)
+
+@profiled()
+def order_track_uris(spotify, track_uris, mode="smooth", time_budget=0.5, store=None) -> list:
+    """Order Spotify track URIs by audio features; tracks without features are shuffled onto the end."""
+    track_ids = [uri.rsplit(":", 1)[-1] for uri in track_uris]
+    features = (store if store is not None else get_feature_store()).fetch(spotify, track_ids)
+
+    known = [i for i, track_id in enumerate(track_ids) if track_id in features]
+    unknown = [track_uris[i] for i, track_id in enumerate(track_ids) if track_id not in features]
+    random.shuffle(unknown)
+    if not known:
+        return unknown
+
+    matrix = np.array([features[track_ids[i]] for i in known])
+    ordered = [track_uris[known[i]] for i in order_tracks(matrix, mode, time_budget)]
+    logger.info("[Ordering] Ordered %d tracks (%s), %d without features", len(ordered), mode, len(unknown))
+    return ordered + unknown
@@ -1,43 +1,67 @@
-import json
 import os
 import random
 import logging
-from pathlib import Path
+import numpy as np
 from dotenv import load_dotenv
 from spotipy import Spotify
 from openai import OpenAI
 from config.logger_config import setup_logger
+from echoseed.ai.artifacts import get_registry
+from echoseed.ai.catalog_query import get_catalog_index, parse_query
+from echoseed.ai.latency import LATENCY_BUDGET, LLM_TIMEOUT, Deadline, call_with_deadline, template_name
+from echoseed.ai.mood_pools import MoodPools
+from echoseed.ai.ordering import order_track_uris, order_tracks
+from echoseed.ai.preprocessing.normalize_features import ID_COLUMN
+from echoseed.ai.stages import StageDAG
+from echoseed.api.playlist_index import PlaylistIndex
+from echoseed.model.playlist import Playlist
+from echoseed.profiling import profiled
 
 load_dotenv()
 setup_logger()
 logger = logging.getLogger("echoseed.playlist_generator")
 
-base_dir = Path(__file__).resolve().parents[2]
-clustered_tracks_file = base_dir / "echoseed" / "data" / "processed" / "clustered_tracks.csv"
-mood_labels_file = base_dir / "cluster_mood_map.json"
+clustered_tracks_file = get_registry().path("dataset")
+mood_labels_file = get_registry().path("mood_map")
+# Most artists named in a recommendation prompt; larger pools are ranked with the artist graph and trimmed.
+MAX_PROMPT_ARTISTS = int(os.getenv("ECHOSEED_MAX_PROMPT_ARTISTS", "50"))
+# Track sources served from local artifacts rather than LLM recommendations.
+LOCAL_SOURCES = ("pool", "query")
+
+
+def create_ai_client() -> OpenAI:
+    return OpenAI(
+        api_key=os.getenv("GEMINI_API_KEY"),
+        base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
+    )
 
 
 class PlaylistGenerator:
-    def __init__(self, spotify_client: Spotify, mood):
+    @profiled()
+    def __init__(self, spotify_client: Spotify, mood, user=None, ai_client=None,
+                 latency_budget: float = LATENCY_BUDGET, hedge: bool = False):
         logger.info("[PlaylistGenerator] Initializing with mood: %s", mood)
         self.spotify = spotify_client
-        self.user = self.spotify.me()
+        self.user = user or self.spotify.me()
         logger.info("[PlaylistGenerator] Authenticated user: %s", self.user.get("id"))
         self.mood = mood
+        self.latency_budget = latency_budget
+        self.hedge = hedge
+        self.served_by = {}
 
-        self.ai_client = OpenAI(
-            api_key=os.getenv("GEMINI_API_KEY"),
-            base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
-        )
+        self.ai_client = ai_client or create_ai_client()
 
-        logger.info("[PlaylistGenerator] Loading clustered tracks from %s", clustered_tracks_file)
-        with open(clustered_tracks_file, "r") as f:
-            self.clustered_tracks = f.read()
+    @property
+    @profiled()
+    def clustered_tracks(self):
+        return get_registry().read(clustered_tracks_file, "csv")
 
-        logger.info("[PlaylistGenerator] Loading mood labels from %s", mood_labels_file)
-        with open(mood_labels_file, "r") as f:
-            self.mood_labels = json.load(f)
+    @property
+    @profiled()
+    def mood_labels(self):
+        return get_registry().read(mood_labels_file, "json")
 
+    @profiled()
     def get_clusters_for_mood(self) -> list:
         logger.info("[PlaylistGenerator] Finding clusters for mood: %s", self.mood)
         matching_clusters = []
@@ -49,10 +73,12 @@ class PlaylistGenerator:
         logger.info("[PlaylistGenerator] Found %d matching clusters", len(matching_clusters))
         return matching_clusters
 
+    @profiled()
     def get_playlist_name(self) -> str:
         logger.info("[PlaylistGenerator] Generating playlist name for mood: %s", self.mood)
         response = self.ai_client.chat.completions.create(
             model="gemini-2.5-flash",
+            timeout=LLM_TIMEOUT,
             messages=[
                 {"role": "system", "content": "You are a creative playlist name generator."},
                 {
@@ -75,6 +101,7 @@ class PlaylistGenerator:
         logger.info("[PlaylistGenerator] Selected playlist name: %s", chosen_name)
         return chosen_name
 
+    @profiled()
     def get_artists_from_playlists(self):
         logger.info("[PlaylistGenerator] Collecting artists from user playlists")
         artists = set()
@@ -100,9 +127,25 @@ class PlaylistGenerator:
         logger.info("[PlaylistGenerator] Found %d unique artists", len(artists))
         return list(artists)
 
-    def get_recommended_tracks(self, limit: int = 25):
+    @profiled()
+    def select_prompt_artists(self, artists: list) -> list:
+        """Keep the MAX_PROMPT_ARTISTS artists most central to the user's library, if a graph has been built."""
+        if len(artists) <= MAX_PROMPT_ARTISTS:
+            return artists
+        try:
+            graph = get_registry().load("artist_graph")
+        except FileNotFoundError:
+            return artists
+        selected = graph.rank(artists)[:MAX_PROMPT_ARTISTS]
+        logger.info("[PlaylistGenerator] Trimmed artist pool from %d to %d", len(artists), len(selected))
+        return selected
+
+    @profiled()
+    def get_recommended_tracks(self, limit: int = 25, artists: list = None):
         logger.info("[PlaylistGenerator] Requesting %d recommended tracks for mood: %s", limit, self.mood)
-        artists = self.get_artists_from_playlists()
+        if artists is None:
+            artists = self.get_artists_from_playlists()
+        artists = self.select_prompt_artists(artists)
         logger.debug("[PlaylistGenerator] Artist pool: %s", artists)
 
         prompt = (
@@ -116,6 +159,7 @@ class PlaylistGenerator:
 
         response = self.ai_client.chat.completions.create(
             model="gemini-2.5-flash",
+            timeout=LLM_TIMEOUT,
             messages=[
                 {"role": "system", "content": "You are a music recommendation engine."},
                 {"role": "user", "content": prompt}
@@ -132,14 +176,36 @@ class PlaylistGenerator:
         logger.info("[PlaylistGenerator] Got %d recommendations", len(recommendations))
         return recommendations[:limit]
 
-    def generate_playlist(self, limit: int = 25):
-        logger.info("[PlaylistGenerator] Creating a new playlist for mood: %s", self.mood)
-        playlist_name = self.get_playlist_name()
-        playlist = self.spotify.user_playlist_create(self.user["id"], playlist_name)
-        logger.info("[PlaylistGenerator] Created playlist: %s (%s)", playlist_name, playlist["id"])
+    @profiled()
+    def get_pool_tracks(self, limit: int = 25, ordering: str = None) -> list:
+        """Draw tracks for the mood from the precomputed local pool, no LLM or search calls."""
+        pools = MoodPools.load()
+        picks = pools.sample_indices(self.mood, limit)
+        ids, _, features = pools.pool(self.mood)
+        if ordering:
+            picks = picks[order_tracks(features[picks], ordering)]
+        logger.info("[PlaylistGenerator] Drew %d tracks from the local '%s' pool", len(picks), self.mood)
+        return [f"spotify:track:{track_id}" for track_id in ids[picks]]
 
+    @profiled()
+    def get_query_tracks(self, limit: int = 25, ordering: str = None) -> list:
+        """Serve a mood written as a feature query, e.g. "energy > 7, tempo 120-130", from the local catalog."""
+        index = get_catalog_index()
+        query = parse_query(self.mood)
+        limit = query.pop("limit", limit)
+        if "near" in query:
+            rows = index.query_rows(limit=limit, **query)
+        else:
+            rows = index.query_rows(**query)
+            rows = np.random.default_rng().choice(rows, min(limit, len(rows)), replace=False)
+        if ordering and len(rows):
+            rows = rows[order_tracks(index.features[rows], ordering)]
+        logger.info("[PlaylistGenerator] Matched %d tracks for query '%s'", len(rows), self.mood)
+        return [f"spotify:track:{track_id}" for track_id in index.ids[rows]]
+
+    @profiled()
+    def search_track_uris(self, recommended_tracks) -> list:
         track_uris = []
-        recommended_tracks = self.get_recommended_tracks()
         for recommended_track in recommended_tracks:
             logger.debug("[PlaylistGenerator] Searching for track: %s", recommended_track)
             parts = recommended_track.split(" - ")
@@ -158,15 +224,114 @@ class PlaylistGenerator:
                 track_uris.append(track_uri)
             else:
                 logger.warning("⚠️ Could not find track: %s", recommended_track)
+        return track_uris
+
+    def get_local_tracks(self, limit: int = 25, ordering: str = None) -> list:
+        """Tracks for the mood without any network call: the mood pool, else the clustered catalog."""
+        try:
+            return self.get_pool_tracks(limit, ordering)
+        except (FileNotFoundError, KeyError):
+            df = self.clustered_tracks
+            clusters = [int(cluster) for cluster in self.get_clusters_for_mood()]
+            ids = df.loc[df["cluster"].isin(clusters), ID_COLUMN]
+            picks = ids.sample(min(limit, len(ids))).tolist()
+            logger.info("[PlaylistGenerator] Drew %d tracks for '%s' from the clustered catalog", len(picks), self.mood)
+            return [f"spotify:track:{track_id}" for track_id in picks]
+
+    def _name_within(self, deadline: Deadline) -> str:
+        try:
+            name, attempt = call_with_deadline(self.get_playlist_name, deadline.remaining(), self.hedge)
+            self.served_by["name"] = "llm" if attempt == 1 else "llm_hedge"
+            return name
+        except Exception as e:
+            logger.warning("[PlaylistGenerator] Naming fell back to templates: %s", e)
+            self.served_by["name"] = "template"
+            return template_name(self.mood)
+
+    def _recommend_within(self, deadline: Deadline, artists) -> list:
+        try:
+            recommended, attempt = call_with_deadline(
+                lambda: self.get_recommended_tracks(artists=artists), deadline.remaining(), self.hedge
+            )
+            self.served_by["tracks"] = "llm" if attempt == 1 else "llm_hedge"
+            return recommended
+        except Exception as e:
+            logger.warning("[PlaylistGenerator] Recommendations fell back to local tracks: %s", e)
+            return None
 
+    def _pick_tracks(self, recommended, limit, ordering) -> list:
+        if recommended is None:
+            self.served_by["tracks"] = "local"
+            return self.get_local_tracks(limit, ordering)
+
+        track_uris = self.search_track_uris(recommended)
         random.shuffle(track_uris)
         track_uris = track_uris[:limit]
+        if ordering:
+            track_uris = order_track_uris(self.spotify, track_uris, ordering)
+        return track_uris
+
+    def _create_playlist(self, name) -> dict:
+        playlist = self.spotify.user_playlist_create(self.user["id"], name)
+        PlaylistIndex.for_user(self.user["id"]).add(
+            Playlist(playlist["id"], name, self.user["id"], playlist.get("snapshot_id"))
+        )
+        logger.info("[PlaylistGenerator] Created playlist: %s (%s)", name, playlist["id"])
+        return playlist
 
-        if track_uris:
-            self.spotify.playlist_add_items(playlist["id"], track_uris)
-            logger.info("[PlaylistGenerator] Added %d tracks to playlist %s", len(track_uris), playlist_name)
+    def _add_tracks(self, playlist, tracks) -> int:
+        for i in range(0, len(tracks), 100):
+            self.spotify.playlist_add_items(playlist["id"], tracks[i:i + 100])
+        if tracks:
+            logger.info("[PlaylistGenerator] Added %d tracks to playlist %s", len(tracks), playlist["id"])
         else:
             logger.warning("[PlaylistGenerator] No tracks found to add")
+        return len(tracks)
+
+    def build_stages(self, limit: int = 25, source: str = "llm", ordering: str = None) -> StageDAG:
+        """Naming runs alongside track selection; the playlist is only created once both have succeeded."""
+        dag = StageDAG()
+        if self.latency_budget:
+            deadline = Deadline(self.latency_budget)
+            name = lambda: self._name_within(deadline)
+            recommend = lambda artists: self._recommend_within(deadline, artists)
+        elif source in LOCAL_SOURCES:
+            # Local sources make no LLM round trips, so the name comes from the templates as well.
+            self.served_by["name"] = "template"
+            name = lambda: template_name(self.mood)
+        else:
+            self.served_by.update(name="llm", tracks="llm")
+            name = self.get_playlist_name
+            recommend = lambda artists: self.get_recommended_tracks(artists=artists)
+
+        dag.add("name", name)
+        if source == "pool":
+            self.served_by["tracks"] = "pool"
+            dag.add("tracks", lambda: self.get_pool_tracks(limit, ordering))
+        elif source == "query":
+            self.served_by["tracks"] = "query"
+            dag.add("tracks", lambda: self.get_query_tracks(limit, ordering))
+        else:
+            dag.add("artists", self.get_artists_from_playlists)
+            dag.add("recommended", recommend, ["artists"])
+            dag.add("tracks", lambda recommended: self._pick_tracks(recommended, limit, ordering), ["recommended"])
+        dag.add("playlist", lambda name, tracks: self._create_playlist(name), ["name", "tracks"])
+        dag.add("added", lambda playlist, tracks: self._add_tracks(playlist, tracks), ["playlist", "tracks"])
+        return dag
+
+    @profiled()
+    def generate_playlist(self, limit: int = 25, source: str = "llm", ordering: str = None):
+        logger.info("[PlaylistGenerator] Creating a new playlist for mood: %s", self.mood)
+        dag = self.build_stages(limit, source, ordering)
+        results = dag.run()
+        return {
+            "id": results["playlist"]["id"],
+            "name": results["name"],
+            "tracks": results["added"],
+            "critical_path": dag.critical_path,
+            "critical_path_seconds": round(dag.critical_path_seconds, 4),
+            "served_by": dict(self.served_by),
+        }
 
 if __name__ == "__main__":
     from echoseed.api.auth import SpotifyAuthService
@@ -1,10 +1,40 @@
+import glob
+import json
 from pathlib import Path
 import pandas as pd
 
-def load_spotify_dataset():
-    base_dir = Path(__file__).resolve().parents[2]
-    csv_path = base_dir / "data" / "raw" / "song_track.csv"
+DEFAULT_DATASET = Path(__file__).resolve().parents[2] / "data" / "raw" / "song_track.csv"
 
-    print(f"Reading from: {csv_path}")
-    df = pd.read_csv(csv_path)
-    return df
+def resolve_raw_inputs(source=None) -> list:
+    """Shard files for a raw input: a CSV, a directory of CSVs, a glob pattern, or a manifest.
+
+    A manifest is a .json list or a .txt file with one path or pattern per line, relative to the
+    manifest's own directory. Shards are returned sorted so their concatenation order is stable.
+    """
+    if source is None:
+        return [DEFAULT_DATASET]
+    if isinstance(source, (list, tuple)):
+        return sorted({path for item in source for path in resolve_raw_inputs(item)})
+
+    source = Path(source)
+    if source.is_dir():
+        return sorted(source.glob("*.csv"))
+    if source.suffix in (".json", ".txt") and source.is_file():
+        with open(source, "r") as f:
+            entries = json.load(f) if source.suffix == ".json" else [line.strip() for line in f]
+        return resolve_raw_inputs([str(source.parent / entry) for entry in entries if entry])
+    if glob.has_magic(str(source)):
+        paths = sorted(Path(path) for path in glob.glob(str(source)))
+        if not paths:
+            raise FileNotFoundError(f"No raw shards match '{source}'")
+        return paths
+    return [source]
+
+def load_spotify_dataset(csv_path=None):
+    paths = resolve_raw_inputs(csv_path)
+    if len(paths) == 1:
+        print(f"Reading from: {paths[0]}")
+        return pd.read_csv(paths[0])
+
+    print(f"Reading {len(paths)} shards from: {csv_path}")
+    return pd.concat([pd.read_csv(path) for path in paths], ignore_index=True)
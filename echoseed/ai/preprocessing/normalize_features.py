@@ -1,19 +1,128 @@
+import logging
+import os
 from echoseed.ai.preprocessing.load_datasets import load_spotify_dataset
+from echoseed.model.track_collection import normalize_text
+import numpy as np
 import pandas as pd
+from scipy.spatial import KDTree
 from sklearn.preprocessing import MinMaxScaler
 
-def normalize_audio_features():
-    audio_features = load_spotify_dataset()
+logger = logging.getLogger("echoseed.normalize_features")
 
-    features = ['tempo', 'danceability', 'energy', 'valence']
-    audio_features = audio_features.dropna(subset=features)
-    audio_features = audio_features[(audio_features[features] != 0).all(axis=1)]
+FEATURES = ['tempo', 'danceability', 'energy', 'valence']
+ID_COLUMN = 'track_id'
+TITLE_COLUMNS = ('track_name', 'name', 'title')
+ARTIST_COLUMNS = ('artists', 'artist_name', 'artist')
+# Largest per-feature gap, as a share of that feature's range, at which two rows with the same
+# normalized title and artist still count as one song (remaster, re-release, compilation copy).
+DEDUPE_TOLERANCE = 0.03
 
-    data = audio_features[features].copy()
+def filter_audio_features(audio_features):
+    audio_features = audio_features.dropna(subset=FEATURES)
+    audio_features = audio_features[(audio_features[FEATURES] != 0).all(axis=1)]
+    return audio_features
+
+def to_normalized_frame(audio_features, data):
+    normalized_df = pd.DataFrame(data, columns=FEATURES)
+    if ID_COLUMN in audio_features.columns:
+        normalized_df.insert(0, ID_COLUMN, audio_features[ID_COLUMN].to_numpy())
+    return normalized_df
+
+def text_columns(audio_features):
+    """Names of the title and artist columns in a raw catalog, or None where it has none."""
+    title = next((column for column in TITLE_COLUMNS if column in audio_features.columns), None)
+    artist = next((column for column in ARTIST_COLUMNS if column in audio_features.columns), None)
+    return title, artist
+
+def _normalized_keys(values) -> np.ndarray:
+    """normalize_text over a column, computed once per distinct value."""
+    values = pd.Series(values).fillna("").astype(str)
+    unique = values.unique()
+    return values.map(dict(zip(unique, map(normalize_text, unique)))).to_numpy()
+
+def _near_duplicates(features, rows, tolerance) -> np.ndarray:
+    """Rows in one block (given in original order) that sit within tolerance of an earlier kept row.
+
+    A KD-tree finds every pair of rows within tolerance on all features at once, so the cost follows
+    the number of close pairs rather than the square of the block size. Only those pairs are then
+    walked in row order to decide which copy is kept.
+    """
+    pairs = KDTree(features[rows]).query_pairs(tolerance, p=np.inf, output_type="ndarray")
+    kept = np.ones(len(rows), dtype=bool)
+    # By the time a row's pairs come up, every earlier row in them is already settled.
+    for earlier, later in pairs[np.lexsort((pairs[:, 0], pairs[:, 1]))].tolist():
+        if kept[earlier]:
+            kept[later] = False
+    return rows[~kept]
+
+def dedupe_tracks(audio_features, tolerance=DEDUPE_TOLERANCE, return_report=False):
+    """Drop repeated rows of the same song, keeping the first occurrence.
+
+    Exact pass: rows repeating a track id, or the same normalized title, artist and features, are
+    removed by hashing. Near pass: the remaining rows are blocked on normalized title and artist
+    (version suffixes and featured artists stripped), and only rows inside one block are compared,
+    so cost grows with block sizes rather than the catalog. Without title/artist columns only
+    repeated track ids are dropped; equal features alone do not make two tracks the same song.
+    """
+    rows_in = len(audio_features)
+    keep = np.ones(rows_in, dtype=bool)
+    title, artist = text_columns(audio_features)
+
+    if ID_COLUMN in audio_features.columns:
+        keep &= ~audio_features[ID_COLUMN].duplicated().to_numpy()
+    has_text = title is not None and artist is not None
+    if has_text:
+        keys = pd.DataFrame(audio_features[FEATURES].to_numpy(), columns=FEATURES)
+        keys["title"] = _normalized_keys(audio_features[title])
+        keys["artist"] = _normalized_keys(audio_features[artist])
+        keep &= ~keys.duplicated().to_numpy()
+    exact = rows_in - int(keep.sum())
+
+    near = 0
+    if has_text and keep.any():
+        features = keys[FEATURES].to_numpy(dtype=np.float64)
+        spread = features[keep].max(axis=0) - features[keep].min(axis=0)
+        features = features / np.where(spread > 0, spread, 1.0)
+        candidates = np.flatnonzero(keep)
+        blocks = keys.iloc[candidates].groupby(["title", "artist"], sort=False).indices
+        for members in blocks.values():
+            if len(members) > 1:
+                dropped = _near_duplicates(features, candidates[members], tolerance)
+                keep[dropped] = False
+                near += len(dropped)
+
+    report = {
+        "rows_in": rows_in,
+        "exact_duplicates": exact,
+        "near_duplicates": near,
+        "rows_out": rows_in - exact - near,
+        "shrink": round((exact + near) / rows_in, 4) if rows_in else 0.0,
+    }
+    logger.info("[Dedupe] %d -> %d rows (%d exact, %d near duplicates, %.1f%% smaller)",
+                rows_in, report["rows_out"], exact, near, 100 * report["shrink"])
+    deduped = audio_features[keep]
+    return (deduped, report) if return_report else deduped
+
+def normalize_audio_features(audio_features=None, return_scaler=False, workers=None, dedupe=True):
+    if isinstance(audio_features, (str, os.PathLike, list, tuple)):
+        from echoseed.ai.preprocessing.shards import preprocess_shards
+
+        normalized_df, min_max_scaler = preprocess_shards(audio_features, workers, dedupe=dedupe)
+        return (normalized_df, min_max_scaler) if return_scaler else normalized_df
+    if audio_features is None:
+        audio_features = load_spotify_dataset()
+    audio_features = filter_audio_features(audio_features)
+
+    # The scaler sees every row so its range does not depend on which copy of a song was kept.
     min_max_scaler = MinMaxScaler(feature_range=(1, 10))
-    data = min_max_scaler.fit_transform(data)
+    min_max_scaler.fit(audio_features[FEATURES])
+    if dedupe:
+        audio_features = dedupe_tracks(audio_features)
+    data = min_max_scaler.transform(audio_features[FEATURES])
 
-    normalized_df = pd.DataFrame(data, columns=features)
+    normalized_df = to_normalized_frame(audio_features, data)
+    if return_scaler:
+        return normalized_df, min_max_scaler
     return normalized_df
 
 if __name__ == "__main__":
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler
+from echoseed.ai.artifacts import get_registry
+from echoseed.ai.preprocessing.load_datasets import resolve_raw_inputs
+from echoseed.ai.preprocessing.normalize_features import (
+    ARTIST_COLUMNS, FEATURES, ID_COLUMN, TITLE_COLUMNS, dedupe_tracks, filter_audio_features, text_columns,
+    to_normalized_frame
+)
+
+logger = logging.getLogger("echoseed.shards")
+
+MANIFEST_NAME = "manifest.json"
+# Bumped whenever the cached shard layout changes, so older caches are rescanned.
+CACHE_VERSION = 2
+
+
+def _signature(path) -> list:
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+def _cache_name(path) -> str:
+    digest = hashlib.sha1(str(Path(path).resolve()).encode()).hexdigest()[:12]
+    return f"{Path(path).stem}-{digest}.npz"
+
+def scan_shard(path, cache_path) -> dict:
+    """Read one shard's id, title, artist and feature columns, drop unusable rows, cache them and return their stats.
+
+    Runs in a worker process; only the path goes in and a few numbers come back.
+    """
+    wanted = set(FEATURES) | {ID_COLUMN} | set(TITLE_COLUMNS) | set(ARTIST_COLUMNS)
+    df = pd.read_csv(path, usecols=lambda column: column in wanted)
+    missing = [feature for feature in FEATURES if feature not in df.columns]
+    if missing:
+        raise ValueError(f"Shard {path} is missing columns {missing}")
+    df = filter_audio_features(df)
+    features = df[FEATURES].to_numpy(dtype=np.float64)
+    ids = df[ID_COLUMN].to_numpy() if ID_COLUMN in df.columns else np.empty(0, dtype=str)
+    if ids.dtype == object:
+        ids = ids.astype(str)
+    title, artist = text_columns(df)
+    text = {
+        name: df[column].fillna("").astype(str).to_numpy(dtype=str) if column else np.empty(0, dtype=str)
+        for name, column in (("titles", title), ("artists", artist))
+    }
+
+    tmp_path = f"{cache_path}.tmp.npz"
+    np.savez(tmp_path, ids=ids, features=features, **text)
+    os.replace(tmp_path, cache_path)
+    return {
+        "rows": len(df),
+        "min": features.min(axis=0).tolist() if len(df) else None,
+        "max": features.max(axis=0).tolist() if len(df) else None,
+    }
+
+
+class ShardManifest:
+    """Which raw shards have been scanned, with the signature, cache file and partial stats of each."""
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = Path(cache_dir or get_registry().path("shard_cache"))
+        self.path = self.cache_dir / MANIFEST_NAME
+        self.entries = {}
+        if self.path.exists():
+            with open(self.path, "r") as f:
+                self.entries = json.load(f)
+
+    def is_current(self, path) -> bool:
+        entry = self.entries.get(str(Path(path).resolve()))
+        return (entry is not None and entry["signature"] == _signature(path)
+                and entry.get("version") == CACHE_VERSION and (self.cache_dir / entry["cache"]).exists())
+
+    def record(self, path, cache, stats):
+        self.entries[str(Path(path).resolve())] = {
+            "signature": _signature(path), "version": CACHE_VERSION, "cache": cache, **stats
+        }
+
+    def entry(self, path) -> dict:
+        return self.entries[str(Path(path).resolve())]
+
+    def save(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def merge_scaler(stats, feature_range=(1, 10)) -> MinMaxScaler:
+    """A MinMaxScaler identical to one fitted on every shard's rows at once, built from per-shard min/max."""
+    stats = [entry for entry in stats if entry["rows"]]
+    if not stats:
+        raise ValueError("No usable rows in any shard")
+    scaler = MinMaxScaler(feature_range=feature_range)
+    for entry in stats:
+        scaler.partial_fit(pd.DataFrame([entry["min"], entry["max"]], columns=FEATURES))
+    scaler.n_samples_seen_ = sum(entry["rows"] for entry in stats)
+    return scaler
+
+def preprocess_shards(source=None, workers=None, cache_dir=None, dedupe=True):
+    """Normalize a sharded raw catalog; returns (normalized_df, scaler) like normalize_audio_features.
+
+    New or changed shards are scanned in parallel worker processes; the rest come from the cache
+    recorded in the shard manifest. The merged scaler, and so the output, matches normalizing the
+    concatenation of all shards (in sorted order) as one file. Duplicates are removed across shards.
+    """
+    paths = resolve_raw_inputs(source)
+    manifest = ShardManifest(cache_dir)
+    os.makedirs(manifest.cache_dir, exist_ok=True)
+
+    pending = [path for path in paths if not manifest.is_current(path)]
+    logger.info("[Shards] %d shards, %d to scan", len(paths), len(pending))
+    if pending:
+        with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(pending))) as executor:
+            futures = {path: executor.submit(scan_shard, path, manifest.cache_dir / _cache_name(path))
+                       for path in pending}
+            try:
+                for path, future in futures.items():
+                    manifest.record(path, _cache_name(path), future.result())
+            finally:
+                manifest.save()
+
+    entries = [manifest.entry(path) for path in paths]
+    scaler = merge_scaler(entries)
+    columns = {"ids": [], "features": [], "titles": [], "artists": []}
+    for entry in entries:
+        with np.load(manifest.cache_dir / entry["cache"], allow_pickle=False) as arrays:
+            for name in columns:
+                columns[name].append(arrays[name])
+
+    features = columns.pop("features")
+    raw = pd.DataFrame(np.concatenate(features), columns=FEATURES)
+    for name, column in ((TITLE_COLUMNS[0], "titles"), (ARTIST_COLUMNS[0], "artists"), (ID_COLUMN, "ids")):
+        if all(len(values) == len(shard) for values, shard in zip(columns[column], features)):
+            raw.insert(0, name, np.concatenate(columns[column]))
+    if dedupe:
+        raw = dedupe_tracks(raw)
+    normalized_df = to_normalized_frame(raw, scaler.transform(raw[FEATURES]))
+    return normalized_df, scaler
@@ -0,0 +1,102 @@
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+logger = logging.getLogger("echoseed.stages")
+
+
+class StageDAG:
+    """Runs named stages as soon as the stages they depend on have finished.
+
+    Each stage function receives its dependencies' results as keyword arguments. When a
+    stage fails, everything downstream of it is skipped, stages already running are allowed
+    to finish, and the first error is re-raised from run().
+    """
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self.stages = {}
+        self.timings = {}
+        self.skipped = []
+        self.critical_path = []
+        self.critical_path_seconds = 0.0
+
+    def add(self, name, func, depends_on=()):
+        for dependency in depends_on:
+            if dependency not in self.stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dependency}'")
+        self.stages[name] = (func, tuple(depends_on))
+        return self
+
+    def _downstream(self, failed) -> set:
+        blocked = {failed}
+        changed = True
+        while changed:
+            changed = False
+            for name, (_, depends_on) in self.stages.items():
+                if name not in blocked and blocked.intersection(depends_on):
+                    blocked.add(name)
+                    changed = True
+        blocked.discard(failed)
+        return blocked
+
+    def _run_stage(self, name, func, kwargs):
+        started = time.perf_counter()
+        try:
+            return func(**kwargs)
+        finally:
+            self.timings[name] = (started, time.perf_counter())
+
+    def run(self) -> dict:
+        results = {}
+        remaining = dict(self.stages)
+        running = {}
+        error = None
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="echoseed-stage") as executor:
+            while remaining or running:
+                for name, (func, depends_on) in list(remaining.items()):
+                    if all(dependency in results for dependency in depends_on):
+                        kwargs = {dependency: results[dependency] for dependency in depends_on}
+                        running[executor.submit(self._run_stage, name, func, kwargs)] = name
+                        del remaining[name]
+
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        logger.error("[StageDAG] Stage '%s' failed: %s", name, e)
+                        error = error or e
+                        for blocked in self._downstream(name):
+                            if remaining.pop(blocked, None) is not None:
+                                self.skipped.append(blocked)
+
+        self._record_critical_path()
+        if error is not None:
+            raise error
+        return results
+
+    def _record_critical_path(self):
+        """Walk back from the last stage to finish through whichever dependency finished last."""
+        if not self.timings:
+            return
+        current = max(self.timings, key=lambda name: self.timings[name][1])
+        path = [current]
+        while True:
+            finished = [dependency for dependency in self.stages[current][1] if dependency in self.timings]
+            if not finished:
+                break
+            current = max(finished, key=lambda name: self.timings[name][1])
+            path.append(current)
+
+        self.critical_path = path[::-1]
+        self.critical_path_seconds = sum(end - start for start, end in (self.timings[name] for name in path))
+        first = min(start for start, _ in self.timings.values())
+        last = max(end for _, end in self.timings.values())
+        serial = sum(end - start for start, end in self.timings.values())
+        logger.info("[StageDAG] Critical path %s: %.3fs (wall %.3fs, stages sum %.3fs)",
+                    " -> ".join(self.critical_path), self.critical_path_seconds, last - first, serial)
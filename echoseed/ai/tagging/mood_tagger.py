@@ -1,25 +1,47 @@
 import json
 import os
-import pandas as pd
 import re
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from dotenv import load_dotenv
 from google import genai
+from echoseed.ai.artifacts import get_registry
+from echoseed.ai.latency import LLM_TIMEOUT, Deadline, call_with_deadline
+from echoseed.ai.mood_pools import refresh_mood_pools
+from echoseed.ai.preprocessing.normalize_features import FEATURES, ID_COLUMN
+from echoseed.ai.tagging.sampling import cluster_centroids, representative_indices
+from echoseed.profiling import profiled
 
 load_dotenv()
 
+BATCH_SIZE = 50
+MAX_WORKERS = 8
+
 class MoodTagger:
-    def __init__(self, client = genai.Client()):
-        self.client = client
+    def __init__(self, client = None, registry=None, timeout: float = LLM_TIMEOUT, hedge: bool = False):
+        self.client = client or genai.Client()
+        self.registry = registry or get_registry()
+        self.timeout = timeout
+        self.hedge = hedge
 
+    @profiled()
     def get_clusters(self) -> dict:
-        base_dir = Path(__file__).resolve().parents[2]
-        csv_path = base_dir / "data" / "processed" / "clustered_tracks.csv"
+        """Tracks per cluster, with the representative sample first so prompts see it."""
+        df = self.registry.load("dataset")
+        try:
+            model = self.registry.load("model")
+        except FileNotFoundError:
+            model = None
+
+        samples = representative_indices(
+            df[FEATURES].to_numpy(), df["cluster"].to_numpy(dtype=int), cluster_centroids(df, model)
+        )
 
-        df = pd.read_csv(csv_path)
         clusters = {}
-        for cluster, group in df.groupby("cluster"):
-            clusters[int(cluster)] = group.to_dict(orient="records")
+        for cluster, positions in df.groupby("cluster").indices.items():
+            sample = samples[int(cluster)]
+            rest = np.setdiff1d(positions, sample, assume_unique=True)
+            clusters[int(cluster)] = df.iloc[np.concatenate((sample, rest))].to_dict(orient="records")
 
         return clusters
 
@@ -31,22 +53,92 @@ class MoodTagger:
         prompt += "\nReply with just one lowercase mood label (e.g., 'chill', 'hype', 'romantic', 'sad').\nMood:"
         return prompt
 
+    def generate_batch_prompt(self, clusters) -> str:
+        prompt = ("Assign a single mood to each of the following playlists based on audio features.\n"
+                  "Reply with a JSON object mapping each playlist id to one lowercase mood label "
+                  "(e.g., 'chill', 'hype', 'romantic', 'sad').\n\n")
+        for cluster, tracks in clusters.items():
+            prompt += f"Playlist {cluster}:\n"
+            for i, track in enumerate(tracks[:8]):
+                prompt += (f"  Track {i + 1}: tempo={track['tempo']}, danceability={track['danceability']}, "
+                           f"energy={track['energy']}, valence={track['valence']}\n")
+        return prompt
+
+    def _response_text(self, response) -> str:
+        if isinstance(response, dict):
+            return response["candidates"][0]["content"]["parts"][0]["text"]
+        return response.text
+
+    @profiled()
     def get_gpt_label(self, prompt, model="gemini-2.5-flash") -> str:
         response = self.client.models.generate_content(model=model, contents=prompt)
-        first_candidate = response["candidates"][0]
-        text_response = first_candidate["content"]["parts"][0]["text"]
+        text_response = self._response_text(response)
 
         match = re.search(r"\bmood (is|:)\s*(\w+)", text_response.lower())
         label = match.group(2) if match else "unknown"
         return label
 
+    @profiled()
+    def get_batch_labels(self, clusters, model="gemini-2.5-flash") -> dict:
+        """Label many clusters with one structured-output request."""
+        response = self.client.models.generate_content(
+            model=model,
+            contents=self.generate_batch_prompt(clusters),
+            config={"response_mime_type": "application/json"}
+        )
+        labels = json.loads(self._response_text(response))
+        return {
+            int(cluster): str(label).strip().lower()
+            for cluster, label in labels.items()
+            if str(cluster).lstrip("-").isdigit() and int(cluster) in clusters and label
+        }
+
+    @profiled()
+    def label_cluster(self, cluster, tracks) -> str:
+        prompt = self.generate_prompt(tracks)
+        try:
+            label, _ = call_with_deadline(lambda: self.get_gpt_label(prompt), self.timeout, self.hedge)
+            print(f"GPT label for cluster {cluster}: {label}")
+        except Exception:
+            print(f"Falling back for cluster {cluster}")
+            label = self.fallback_label(tracks)
+            print(f"Label {label}")
+        return label
+
+    @profiled()
+    def tag_clusters(self, clusters, batch=True) -> dict:
+        """Label clusters in concurrent batched prompts, then fan out per cluster for anything missed."""
+        labels = {}
+        executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+        try:
+            if batch:
+                ids = list(clusters)
+                chunks = [{c: clusters[c] for c in ids[i:i + BATCH_SIZE]} for i in range(0, len(ids), BATCH_SIZE)]
+                deadline = Deadline(self.timeout)
+                for chunk, future in [(chunk, executor.submit(self.get_batch_labels, chunk)) for chunk in chunks]:
+                    try:
+                        labels.update(future.result(timeout=deadline.remaining()))
+                    except Exception as e:
+                        print(f"Batch tagging failed for clusters {list(chunk)}: {e or 'timed out'}")
+
+            missing = [cluster for cluster in clusters if cluster not in labels]
+            futures = {cluster: executor.submit(self.label_cluster, cluster, clusters[cluster]) for cluster in missing}
+            for cluster, future in futures.items():
+                labels[cluster] = future.result()
+        finally:
+            # Batch requests that missed the deadline are left to finish on their own.
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return labels
+
     def get_cached_label(self, cluster_id, cache) -> str:
         return cache.get(str(cluster_id), None)
 
-    def cache_result(self, cluster_id, mood_label, cache, cache_file):
-        cache[str(cluster_id)] = mood_label
-        with open(cache_file, 'w') as f:
-            json.dump(cache, f, indent=2)
+    def write_json(self, data, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
 
     def fallback_label(self, tracks) -> str:
         # Average feature values across the cluster
@@ -67,9 +159,10 @@ class MoodTagger:
         else:
             return "moody"
 
-    def main(self):
-        cache_file = "mood_cache.json"
-        output_file = "cluster_mood_map.json"
+    @profiled()
+    def main(self, batch=True):
+        cache_file = self.registry.path("mood_cache")
+        output_file = self.registry.path("mood_map")
 
         if os.path.exists(cache_file):
             with open(cache_file) as f:
@@ -79,26 +172,36 @@ class MoodTagger:
 
         clusters = self.get_clusters()
         result = {}
+        uncached = {}
 
         for cluster, tracks in clusters.items():
             label = self.get_cached_label(cluster, cache)
             if label:
                 print(f"Using cached label for cluster {cluster}")
+                result[cluster] = label
             else:
-                prompt = self.generate_prompt(tracks)
-                try:
-                    label = self.get_gpt_label(prompt)
-                    print(f"GPT label for cluster {cluster}: {label}")
-                except:
-                    print(f"Falling back for cluster {cluster}")
-                    label = self.fallback_label(tracks)
-                    print(f"Label {label}")
-                self.cache_result(cluster, label, cache, cache_file)
-
-            result[cluster] = label
-
-        with open(output_file, "w") as f:
-            json.dump(result, f, indent=2)
+                uncached[cluster] = tracks
+
+        if uncached:
+            new_labels = self.tag_clusters(uncached, batch=batch)
+            for cluster, label in new_labels.items():
+                cache[str(cluster)] = label
+            result.update(new_labels)
+            self.write_json(cache, cache_file)
+
+        result = {cluster: result[cluster] for cluster in clusters}
+        self.write_json(result, output_file)
+        self.precompute_pools(result)
+
+        self.registry.publish()
+
+    @profiled()
+    def precompute_pools(self, mood_map):
+        """Materialize mood -> track pools so playlists can be drawn locally."""
+        if refresh_mood_pools(self.registry, mood_map):
+            print(f"Saved track pools for {len(set(mood_map.values()))} moods")
+        else:
+            print(f"Dataset has no {ID_COLUMN} column; skipping mood pools")
 
 if __name__ == "__main__":
     tagger = MoodTagger()
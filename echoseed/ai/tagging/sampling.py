@@ -0,0 +1,40 @@
+import numpy as np
+from echoseed.ai.preprocessing.normalize_features import FEATURES
+
+def representative_indices(features, labels, centroids, n_closest=5, n_spread=3) -> dict:
+    """Row indices per cluster: the n_closest tracks to the centroid plus n_spread spaced out by distance.
+
+    Distances for every cluster are computed in a single vectorized pass.
+    """
+    features = np.asarray(features, dtype=float)
+    labels = np.asarray(labels)
+    distances = np.linalg.norm(features - centroids[labels], axis=1)
+
+    # Group rows by cluster, nearest first within each group.
+    order = np.lexsort((distances, labels))
+    sorted_labels = labels[order]
+    boundaries = np.flatnonzero(np.diff(sorted_labels)) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [len(order)]))
+
+    samples = {}
+    for start, end in zip(starts, ends):
+        members = order[start:end]
+        closest = members[:n_closest]
+        rest = members[n_closest:]
+        if len(rest) and n_spread:
+            picks = np.unique(np.linspace(0, len(rest) - 1, n_spread).round().astype(int))
+            spread = rest[picks]
+        else:
+            spread = rest[:0]
+        samples[int(sorted_labels[start])] = np.concatenate((closest, spread))
+    return samples
+
+def cluster_centroids(df, model=None):
+    """Fitted k-means centroids, or per-cluster feature means when no model is available."""
+    if model is not None:
+        return np.asarray(model.cluster_centers_)
+    means = df.groupby("cluster")[FEATURES].mean()
+    centroids = np.zeros((int(means.index.max()) + 1, len(FEATURES)))
+    centroids[means.index.to_numpy(dtype=int)] = means.to_numpy()
+    return centroids
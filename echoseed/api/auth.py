@@ -1,12 +1,11 @@
 import os
 import logging
-import threading
-import time
 import webbrowser
 from dotenv import load_dotenv
 from pathlib import Path
-from flask import Flask, request
+from urllib.parse import urlparse
 from spotipy import SpotifyOAuth, Spotify
+from echoseed.api.callback_server import OAuthCallbackServer
 
 load_dotenv()
 
@@ -15,11 +14,12 @@ CLIENT_SECRET = os.getenv("SPOTIFY_CLIENT_SECRET")
 REDIRECT_URI = os.getenv("SPOTIFY_REDIRECT_URI")
 SCOPE = "playlist-read-private playlist-modify-private playlist-modify-public"
 TIMEOUT_SECONDS = 60
+HEADLESS = os.getenv("ECHOSEED_HEADLESS_AUTH", "").lower() in ("1", "true", "yes")
 
 logger = logging.getLogger("echoseed.auth")
 
 class SpotifyAuthService:
-    def __init__(self):
+    def __init__(self, headless: bool = HEADLESS):
         self.auth_manager = SpotifyOAuth(
             client_id=CLIENT_ID,
             client_secret=CLIENT_SECRET,
@@ -32,17 +32,7 @@ class SpotifyAuthService:
         self.spotify = None
         self.auth_code = None
         self.token_info = None
-        self._app = Flask(__name__)
-        self._app.add_url_rule('/callback', view_func=self._callback, methods=['GET'])
-
-    def _callback(self):
-        self.auth_code = request.args.get("code")
-        if self.auth_code:
-            logger.info("Received authorization code: %s", self.auth_code)
-            return "Authentication successful! You can close this window."
-        else:
-            logger.error("No authorization code received")
-            return "Authentication failed."
+        self.headless = headless
 
     def authenticate(self):
         cached_token = self.auth_manager.get_cached_token()
@@ -52,32 +42,45 @@ class SpotifyAuthService:
             self.spotify = Spotify(auth=cached_token["access_token"])
             return
 
-        logger.info("[SpotifyAuthService] No cached token found. Starting browser auth flow...")
-        self._do_browser_auth()
+        if self.headless:
+            logger.info("[SpotifyAuthService] No cached token found. Starting headless auth flow...")
+            self._do_headless_auth()
+        else:
+            logger.info("[SpotifyAuthService] No cached token found. Starting browser auth flow...")
+            self._do_browser_auth()
 
     def _do_browser_auth(self):
         """Run browser OAuth flow and save tokens into cache."""
-        server_thread = threading.Thread(
-            target=lambda: self._app.run(port=8888, debug=False, use_reloader=False)
-        )
-        server_thread.start()
-
+        redirect = urlparse(REDIRECT_URI or "http://127.0.0.1:8888/callback")
         auth_url = self.auth_manager.get_authorize_url()
-        logger.info(f"[SpotifyAuthService] Opening {auth_url} in your browser...")
-        time.sleep(3)
-        webbrowser.open(auth_url)
 
-        # Wait for auth code
-        start = time.time()
-        while not self.auth_code and (time.time() - start) < TIMEOUT_SECONDS:
-            time.sleep(1)
+        with OAuthCallbackServer(
+            host=redirect.hostname or "127.0.0.1",
+            port=redirect.port or 8888,
+            callback_path=redirect.path or "/callback"
+        ) as callback_server:
+            logger.info(f"[SpotifyAuthService] Opening {auth_url} in your browser...")
+            webbrowser.open(auth_url)
+            self.auth_code = callback_server.wait_for_code(timeout=TIMEOUT_SECONDS)
 
         if not self.auth_code:
             logger.error("[SpotifyAuthService] Authentication timed out after %s seconds", TIMEOUT_SECONDS)
             raise RuntimeError("Authentication timed out")
 
-        logger.info("Shutting down server thread... (manual kill needed for Flask)")
+        self._exchange_code()
+
+    def _do_headless_auth(self):
+        """Device-style flow for servers: the user opens the URL elsewhere and pastes the redirect back."""
+        auth_url = self.auth_manager.get_authorize_url()
+        print(f"Open this URL on any device and log in:\n{auth_url}")
+        redirected_url = input("Paste the URL you were redirected to: ").strip()
+        self.auth_code = self.auth_manager.parse_response_code(redirected_url)
+        if not self.auth_code or self.auth_code == redirected_url:
+            raise RuntimeError("No authorization code found in redirect URL")
+
+        self._exchange_code()
 
+    def _exchange_code(self):
         self.token_info = self.auth_manager.get_access_token(self.auth_code)
         self.spotify = Spotify(auth=self.token_info["access_token"])
         logger.info("[SpotifyAuthService] Access + Refresh token obtained and cached.")
@@ -0,0 +1,93 @@
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlparse, parse_qs
+
+logger = logging.getLogger("echoseed.callback_server")
+
+
+class _CallbackHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if parsed.path != self.server.callback_path:
+            self.send_error(404)
+            return
+
+        params = parse_qs(parsed.query)
+        code = params.get("code", [None])[0]
+        error = params.get("error", [None])[0]
+
+        if code:
+            body = "Authentication successful! You can close this window."
+            self.send_response(200)
+        else:
+            body = "Authentication failed."
+            self.send_response(400)
+
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.end_headers()
+        self.wfile.write(body.encode())
+        self.server.listener._deliver(code, error)
+
+    def log_message(self, format, *args):
+        logger.debug("[OAuthCallbackServer] " + format, *args)
+
+
+class OAuthCallbackServer:
+    """Single-shot HTTP listener that hands the OAuth code over through an event."""
+
+    def __init__(self, host="127.0.0.1", port=8888, callback_path="/callback"):
+        self.host = host
+        self.port = port
+        self.callback_path = callback_path
+        self.code = None
+        self.error = None
+        self._received = threading.Event()
+        self._server = None
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def start(self):
+        # Bind synchronously so the socket is accepting before the browser opens.
+        self._server = HTTPServer((self.host, self.port), _CallbackHandler)
+        self._server.callback_path = self.callback_path
+        self._server.listener = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            kwargs={"poll_interval": 0.05},
+            name="oauth-callback",
+            daemon=True
+        )
+        self._thread.start()
+        logger.info("[OAuthCallbackServer] Listening on http://%s:%s%s", self.host, self.port, self.callback_path)
+
+    def _deliver(self, code, error=None):
+        if self._received.is_set():
+            return
+        self.code = code
+        self.error = error
+        self._received.set()
+
+    def wait_for_code(self, timeout=None):
+        if not self._received.wait(timeout):
+            return None
+        if not self.code:
+            raise RuntimeError(f"Authorization failed: {self.error or 'no code received'}")
+        return self.code
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join(timeout=5)
+        self._server = None
+        self._thread = None
+        logger.info("[OAuthCallbackServer] Callback server stopped.")
@@ -0,0 +1,79 @@
+import logging
+import os
+import threading
+import time
+import unicodedata
+from echoseed.model.playlist import Playlist
+
+logger = logging.getLogger("echoseed.playlist_index")
+
+# Seconds before the whole index is re-paged from Spotify.
+INDEX_TTL = float(os.getenv("ECHOSEED_PLAYLIST_INDEX_TTL", "600"))
+
+
+def normalize_name(name: str) -> str:
+    """Lookup key for a playlist name: NFKC-normalized, casefolded, whitespace collapsed."""
+    return " ".join(unicodedata.normalize("NFKC", name or "").casefold().split())
+
+
+class PlaylistIndex:
+    """In-memory name -> playlist map for one user, rebuilt from a single paginated sweep."""
+
+    def __init__(self, ttl: float = INDEX_TTL):
+        self.ttl = ttl
+        self._by_name = {}
+        self._by_id = {}
+        self._built_at = None
+        self._lock = threading.Lock()
+
+    def is_stale(self) -> bool:
+        return self._built_at is None or time.monotonic() - self._built_at > self.ttl
+
+    def rebuild(self, playlists):
+        by_name = {}
+        by_id = {}
+        for playlist in playlists:
+            # The first playlist with a given name wins, matching Spotify's listing order.
+            by_name.setdefault(normalize_name(playlist.name), playlist)
+            by_id[playlist.id] = playlist
+        with self._lock:
+            self._by_name = by_name
+            self._by_id = by_id
+            self._built_at = time.monotonic()
+        logger.info("[PlaylistIndex] Indexed %d playlists", len(by_id))
+
+    def invalidate(self):
+        with self._lock:
+            self._built_at = None
+
+    def get(self, name: str) -> Playlist:
+        with self._lock:
+            return self._by_name.get(normalize_name(name))
+
+    def add(self, playlist: Playlist):
+        with self._lock:
+            previous = self._by_id.get(playlist.id)
+            if previous and self._by_name.get(normalize_name(previous.name)) is previous:
+                del self._by_name[normalize_name(previous.name)]
+            self._by_id[playlist.id] = playlist
+            self._by_name.setdefault(normalize_name(playlist.name), playlist)
+
+    def remove(self, playlist_id: str):
+        with self._lock:
+            playlist = self._by_id.pop(playlist_id, None)
+            if playlist and self._by_name.get(normalize_name(playlist.name)) is playlist:
+                del self._by_name[normalize_name(playlist.name)]
+
+    def __len__(self):
+        return len(self._by_id)
+
+    @classmethod
+    def for_user(cls, user_id: str) -> "PlaylistIndex":
+        with _indexes_lock:
+            if user_id not in _indexes:
+                _indexes[user_id] = cls()
+            return _indexes[user_id]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
@@ -1,66 +1,143 @@
+import asyncio
 import logging
-import time
 import random
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Iterator, List
+import numpy as np
 from spotipy import Spotify
 from spotipy.exceptions import SpotifyException
 from echoseed.api.auth import SpotifyAuthService
+from echoseed.api.playlist_index import PlaylistIndex, normalize_name
+from echoseed.ai.ordering import order_track_uris
+from echoseed.ai.feature_store import get_feature_store
 
 from echoseed.model.track import Track
 from echoseed.model.playlist import Playlist
+from echoseed.model.track_collection import TrackCollection
+from echoseed.profiling import profiled
 
 logger = logging.getLogger(__name__)
 
+CHUNK_SIZE = 100
+PAGE_WORKERS = 4
+TRACK_FIELDS = "items(track(id,name,uri,artists(name))),next,total"
+
+_DONE = object()
+
+async def _aiterate(iterator):
+    """Drive a blocking iterator from asyncio, one next() per worker-thread hop."""
+    try:
+        while True:
+            item = await asyncio.to_thread(next, iterator, _DONE)
+            if item is _DONE:
+                break
+            yield item
+    finally:
+        iterator.close()
+
 class SpotifyPlaylistService:
+    @profiled()
     def __init__(self, spotify_client: Spotify):
         self.spotify = spotify_client
         self.user_id = self.spotify.me()["id"]
         logger.info("Initialized SpotifyPlaylistService")
 
+    def _iter_pages(self, fetch, limit):
+        """Yield items page by page while the next page is fetched on a background thread."""
+        executor = ThreadPoolExecutor(max_workers=1)
+        offset = 0
+        pending = executor.submit(fetch, limit, offset)
+        try:
+            while pending:
+                response = pending.result()
+                items = response.get("items") or []
+                pending = None
+                if items and response.get("next"):
+                    offset += limit
+                    pending = executor.submit(fetch, limit, offset)
+                yield from items
+        finally:
+            # Stopping early leaves at most one request in flight; its result is dropped.
+            if pending:
+                pending.cancel()
+            executor.shutdown(wait=False)
+
+    def iter_user_playlists(self, user_id: str = None) -> Iterator[Playlist]:
+        """Stream the current user's playlists, or another user's public ones when user_id is given."""
+        if user_id:
+            fetch = lambda limit, offset: self.spotify.user_playlists(user_id, limit=limit, offset=offset)
+        else:
+            fetch = lambda limit, offset: self.spotify.current_user_playlists(limit=limit, offset=offset)
+
+        for item in self._iter_pages(fetch, 50):
+            if item and item.get("name"):
+                yield Playlist(
+                    id=item["id"],
+                    name=item["name"],
+                    owner_id=item["owner"]["id"] if item.get("owner") else "unknown",
+                    snapshot_id=item.get("snapshot_id")
+                )
+
+    def iter_playlist_items(self, playlist_id: str) -> Iterator[dict]:
+        """Stream raw playlist item payloads, skipping removed or unavailable tracks."""
+        fetch = lambda limit, offset: self.spotify.playlist_items(playlist_id, limit=limit, offset=offset)
+        for item in self._iter_pages(fetch, 100):
+            if item.get("track"):
+                yield item["track"]
+
+    def iter_playlist_tracks(self, playlist_id: str) -> Iterator[Track]:
+        for track_info in self.iter_playlist_items(playlist_id):
+            artists = track_info.get("artists") or [{}]
+            yield Track(id=track_info["id"], name=track_info["name"], artist=artists[0].get("name", ""))
+
+    async def aiter_playlist_tracks(self, playlist_id: str) -> AsyncIterator[Track]:
+        """Async variant of iter_playlist_tracks; page requests run off the event loop."""
+        async for track in _aiterate(self.iter_playlist_tracks(playlist_id)):
+            yield track
+
+    async def aiter_user_playlists(self, user_id: str = None) -> AsyncIterator[Playlist]:
+        async for playlist in _aiterate(self.iter_user_playlists(user_id)):
+            yield playlist
+
+    def _is_current(self, index: PlaylistIndex, playlist: Playlist) -> bool:
+        """One-request check of an indexed playlist; a new snapshot_id means it changed since indexing."""
+        try:
+            current = self.spotify.playlist(playlist.id, fields="name,snapshot_id")
+        except SpotifyException:
+            index.remove(playlist.id)
+            return False
+        if current.get("snapshot_id") == playlist.snapshot_id:
+            return True
+
+        index.add(Playlist(playlist.id, current["name"], playlist.owner_id, current.get("snapshot_id")))
+        return normalize_name(current["name"]) == normalize_name(playlist.name)
+
+    @profiled()
     def get_playlist_id(self, playlist_name):
         if not self.user_id:
            logger.error("No User Id passed in")
 
-        results = self.spotify.user_playlists(self.user_id)
-        while results:
-            for playlist in results["items"]:
-                if playlist["name"].lower() == playlist_name.lower():
-                    print(f"Found playlist '{playlist_name}' (ID: {playlist['id']})")
-                    return playlist["id"]
+        index = PlaylistIndex.for_user(self.user_id)
+        if index.is_stale():
+            index.rebuild(self.iter_user_playlists(self.user_id))
 
-            if results["next"]:
-                results = self.spotify.next(results)
-            else:
-                results = None
+        playlist = index.get(playlist_name)
+        if playlist and not self._is_current(index, playlist):
+            # Renamed or deleted since the sweep; re-page once.
+            index.rebuild(self.iter_user_playlists(self.user_id))
+            playlist = index.get(playlist_name)
 
-            print(f"⚠️ Playlist '{playlist_name}' not found.")
-            return None
+        if playlist:
+            print(f"Found playlist '{playlist_name}' (ID: {playlist.id})")
+            return playlist.id
 
-    def get_user_playlists(self) -> List[Playlist]:
-        playlists = []
-        offset = 0
-        limit = 50
+        print(f"⚠️ Playlist '{playlist_name}' not found.")
+        return None
 
+    @profiled()
+    def get_user_playlists(self) -> List[Playlist]:
         try:
-            while True:
-                response = self.spotify.current_user_playlists(limit=limit, offset=offset)
-                items = response.get("items", [])
-                if not items:
-                    break
-
-                for item in items:
-                    playlist = Playlist(
-                        id=item["id"],
-                        name=item["name"],
-                        owner_id=item["owner"]["id"] if item.get("owner") else "unknown"
-                    )
-                    if playlist.name:
-                        playlists.append(playlist)
-
-                if not response.get("next"):
-                    break
-                offset += limit
-
+            playlists = list(self.iter_user_playlists())
             logger.info("Fetched %d playlists for user.", len(playlists))
             return playlists
 
@@ -68,57 +145,34 @@ class SpotifyPlaylistService:
             logger.error("Failed to fetch playlists: %s", str(e))
             raise RuntimeError("Playlist fetch failed") from e
 
-    def get_playlist_tracks(self, playlist_id: str) -> List[Track]:
-        tracks = []
-        offset = 0
-        limit = 100
-
+    @profiled()
+    def get_playlist_tracks(self, playlist_id: str) -> TrackCollection:
         try:
-            while True:
-                response = self.spotify.playlist_items(playlist_id, limit=limit, offset=offset)
-                items = response.get("items", [])
-                if not items:
-                    break
-
-                for item in items:
-                    track_info = item["track"]
-                    track = Track(
-                        id=track_info["id"],
-                        name=track_info["name"],
-                        artist=track_info["artists"][0]["name"]
-                    )
-                    tracks.append(track)
-
-                logger.info("Fetched %d tracks for playlist %s", len(items), playlist_id)
-                if not response.get("next"):
-                    break
-                offset += limit
-                time.sleep(0.2)
-
+            tracks = TrackCollection.from_rows(self.iter_playlist_tracks(playlist_id))
+            logger.info("Fetched %d tracks for playlist %s", len(tracks), playlist_id)
             return tracks
 
         except SpotifyException as e:
             logger.error("Failed to fetch tracks for playlist %s: %s", playlist_id, str(e))
             raise RuntimeError("Track fetch failed") from e
 
-    def randomize_playlist(self, playlist_name: str):
+    @profiled()
+    def get_playlist_features(self, playlist_id: str):
+        """Raw audio features for a playlist's tracks, ready for clustering_engine.assign_new_tracks."""
+        track_ids = [track_id for track_id in self.get_playlist_tracks(playlist_id).ids if track_id]
+        store = get_feature_store()
+        store.fetch(self.spotify, track_ids)
+        return store.to_frame(track_ids)
+
+    @profiled()
+    def randomize_playlist(self, playlist_name: str, ordering: str = None):
+        """Shuffle a playlist, or with ordering ('smooth', 'ramp_up', 'cool_down') sequence it by audio features."""
         playlist_id = self.get_playlist_id(playlist_name)
         if not playlist_id:
             logger.warning("⚠️ Playlist '%s' not found.", playlist_name)
             return
 
-        track_uris = []
-        tracks = self.spotify.playlist_items(playlist_id, limit=100)
-        while tracks:
-            for item in tracks["items"]:
-                track = item["track"]
-                if track:
-                    track_uris.append(track["uri"])
-
-            if tracks["next"]:
-                tracks = self.spotify.next(tracks)
-            else:
-                tracks = None
+        track_uris = [track["uri"] for track in self.iter_playlist_items(playlist_id)]
 
         if not track_uris:
             print("⚠️ No tracks found in playlist.")
@@ -126,7 +180,10 @@ class SpotifyPlaylistService:
 
         print(f"Fetched {len(track_uris)} tracks from playlist.")
 
-        random.shuffle(track_uris)
+        if ordering:
+            track_uris = order_track_uris(self.spotify, track_uris, ordering)
+        else:
+            random.shuffle(track_uris)
 
         self.spotify.playlist_replace_items(playlist_id, [])
         logger.info("Cleared %s", playlist_name)
@@ -138,6 +195,111 @@ class SpotifyPlaylistService:
             print(f"Added {len(chunk)} tracks...")
 
         print("Playlist randomized successfully!")
+        return len(track_uris)
+
+    @profiled()
+    def _fetch_playlist(self, playlist_id: str):
+        """Tracks with their playlist positions, plus the total item count.
+
+        Every page after the first is requested concurrently. Local and unavailable
+        items are skipped, so the collection can be shorter than the total.
+        """
+        def fetch(offset):
+            return self.spotify.playlist_items(playlist_id, limit=CHUNK_SIZE, offset=offset, fields=TRACK_FIELDS)
+
+        first = fetch(0)
+        total = first.get("total") or 0
+        pages = [first]
+        if first.get("next") and total > CHUNK_SIZE:
+            with ThreadPoolExecutor(max_workers=PAGE_WORKERS) as executor:
+                pages += executor.map(fetch, range(CHUNK_SIZE, total, CHUNK_SIZE))
+
+        rows = []
+        positions = []
+        items = (item for page in pages for item in page.get("items") or [])
+        for position, item in enumerate(items):
+            track = item.get("track")
+            if track and track.get("id"):
+                artists = track.get("artists") or [{}]
+                rows.append((track["id"], track["name"], artists[0].get("name", "")))
+                positions.append(position)
+        return TrackCollection.from_rows(rows), np.asarray(positions, dtype=np.int64), max(total, len(positions))
+
+    def _require_playlist_id(self, playlist_name: str) -> str:
+        playlist_id = self.get_playlist_id(playlist_name)
+        if not playlist_id:
+            raise ValueError(f"Playlist '{playlist_name}' not found")
+        return playlist_id
+
+    def _add_tracks(self, playlist_id: str, track_uris: list):
+        for i in range(0, len(track_uris), CHUNK_SIZE):
+            self.spotify.playlist_add_items(playlist_id, track_uris[i:i + CHUNK_SIZE])
+
+    def _remove_occurrences(self, playlist_id, tracks, positions, remove_mask, complete) -> int:
+        """Drop the flagged rows using whichever of targeted removal or a full rewrite needs fewer calls."""
+        kept = tracks.filter(~remove_mask)
+        removal_calls = -(-int(remove_mask.sum()) // CHUNK_SIZE)
+        rewrite_calls = max(1, -(-len(kept) // CHUNK_SIZE))
+        # A rewrite would lose local and unavailable items, so only use it when there are none.
+        if complete and rewrite_calls < removal_calls:
+            uris = kept.uris
+            self.spotify.playlist_replace_items(playlist_id, uris[:CHUNK_SIZE])
+            self._add_tracks(playlist_id, uris[CHUNK_SIZE:])
+            return rewrite_calls
+
+        # Highest positions first, so each call leaves the positions in later calls untouched.
+        flagged = np.flatnonzero(remove_mask)
+        flagged = flagged[np.argsort(-positions[flagged], kind="stable")]
+        for start in range(0, len(flagged), CHUNK_SIZE):
+            items = [
+                {"uri": f"spotify:track:{tracks.ids[row]}", "positions": [int(positions[row])]}
+                for row in flagged[start:start + CHUNK_SIZE]
+            ]
+            self.spotify.playlist_remove_specific_occurrences_of_items(playlist_id, items)
+        return removal_calls
+
+    @profiled()
+    def dedupe_playlist(self, playlist_name: str, by: str = "id") -> int:
+        """Remove repeated tracks, matched by track id or by normalized title/artist ('title'). Returns the count removed."""
+        playlist_id = self._require_playlist_id(playlist_name)
+        tracks, positions, total = self._fetch_playlist(playlist_id)
+        duplicates = tracks.duplicate_mask(by)
+        removed = int(duplicates.sum())
+        if removed:
+            calls = self._remove_occurrences(playlist_id, tracks, positions, duplicates, complete=len(tracks) == total)
+            logger.info("Removed %d duplicates from %s in %d calls", removed, playlist_name, calls)
+        return removed
+
+    @profiled()
+    def playlist_difference(self, playlist_name: str, other_name: str) -> TrackCollection:
+        """Tracks in playlist_name that are not in other_name."""
+        playlist_ids = [self._require_playlist_id(playlist_name), self._require_playlist_id(other_name)]
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            tracks, other = [result[0] for result in executor.map(self._fetch_playlist, playlist_ids)]
+        return tracks.difference(other)
+
+    @profiled()
+    def merge_playlists(self, playlist_names: list, target_name: str, by: str = "id") -> str:
+        """Add the deduplicated union of several playlists to target_name, creating it if needed."""
+        playlist_ids = [self._require_playlist_id(name) for name in playlist_names]
+        target_id = self.get_playlist_id(target_name)
+        with ThreadPoolExecutor(max_workers=PAGE_WORKERS) as executor:
+            collections = [result[0] for result in executor.map(self._fetch_playlist, playlist_ids)]
+        merged = TrackCollection.concat(collections).dedupe(by)
+
+        if target_id:
+            existing, _, _ = self._fetch_playlist(target_id)
+            merged = merged.difference(existing, by)
+        else:
+            created = self.spotify.user_playlist_create(self.user_id, target_name)
+            target_id = created["id"]
+            PlaylistIndex.for_user(self.user_id).add(
+                Playlist(target_id, target_name, self.user_id, created.get("snapshot_id"))
+            )
+
+        self._add_tracks(target_id, merged.uris)
+        logger.info("Merged %d playlists into %s (%d tracks added)", len(playlist_ids), target_name, len(merged))
+        return target_id
 
 if __name__ == "__main__":
     auth_service = SpotifyAuthService()
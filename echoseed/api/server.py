@@ -0,0 +1,282 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from flask import Flask, jsonify, request
+from echoseed.ai.artifacts import get_registry
+from echoseed.ai.catalog_query import get_catalog_index, parse_query
+from echoseed.ai.playlist_generator import LOCAL_SOURCES, PlaylistGenerator, create_ai_client
+from echoseed.api.playlist_index import normalize_name
+from echoseed.api.playlist_service import SpotifyPlaylistService
+
+logger = logging.getLogger("echoseed.server")
+
+MAX_WORKERS = int(os.getenv("ECHOSEED_SERVER_WORKERS", "4"))
+MAX_QUEUE = int(os.getenv("ECHOSEED_SERVER_QUEUE", "16"))
+# Seconds a request waits for its job before answering 504; the job itself keeps running.
+REQUEST_TIMEOUT = float(os.getenv("ECHOSEED_SERVER_TIMEOUT", "120"))
+# Seconds the artist pool scraped from the user's playlists is reused for recommendations.
+ARTIST_TTL = float(os.getenv("ECHOSEED_ARTIST_TTL", "900"))
+RETRY_AFTER = 5
+ORDERINGS = ("smooth", "ramp_up", "cool_down")
+SOURCES = ("llm",) + LOCAL_SOURCES
+
+
+class Saturated(Exception):
+    """Raised when every worker is busy and the queue is full."""
+
+
+class Coalescer:
+    """Runs a call once per key at a time; concurrent callers with the same key share its future."""
+
+    def __init__(self):
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def future(self, key, start) -> Future:
+        """Return the in-flight future for key, or the one produced by start() if there is none."""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+            future = start()
+            self._inflight[key] = future
+        future.add_done_callback(lambda _: self._forget(key, future))
+        return future
+
+    def run(self, key, func):
+        """Call func() in this thread, unless the same key is already being computed elsewhere."""
+        owner = Future()
+        future = self.future(key, lambda: owner)
+        if future is owner:
+            try:
+                owner.set_result(func())
+            except BaseException as e:
+                owner.set_exception(e)
+        return future.result()
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def __len__(self):
+        return len(self._inflight)
+
+
+class WorkerPool:
+    """Bounded thread pool: at most max_workers running and max_queue waiting, with coalescing by key."""
+
+    def __init__(self, max_workers=MAX_WORKERS, max_queue=MAX_QUEUE):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="echoseed-worker")
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._coalescer = Coalescer()
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _start(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            raise Saturated()
+        with self._lock:
+            self._pending += 1
+        try:
+            future = self._executor.submit(func, *args)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, _):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def submit(self, func, *args, key=None) -> Future:
+        if key is None:
+            return self._start(func, *args)
+        return self._coalescer.future(key, lambda: self._start(func, *args))
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "queue": self.max_queue,
+            "pending": self._pending,
+            "coalesced_keys": len(self._coalescer),
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+class ServiceState:
+    """Clients and caches shared by every request for the lifetime of the server."""
+
+    def __init__(self, spotify_client, ai_client=None):
+        self.spotify = spotify_client
+        self.user = spotify_client.me()
+        self.playlist_service = SpotifyPlaylistService(spotify_client)
+        self.coalescer = Coalescer()
+        self._ai_client = ai_client
+        self._artists = None
+        self._artists_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def ai_client(self):
+        with self._lock:
+            if self._ai_client is None:
+                self._ai_client = create_ai_client()
+            return self._ai_client
+
+    def artists(self, generator) -> list:
+        if self._artists is None or time.monotonic() - self._artists_at > ARTIST_TTL:
+            artists = self.coalescer.run(("artists",), lambda: PlaylistGenerator.get_artists_from_playlists(generator))
+            self._artists, self._artists_at = sorted(artists), time.monotonic()
+        return self._artists
+
+    def warm(self):
+        """Load the artifacts generation depends on so the first request does not pay for them."""
+        registry = get_registry()
+        for name in ("mood_map", "dataset", "mood_pools"):
+            try:
+                registry.load(name)
+            except FileNotFoundError:
+                logger.warning("[Server] %s not found; it will be loaded on first use", name)
+        try:
+            get_catalog_index(registry)
+        except FileNotFoundError:
+            pass
+
+
+class ServedPlaylistGenerator(PlaylistGenerator):
+    """PlaylistGenerator that reuses the server's clients, artist pool and in-flight recommendations."""
+
+    def __init__(self, state: ServiceState, mood, **options):
+        super().__init__(state.spotify, mood, user=state.user, ai_client=state.ai_client, **options)
+        self.state = state
+
+    def get_artists_from_playlists(self):
+        return self.state.artists(self)
+
+    def get_recommended_tracks(self, limit: int = 25, artists: list = None):
+        artists = self.state.artists(self) if artists is None else artists
+        key = ("recommend", self.mood, limit, tuple(artists))
+        parent = super()
+        return self.state.coalescer.run(key, lambda: parent.get_recommended_tracks(limit, artists=artists))
+
+
+def _generate(state, mood, limit, source, ordering, options):
+    generator = ServedPlaylistGenerator(state, mood, **options)
+    return generator.generate_playlist(limit, source=source, ordering=ordering)
+
+def _randomize(state, playlist, ordering):
+    count = state.playlist_service.randomize_playlist(playlist, ordering=ordering)
+    if count is None:
+        raise LookupError(f"Playlist '{playlist}' not found or empty")
+    return {"playlist": playlist, "tracks": count}
+
+def _tag(batch):
+    from echoseed.ai.tagging.mood_tagger import MoodTagger
+
+    MoodTagger().main(batch=batch)
+    return {"version": get_registry().manifest()["version"]}
+
+
+def create_app(state: ServiceState, pool: WorkerPool = None, timeout: float = REQUEST_TIMEOUT) -> Flask:
+    app = Flask(__name__)
+    pool = pool or WorkerPool()
+
+    def run_job(func, *args, key=None):
+        started = time.perf_counter()
+        try:
+            future = pool.submit(func, *args, key=key)
+        except Saturated:
+            response = jsonify({"error": "server busy, retry later"})
+            response.status_code = 503
+            response.headers["Retry-After"] = str(RETRY_AFTER)
+            return response
+        try:
+            result = future.result(timeout=timeout)
+        except FutureTimeout:
+            return jsonify({"error": "timed out waiting for the job; it is still running"}), 504
+        except LookupError as e:
+            return jsonify({"error": str(e)}), 404
+        except Exception as e:
+            logger.error("[Server] %s failed: %s", func.__name__, e)
+            return jsonify({"error": str(e)}), 500
+        return jsonify({"result": result, "seconds": round(time.perf_counter() - started, 4)})
+
+    def body():
+        data = request.get_json(silent=True)
+        return data if isinstance(data, dict) else {}
+
+    @app.post("/generate")
+    def generate():
+        data = body()
+        mood = data.get("mood")
+        if not mood or not isinstance(mood, str):
+            return jsonify({"error": "mood is required"}), 400
+        if data.get("ordering") not in (None,) + ORDERINGS:
+            return jsonify({"error": f"ordering must be one of {ORDERINGS}"}), 400
+        source = data.get("source", "llm")
+        if source not in SOURCES:
+            return jsonify({"error": f"source must be one of {SOURCES}"}), 400
+        if source == "query":
+            try:
+                parse_query(mood)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+        try:
+            limit = int(data.get("limit", 25))
+            budget = float(data["budget"]) if data.get("budget") else None
+        except (TypeError, ValueError):
+            return jsonify({"error": "limit must be an integer and budget a number of seconds"}), 400
+        if limit <= 0 or (budget is not None and not budget > 0):
+            return jsonify({"error": "limit and budget must be positive"}), 400
+        options = {"hedge": bool(data.get("hedge", False))}
+        if "budget" in data:
+            options["latency_budget"] = budget
+        return run_job(_generate, state, mood, limit, source, data.get("ordering"), options)
+
+    @app.post("/randomize")
+    def randomize():
+        data = body()
+        playlist = data.get("playlist")
+        if not playlist or not isinstance(playlist, str):
+            return jsonify({"error": "playlist is required"}), 400
+        if data.get("ordering") not in (None,) + ORDERINGS:
+            return jsonify({"error": f"ordering must be one of {ORDERINGS}"}), 400
+        key = ("randomize", normalize_name(playlist), data.get("ordering"))
+        return run_job(_randomize, state, playlist, data.get("ordering"), key=key)
+
+    @app.post("/tag")
+    def tag():
+        batch = bool(body().get("batch", True))
+        return run_job(_tag, batch, key=("tag",))
+
+    @app.get("/health")
+    def health():
+        return jsonify({"status": "ok", "pool": pool.stats()})
+
+    app.extensions["echoseed_pool"] = pool
+    return app
+
+
+def serve(host="127.0.0.1", port=8080, workers=MAX_WORKERS, queue=MAX_QUEUE):
+    from echoseed.api.auth import SpotifyAuthService
+
+    auth_service = SpotifyAuthService()
+    auth_service.authenticate()
+    state = ServiceState(auth_service.get_spotify_client())
+    state.warm()
+    pool = WorkerPool(workers, queue)
+    app = create_app(state, pool)
+    logger.info("[Server] Listening on %s:%d with %d workers, queue of %d", host, port, workers, queue)
+    try:
+        app.run(host=host, port=port, threaded=True)
+    finally:
+        pool.shutdown()
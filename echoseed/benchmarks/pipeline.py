@@ -0,0 +1,210 @@
+import argparse
+import contextlib
+import gc
+import json
+import logging
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("echoseed.benchmarks")
+
+SIZES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+STAGES = ("load", "normalize", "cluster", "optimise_k_means", "get_clusters")
+BASELINE_FILE = Path(__file__).resolve().parent / "baseline.json"
+# Relative slowdown or growth over the baseline reported as a regression.
+THRESHOLD = 0.25
+# Differences below these are treated as noise, whatever their relative size.
+NOISE_FLOOR = {"seconds": 0.05, "peak_rss_mb": 16.0, "tracemalloc_peak_mb": 4.0}
+GENERATE_CHUNK = 1_000_000
+
+
+def _catalog_chunk(start, rows, total, rng) -> pd.DataFrame:
+    """Rows shaped like the Spotify audio-feature dumps: skewed features, a few unusable and repeated rows."""
+    ids = (start + np.arange(rows)).astype(str)
+    tempo = np.where(rng.random(rows) < 0.7, rng.normal(120, 18, rows), rng.normal(90, 30, rows))
+    df = pd.DataFrame({
+        "track_id": np.char.add("t", ids),
+        "track_name": np.char.add("Song ", ids),
+        # About a dozen tracks per artist.
+        "artists": np.char.add("Artist ", (rng.integers(0, max(total // 12, 1), rows)).astype(str)),
+        "tempo": np.clip(tempo, 50, 210).round(3),
+        "danceability": rng.beta(6, 3.5, rows).round(3),
+        "energy": rng.beta(4, 2, rows).round(3),
+        "valence": rng.beta(2.2, 2.2, rows).round(3),
+    })
+    # Re-releases: an earlier song again under a new id, half of them with a slightly different analysis.
+    copies = np.flatnonzero(rng.random(rows) < 0.03)
+    sources = rng.integers(0, rows, len(copies))
+    for column in ("track_name", "artists", "tempo", "danceability", "energy", "valence"):
+        df.loc[copies, column] = df[column].to_numpy()[sources]
+    df.loc[copies[::2], "tempo"] += 0.2
+    unusable = np.flatnonzero(rng.random(rows) < 0.01)
+    df.loc[unusable, "energy"] = np.where(rng.random(len(unusable)) < 0.5, 0.0, np.nan)
+    return df
+
+def write_synthetic_catalog(path, rows, seed=0) -> Path:
+    """Write a synthetic raw catalog in chunks so generating 10M rows does not hold them all at once."""
+    rng = np.random.default_rng(seed)
+    for start in range(0, rows, GENERATE_CHUNK):
+        chunk = _catalog_chunk(start, min(GENERATE_CHUNK, rows - start), rows, rng)
+        chunk.to_csv(path, mode="w" if start == 0 else "a", header=start == 0, index=False)
+    return Path(path)
+
+
+def _reset_peak_rss() -> bool:
+    """Reset the kernel's high-water RSS mark (Linux); False where that is not possible."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def _peak_rss_mb(reset: bool) -> float:
+    if reset:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    # ru_maxrss is the peak over the whole process: KiB on Linux, bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+def measure(func, trace=True) -> dict:
+    """Time func() and record its peak RSS; with trace, run it again under tracemalloc for its allocation peak."""
+    gc.collect()
+    reset = _reset_peak_rss()
+    started = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - started
+    result = {"seconds": round(seconds, 4), "peak_rss_mb": round(_peak_rss_mb(reset), 1)}
+
+    if trace:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func()
+            result["tracemalloc_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def run_size(rows, work_dir, clusters=4, max_k=6, trace=True, seed=0) -> dict:
+    """Run every pipeline stage on a synthetic catalog, with artifacts kept inside work_dir."""
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    from echoseed.ai.artifacts import ArtifactRegistry
+    from echoseed.ai.clustering import clustering_engine
+    from echoseed.ai.preprocessing.load_datasets import load_spotify_dataset
+    from echoseed.ai.preprocessing.normalize_features import FEATURES, normalize_audio_features
+    from echoseed.ai.tagging.mood_tagger import MoodTagger
+
+    work_dir = Path(work_dir)
+    registry = ArtifactRegistry(root=work_dir)
+    catalog = write_synthetic_catalog(work_dir / "catalog.csv", rows, seed)
+    state = {}
+
+    def load():
+        with contextlib.redirect_stdout(sys.stderr):
+            state["raw"] = load_spotify_dataset(catalog)
+
+    def normalize():
+        state["normalized"] = normalize_audio_features(state["raw"])
+
+    def cluster():
+        with contextlib.redirect_stdout(sys.stderr):
+            clustering_engine.cluster_features(clusters, audio_features=state["raw"])
+
+    def optimise():
+        with contextlib.chdir(work_dir), contextlib.redirect_stdout(sys.stderr):
+            clustering_engine.optimise_k_means(state["normalized"][FEATURES], max_k)
+
+    def get_clusters():
+        registry.invalidate()
+        MoodTagger(client=object(), registry=registry).get_clusters()
+
+    stages = dict(zip(STAGES, (load, normalize, cluster, optimise, get_clusters)))
+    results = {}
+    engine_registry = clustering_engine.registry
+    clustering_engine.registry = registry
+    try:
+        for name, stage in stages.items():
+            logger.info("[Benchmark] %d rows: %s", rows, name)
+            results[name] = measure(stage, trace)
+            registry.invalidate()
+    finally:
+        clustering_engine.registry = engine_registry
+    return {"rows": rows, "stages": results}
+
+
+def compare(results, baseline, threshold=THRESHOLD) -> list:
+    """Metrics that grew by more than threshold over the baseline (and by more than the noise floor)."""
+    regressions = []
+    for size, current in results["sizes"].items():
+        previous = baseline.get("sizes", {}).get(size)
+        if not previous:
+            continue
+        for stage, metrics in current["stages"].items():
+            for metric, value in metrics.items():
+                before = previous["stages"].get(stage, {}).get(metric)
+                if before is None:
+                    continue
+                if value > before * (1 + threshold) and value - before > NOISE_FLOOR.get(metric, 0.0):
+                    regressions.append({
+                        "size": size, "stage": stage, "metric": metric, "baseline": before, "current": value,
+                        "change": round(value / before - 1, 3) if before else None,
+                    })
+    return regressions
+
+def run(sizes=("10k",), baseline_path=BASELINE_FILE, threshold=THRESHOLD, save_baseline=False,
+        clusters=4, max_k=6, trace=True) -> dict:
+    """Benchmark each size in its own scratch directory and check the results against the baseline."""
+    results = {
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "sizes": {},
+    }
+    for size in sizes:
+        rows = SIZES[size] if size in SIZES else int(size)
+        with tempfile.TemporaryDirectory(prefix=f"echoseed-bench-{size}-") as work_dir:
+            results["sizes"][str(size)] = run_size(rows, work_dir, clusters, max_k, trace)
+
+    baseline_path = Path(baseline_path)
+    baseline = {}
+    if baseline_path.exists():
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+    results["regressions"] = compare(results, baseline, threshold)
+    for regression in results["regressions"]:
+        logger.warning("[Benchmark] %(size)s %(stage)s %(metric)s: %(baseline)s -> %(current)s", regression)
+
+    if save_baseline:
+        baseline.setdefault("sizes", {}).update(results["sizes"])
+        baseline["machine"] = results["machine"]
+        with open(baseline_path, "w") as f:
+            json.dump(baseline, f, indent=2)
+        logger.info("[Benchmark] Baseline written to %s", baseline_path)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark of the clustering pipeline")
+    parser.add_argument("sizes", nargs="*", default=["10k"], help=f"{', '.join(SIZES)} or a row count")
+    parser.add_argument("--baseline", default=str(BASELINE_FILE))
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--max-k", type=int, default=6)
+    parser.add_argument("--no-trace", dest="trace", action="store_false")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    report = run(args.sizes, args.baseline, args.threshold, args.save_baseline, max_k=args.max_k, trace=args.trace)
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if report["regressions"] else 0)
@@ -1,7 +1,8 @@
 from dataclasses import dataclass
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Playlist:
     id: str
     name: str
     owner_id: str
+    snapshot_id: str = None
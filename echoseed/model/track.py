@@ -1,6 +1,6 @@
 from dataclasses import dataclass
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Track:
     id: str
     name: str
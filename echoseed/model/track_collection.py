@@ -0,0 +1,211 @@
+import re
+import sys
+import unicodedata
+import numpy as np
+from echoseed.model.track import Track
+
+_VERSION_SUFFIX = re.compile(
+    r"\s*(\(|\[|-)\s*(\d{4}\s+)?(remaster(ed)?|live|mono|stereo|radio edit|single version|deluxe)[^)\]]*[)\]]?\s*$"
+)
+_FEATURING = re.compile(r"\s*[(\[]?\s*(feat\.?|ft\.?|featuring)\s[^)\]]*[)\]]?")
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+def normalize_text(text: str) -> str:
+    """Case-, accent- and punctuation-insensitive form used for title/artist matching."""
+    text = unicodedata.normalize("NFKD", text or "")
+    if not text.isascii():
+        text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = text.casefold()
+    # The patterns below are costly to scan for; most titles contain neither.
+    if "f" in text:
+        text = _FEATURING.sub("", text)
+    if "(" in text or "[" in text or "-" in text:
+        text = _VERSION_SUFFIX.sub("", text)
+    return " ".join(_PUNCTUATION.sub(" ", text).split())
+
+
+class _Vocabulary:
+    __slots__ = ("codes", "values")
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(sys.intern(value) if isinstance(value, str) else value)
+        return code
+
+    def array(self):
+        values = np.empty(len(self.values), dtype=object)
+        values[:] = self.values
+        return values
+
+
+def _merge_vocabularies(parts):
+    """One vocabulary for several (values, codes) pairs, and every pair's codes remapped into it."""
+    first = parts[0][0]
+    if all(values is first for values, _ in parts):
+        return first, np.concatenate([codes for _, codes in parts])
+    values, inverse = np.unique(np.concatenate([values for values, _ in parts]), return_inverse=True)
+    inverse = inverse.astype(np.int32)
+    remapped = []
+    offset = 0
+    for part_values, codes in parts:
+        remapped.append(inverse[offset:offset + len(part_values)][codes])
+        offset += len(part_values)
+    return values, np.concatenate(remapped)
+
+
+class TrackCollection:
+    """Columnar track list: ids in one object array, names and artists as int32 codes into shared vocabularies."""
+
+    __slots__ = ("ids", "name_codes", "artist_codes", "names", "artists", "_title_keys")
+
+    def __init__(self, ids, name_codes, artist_codes, names, artists):
+        self.ids = ids
+        self.name_codes = name_codes
+        self.artist_codes = artist_codes
+        self.names = names
+        self.artists = artists
+        self._title_keys = None
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build from (id, name, artist) tuples or Track objects."""
+        ids = []
+        name_codes = []
+        artist_codes = []
+        names = _Vocabulary()
+        artists = _Vocabulary()
+        for row in rows:
+            track_id, name, artist = (row.id, row.name, row.artist) if isinstance(row, Track) else row
+            ids.append(sys.intern(track_id) if isinstance(track_id, str) else track_id)
+            name_codes.append(names.code(name or ""))
+            artist_codes.append(artists.code(artist or ""))
+
+        id_array = np.empty(len(ids), dtype=object)
+        id_array[:] = ids
+        return cls(
+            id_array,
+            np.asarray(name_codes, dtype=np.int32),
+            np.asarray(artist_codes, dtype=np.int32),
+            names.array(),
+            artists.array()
+        )
+
+    @classmethod
+    def empty(cls):
+        return cls.from_rows([])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        for i in range(len(self.ids)):
+            yield self[i]
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            return Track(
+                id=self.ids[key],
+                name=self.names[self.name_codes[key]],
+                artist=self.artists[self.artist_codes[key]]
+            )
+        return self.take(key)
+
+    def __repr__(self):
+        return f"TrackCollection({len(self)} tracks)"
+
+    def take(self, selector) -> "TrackCollection":
+        """Rows selected by a boolean mask, index array or slice; vocabularies are shared, not copied."""
+        taken = TrackCollection(
+            self.ids[selector], self.name_codes[selector], self.artist_codes[selector], self.names, self.artists
+        )
+        if self._title_keys is not None:
+            taken._title_keys = self._title_keys[selector]
+        return taken
+
+    def filter(self, mask) -> "TrackCollection":
+        return self.take(np.asarray(mask, dtype=bool))
+
+    def by_artist(self, artist: str) -> "TrackCollection":
+        matches = np.flatnonzero(self.artists == artist)
+        return self.filter(np.isin(self.artist_codes, matches))
+
+    @property
+    def uris(self) -> list:
+        return [f"spotify:track:{track_id}" for track_id in self.ids if track_id]
+
+    def title_keys(self) -> np.ndarray:
+        """Normalized "title|artist" per row, computed once per vocabulary entry and cached."""
+        if self._title_keys is None:
+            if not len(self):
+                self._title_keys = np.empty(0, dtype=str)
+            else:
+                name_keys = np.array([normalize_text(name) for name in self.names], dtype=object)
+                artist_keys = np.array([normalize_text(artist) for artist in self.artists], dtype=object)
+                self._title_keys = (name_keys[self.name_codes] + "|" + artist_keys[self.artist_codes]).astype(str)
+        return self._title_keys
+
+    def _keys(self, by: str) -> np.ndarray:
+        # Fixed-width strings sort natively, and missing ids compare like any other value.
+        return self.ids.astype(str) if by == "id" else self.title_keys()
+
+    def duplicate_mask(self, by: str = "id") -> np.ndarray:
+        """True for every row that repeats an earlier row's id (or normalized title/artist)."""
+        keys = self._keys(by)
+        _, first = np.unique(keys, return_index=True)
+        mask = np.ones(len(keys), dtype=bool)
+        mask[first] = False
+        return mask
+
+    def dedupe(self, by: str = "id") -> "TrackCollection":
+        return self.filter(~self.duplicate_mask(by))
+
+    def _membership(self, other, by: str = "id") -> np.ndarray:
+        return np.isin(self._keys(by), other._keys(by))
+
+    def difference(self, other, by: str = "id") -> "TrackCollection":
+        """Rows whose id (or normalized title/artist) does not appear in other."""
+        return self.filter(~self._membership(other, by))
+
+    def intersection(self, other) -> "TrackCollection":
+        return self.filter(self._membership(other)).dedupe()
+
+    def union(self, other) -> "TrackCollection":
+        return TrackCollection.concat([self, other]).dedupe()
+
+    @staticmethod
+    def concat(collections) -> "TrackCollection":
+        """Rows of every collection in order; vocabularies are merged and the codes remapped into them."""
+        collections = list(collections)
+        if not collections:
+            return TrackCollection.empty()
+        names, name_codes = _merge_vocabularies([(c.names, c.name_codes) for c in collections])
+        artists, artist_codes = _merge_vocabularies([(c.artists, c.artist_codes) for c in collections])
+        return TrackCollection(
+            np.concatenate([collection.ids for collection in collections]), name_codes, artist_codes, names, artists
+        )
+
+    def to_numpy(self) -> dict:
+        """Column arrays backing this collection (views, no copies)."""
+        return {
+            "id": self.ids,
+            "name_code": self.name_codes,
+            "artist_code": self.artist_codes,
+            "names": self.names,
+            "artists": self.artists
+        }
+
+    def to_pandas(self):
+        """DataFrame with categorical name/artist columns built straight from the code arrays."""
+        import pandas as pd
+        return pd.DataFrame({
+            "id": self.ids,
+            "name": pd.Categorical.from_codes(self.name_codes, categories=pd.Index(self.names, dtype=object)),
+            "artist": pd.Categorical.from_codes(self.artist_codes, categories=pd.Index(self.artists, dtype=object)),
+        }, copy=False)
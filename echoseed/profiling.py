@@ -0,0 +1,171 @@
+import atexit
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+logger = logging.getLogger("echoseed.profiling")
+
+ENABLED = os.getenv("ECHOSEED_PROFILE", "").lower() in ("1", "true", "yes")
+# Seconds between stack samples; 0 records spans only.
+SAMPLE_INTERVAL = float(os.getenv("ECHOSEED_PROFILE_SAMPLE_INTERVAL", "0"))
+REPORT_DIR = Path(os.getenv("ECHOSEED_PROFILE_DIR", "profiles"))
+
+
+class _StackSampler(threading.Thread):
+    """Samples every thread's Python stack at a fixed interval, keyed in collapsed ("a;b;c") form."""
+
+    def __init__(self, interval):
+        super().__init__(name="echoseed-profiler", daemon=True)
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        own_id = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(names))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class Profiler:
+    """Collects wall-time and per-thread CPU-time spans; off-CPU time is reported as wait."""
+
+    def __init__(self, sample_interval=SAMPLE_INTERVAL):
+        self.started_at = time.time()
+        self.spans = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sampler = _StackSampler(sample_interval) if sample_interval > 0 else None
+        if self._sampler:
+            self._sampler.start()
+
+    @contextmanager
+    def span(self, name):
+        stack = self._local.__dict__.setdefault("stack", [])
+        record = {"name": name, "thread": threading.current_thread().name, "depth": len(stack), "children": 0.0}
+        stack.append(record)
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            record["wall"] = time.perf_counter() - wall_start
+            record["cpu"] = time.thread_time() - cpu_start
+            stack.pop()
+            if stack:
+                stack[-1]["children"] += record["wall"]
+            with self._lock:
+                self.spans.append(record)
+
+    def summary(self) -> dict:
+        """Per stage: calls, wall, cpu, wait (wall - cpu) and self time (wall minus nested spans)."""
+        stages = defaultdict(lambda: {"calls": 0, "wall": 0.0, "cpu": 0.0, "wait": 0.0, "self": 0.0})
+        with self._lock:
+            spans = list(self.spans)
+        for record in spans:
+            stage = stages[record["name"]]
+            stage["calls"] += 1
+            stage["wall"] += record["wall"]
+            stage["cpu"] += record["cpu"]
+            stage["wait"] += max(record["wall"] - record["cpu"], 0.0)
+            stage["self"] += max(record["wall"] - record["children"], 0.0)
+        return {
+            name: {key: round(value, 6) if isinstance(value, float) else value for key, value in stage.items()}
+            for name, stage in sorted(stages.items(), key=lambda item: -item[1]["wall"])
+        }
+
+    def stop(self):
+        if self._sampler:
+            self._sampler.stop()
+
+    def write_report(self, report_dir=None) -> Path:
+        """Write profile-<timestamp>.json, plus a .folded flame-graph input when stacks were sampled."""
+        self.stop()
+        report_dir = Path(report_dir or REPORT_DIR)
+        os.makedirs(report_dir, exist_ok=True)
+        stem = report_dir / time.strftime("profile-%Y%m%d-%H%M%S", time.localtime(self.started_at))
+        report = {
+            "started_at": self.started_at,
+            "duration": round(time.time() - self.started_at, 6),
+            "stages": self.summary(),
+        }
+        if self._sampler:
+            folded = stem.with_suffix(".folded")
+            with open(folded, "w") as f:
+                for stack, count in self._sampler.stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            report["samples"] = sum(self._sampler.stacks.values())
+            report["folded_stacks"] = str(folded)
+
+        path = stem.with_suffix(".json")
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        for name, stage in list(report["stages"].items())[:10]:
+            logger.info("[Profiler] %-45s calls=%-4d wall=%.3fs cpu=%.3fs wait=%.3fs",
+                        name, stage["calls"], stage["wall"], stage["cpu"], stage["wait"])
+        logger.info("[Profiler] Report written to %s", path)
+        return path
+
+
+_active = None
+
+def enable(sample_interval=SAMPLE_INTERVAL) -> Profiler:
+    global _active
+    if _active is None:
+        _active = Profiler(sample_interval)
+    return _active
+
+def finish(report_dir=None):
+    """Stop profiling and write the run report. Returns its path, or None if profiling was off."""
+    global _active
+    profiler, _active = _active, None
+    return profiler.write_report(report_dir) if profiler else None
+
+def active() -> Profiler:
+    return _active
+
+@contextmanager
+def span(name):
+    if _active is None:
+        yield
+        return
+    with _active.span(name):
+        yield
+
+def profiled(name=None):
+    """Record each call as a span; costs one global lookup per call while profiling is off."""
+    def decorate(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _active
+            if profiler is None:
+                return func(*args, **kwargs)
+            with profiler.span(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+if ENABLED:
+    enable()
+    atexit.register(finish)
@@ -0,0 +1,133 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from cryptography.fernet import Fernet, InvalidToken
+from echoseed.security.token_store import TokenStore
+
+
+class KeyRotationJob:
+    """Re-encrypts a TokenStore under a new key in small committed batches.
+
+    The store keeps accepting the old key until every row has been rotated and
+    verified, so reads keep working while the job runs. Progress is
+    checkpointed per batch, so an interrupted job resumes where it stopped.
+    """
+
+    def __init__(self, store: TokenStore, new_key: bytes, batch_size: int = 500, on_complete=None):
+        self.logger = logging.getLogger("echoseed.key_rotation")
+        self.store = store
+        self.new_key = new_key
+        self.batch_size = batch_size
+        self.on_complete = on_complete
+        self.key_id = hashlib.sha256(new_key).hexdigest()[:16]
+        self.rotated = 0
+        self.error = None
+        self.done = threading.Event()
+        self._thread = None
+
+    def _connect(self):
+        # A dedicated connection keeps the store's own connection free for readers.
+        conn = sqlite3.connect(str(self.store.db_path), isolation_level=None)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS key_rotation ("
+            "key_id TEXT PRIMARY KEY, last_account TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        return conn
+
+    def _checkpoint(self, conn):
+        row = conn.execute("SELECT last_account FROM key_rotation WHERE key_id = ?", (self.key_id,)).fetchone()
+        return row[0] if row else ""
+
+    def _rotate_batch(self, conn, multi_fernet, after):
+        with self.store._file_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    "SELECT account_id, token FROM tokens WHERE account_id > ? ORDER BY account_id LIMIT ?",
+                    (after, self.batch_size)
+                ).fetchall()
+                if rows:
+                    conn.executemany(
+                        "UPDATE tokens SET token = ? WHERE account_id = ?",
+                        [(multi_fernet.rotate(blob), account_id) for account_id, blob in rows]
+                    )
+                    conn.execute(
+                        "INSERT OR REPLACE INTO key_rotation (key_id, last_account, updated_at) VALUES (?, ?, ?)",
+                        (self.key_id, rows[-1][0], time.time())
+                    )
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        return rows
+
+    def _verify(self, conn) -> list:
+        new_fernet = Fernet(self.new_key)
+        failed = []
+        after = ""
+        while True:
+            rows = conn.execute(
+                "SELECT account_id, token FROM tokens WHERE account_id > ? ORDER BY account_id LIMIT ?",
+                (after, self.batch_size)
+            ).fetchall()
+            if not rows:
+                return failed
+            for account_id, blob in rows:
+                try:
+                    new_fernet.decrypt(blob)
+                except InvalidToken:
+                    failed.append(account_id)
+            after = rows[-1][0]
+
+    def run(self):
+        conn = self._connect()
+        try:
+            if self.store.keys[0] != self.new_key:
+                self.store.add_key(self.new_key)
+            multi_fernet = self.store.fernet
+
+            after = self._checkpoint(conn)
+            if after:
+                self.logger.info("[KeyRotationJob] Resuming rotation after account %s", after)
+
+            for attempt in range(2):
+                while True:
+                    rows = self._rotate_batch(conn, multi_fernet, after)
+                    if not rows:
+                        break
+                    self.rotated += len(rows)
+                    after = rows[-1][0]
+                    self.logger.info("[KeyRotationJob] Rotated %d tokens so far", self.rotated)
+
+                # Other processes may have written old-key rows behind the cursor; sweep once more.
+                failed = self._verify(conn)
+                if not failed:
+                    break
+                after = ""
+            else:
+                raise RuntimeError(f"{len(failed)} tokens still unreadable with the new key")
+
+            conn.execute("DELETE FROM key_rotation WHERE key_id = ?", (self.key_id,))
+            self.store.retire_old_keys()
+            self.logger.info("[KeyRotationJob] Rotation verified, old key retired")
+            if self.on_complete:
+                self.on_complete()
+        except Exception as e:
+            self.error = e
+            self.logger.error("[KeyRotationJob] Rotation failed: %s", e)
+        finally:
+            conn.close()
+            self.done.set()
+
+    def start(self) -> threading.Thread:
+        self._thread = threading.Thread(target=self.run, name="key-rotation", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def wait(self, timeout=None) -> bool:
+        finished = self.done.wait(timeout)
+        if finished and self.error:
+            raise self.error
+        return finished
@@ -4,22 +4,37 @@ import logging
 from pathlib import Path
 from dotenv import load_dotenv
 from cryptography.fernet import Fernet, MultiFernet
+from echoseed.security.token_store import TokenStore
+from echoseed.security.key_rotation import KeyRotationJob
 
 class TokenManager:
-    def __init__(self, encryption_key: bytes):
+    def __init__(self, encryption_key: bytes, store_path=None, previous_keys=None, token_file_path=None,
+                 env_path=None):
         base_dir = Path(__file__).resolve().parents[2]
-        self.token_file_path = base_dir / "tokens.json.enc"
+        self.token_file_path = Path(token_file_path) if token_file_path else base_dir / "tokens.json.enc"
+        self.store_path = Path(store_path) if store_path else base_dir / "tokens.db"
+        self.env_path = Path(env_path) if env_path else base_dir / ".env"
         self.logger = logging.getLogger("echoseed.token_manager")
         self.fernet = Fernet(encryption_key)
+        self.encryption_key = encryption_key
+        if previous_keys is None:
+            # Set while a background rotation is in flight so half-rotated stores stay readable.
+            previous = os.getenv("SECRET_KEY_PREVIOUS", "")
+            previous_keys = [k.encode() for k in previous.split(",") if k]
+        self.previous_keys = list(previous_keys)
         self.token_data = None
+        self._store = None
         self.load_token()
 
     def save_token(self, token_data):
         try:
             json_data = json.dumps(token_data).encode()
             encrypted_data = self.fernet.encrypt(json_data)
-            with open(self.token_file_path, 'wb') as f:
+            tmp_path = self.token_file_path.with_name(self.token_file_path.name + ".tmp")
+            with open(tmp_path, 'wb') as f:
                 f.write(encrypted_data)
+            os.replace(tmp_path, self.token_file_path)
+            self.token_data = token_data
         except Exception as e:
             print(f"[TokenManager] Failed to save token: {e}")
 
@@ -50,6 +65,18 @@ class TokenManager:
             os.remove(self.token_file_path)
         self.token_data = None
 
+    def get_store(self) -> TokenStore:
+        """Keyed multi-account store, opened on first use."""
+        if self._store is None:
+            self._store = TokenStore([self.encryption_key] + self.previous_keys, self.store_path)
+        return self._store
+
+    def save_account_token(self, account_id: str, token_data: dict):
+        self.get_store().put(account_id, token_data)
+
+    def get_account_token(self, account_id: str):
+        return self.get_store().get(account_id)
+
     def rotate_key(self, new_key:bytes = None, encrypted_token: bytes = None) -> bytes:
         if not new_key:
             new_key = Fernet.generate_key()
@@ -61,27 +88,72 @@ class TokenManager:
         if encrypted_token:
             rotated = multi_fernet.rotate(encrypted_token)
 
+        self._rotate_token_file(multi_fernet)
+        # Rotate the account store on disk even if this manager has not opened it yet.
+        if self._store is not None or self.store_path.exists():
+            self.get_store().rotate(new_key)
+
         self.fernet = Fernet(new_key)
+        self.encryption_key = new_key
         self._update_env_file("SECRET_KEY", new_key.decode())
 
         return rotated
 
+    def rotate_key_in_background(self, new_key: bytes = None, batch_size: int = 500) -> KeyRotationJob:
+        """Switch to new_key now and re-encrypt the account store in batches on a worker thread."""
+        if not new_key:
+            new_key = Fernet.generate_key()
+
+        old_key = self.encryption_key
+        self._rotate_token_file(MultiFernet([Fernet(new_key), self.fernet]))
+
+        self.previous_keys = [old_key] + self.previous_keys
+        self._update_env_file("SECRET_KEY", new_key.decode())
+        self._update_env_file("SECRET_KEY_PREVIOUS", ",".join(k.decode() for k in self.previous_keys))
+        self.fernet = Fernet(new_key)
+        self.encryption_key = new_key
+
+        def retire_previous_keys():
+            self.previous_keys = []
+            self._update_env_file("SECRET_KEY_PREVIOUS", "")
+
+        job = KeyRotationJob(self.get_store(), new_key, batch_size=batch_size, on_complete=retire_previous_keys)
+        job.start()
+        return job
+
+    def _rotate_token_file(self, multi_fernet: MultiFernet):
+        if not os.path.exists(self.token_file_path):
+            return
+        with open(self.token_file_path, "rb") as f:
+            encrypted_data = f.read()
+        try:
+            rotated = multi_fernet.rotate(encrypted_data)
+        except Exception as e:
+            self.logger.error("[TokenManager] Could not re-encrypt saved token: %s", e)
+            return
+
+        tmp_path = self.token_file_path.with_name(self.token_file_path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(rotated)
+        os.replace(tmp_path, self.token_file_path)
+
     def _update_env_file(self, new_key:str, new_value:str):
         lines = []
         found = False
-        base_dir = Path(__file__).resolve().parents[2]
-        env_path = base_dir / ".env"
+        env_path = self.env_path
         if os.path.exists(env_path):
             with open(env_path, "r", encoding="utf-8") as f:
                 lines = f.readlines()
 
             for i, line in enumerate(lines):
                 if line.startswith(f"{new_key}="):
-                    lines[i] = f"{new_key}={new_value}"
+                    lines[i] = f"{new_key}={new_value}" + ("\n" if line.endswith("\n") else "")
                     found = True
                     break
 
         if not found:
+            if lines and not lines[-1].endswith("\n"):
+                lines[-1] += "\n"
             lines.append(f"{new_key}={new_value}")
 
         with open(env_path, "w", encoding="utf-8") as f:
@@ -0,0 +1,156 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from cryptography.fernet import Fernet, MultiFernet
+from echoseed.file_lock import FileLock
+
+
+class TokenStore:
+    """Encrypted per-account token store: one Fernet blob per SQLite row plus a decrypted LRU."""
+
+    def __init__(self, keys, db_path, cache_size: int = 1024):
+        if isinstance(keys, (bytes, str)):
+            keys = [keys]
+        self.logger = logging.getLogger("echoseed.token_store")
+        self.db_path = Path(db_path)
+        self.keys = [k.encode() if isinstance(k, str) else k for k in keys]
+        self.fernet = MultiFernet([Fernet(k) for k in self.keys])
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(self.db_path.with_name(self.db_path.name + ".lock"))
+
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tokens ("
+            "account_id TEXT PRIMARY KEY, token BLOB NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._data_version = self._read_data_version()
+
+    def _read_data_version(self):
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _sync_cache(self):
+        # data_version moves when another connection commits, so cached plaintext may be stale.
+        version = self._read_data_version()
+        if version != self._data_version:
+            self._cache.clear()
+            self._data_version = version
+
+    def _remember(self, account_id, token_data):
+        self._cache[account_id] = token_data
+        self._cache.move_to_end(account_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    @contextmanager
+    def transaction(self):
+        """Exclusive, atomic write section across threads and processes."""
+        with self._lock, self._file_lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            self._data_version = self._read_data_version()
+
+    def encrypt(self, token_data) -> bytes:
+        return self.fernet.encrypt(json.dumps(token_data).encode())
+
+    def decrypt(self, blob: bytes):
+        return json.loads(self.fernet.decrypt(blob).decode())
+
+    def get(self, account_id: str):
+        with self._lock:
+            self._sync_cache()
+            if account_id in self._cache:
+                self._cache.move_to_end(account_id)
+                return self._cache[account_id]
+
+            row = self._conn.execute(
+                "SELECT token FROM tokens WHERE account_id = ?", (account_id,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            try:
+                token_data = self.decrypt(row[0])
+            except Exception as e:
+                self.logger.error("[TokenStore] Failed to decrypt token for %s: %s", account_id, e)
+                return None
+
+            self._remember(account_id, token_data)
+            return token_data
+
+    def put(self, account_id: str, token_data: dict):
+        self.put_many({account_id: token_data})
+
+    def put_many(self, tokens: dict):
+        now = time.time()
+        rows = [(account_id, self.encrypt(data), now) for account_id, data in tokens.items()]
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO tokens (account_id, token, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(account_id) DO UPDATE SET token = excluded.token, updated_at = excluded.updated_at",
+                rows
+            )
+            for account_id, data in tokens.items():
+                self._remember(account_id, data)
+
+    def delete(self, account_id: str):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM tokens WHERE account_id = ?", (account_id,))
+            self._cache.pop(account_id, None)
+
+    def accounts(self) -> list:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT account_id FROM tokens ORDER BY account_id")]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM tokens").fetchone()[0]
+
+    def __contains__(self, account_id):
+        return self.get(account_id) is not None
+
+    def add_key(self, new_key: bytes):
+        """Make new_key the primary encryption key while still accepting the current ones."""
+        with self._lock:
+            self.keys = [new_key] + self.keys
+            self.fernet = MultiFernet([Fernet(k) for k in self.keys])
+
+    def retire_old_keys(self):
+        """Stop accepting every key except the primary one."""
+        with self._lock:
+            self.keys = self.keys[:1]
+            self.fernet = MultiFernet([Fernet(self.keys[0])])
+
+    def rotate(self, new_key: bytes = None) -> int:
+        """Re-encrypt every row under new_key in a single transaction. Returns the row count."""
+        if new_key:
+            self.add_key(new_key)
+
+        with self.transaction() as conn:
+            rows = conn.execute("SELECT account_id, token FROM tokens").fetchall()
+            conn.executemany(
+                "UPDATE tokens SET token = ? WHERE account_id = ?",
+                [(self.fernet.rotate(blob), account_id) for account_id, blob in rows]
+            )
+
+        self.logger.info("[TokenStore] Rotated %d tokens", len(rows))
+        return len(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+            self._cache.clear()
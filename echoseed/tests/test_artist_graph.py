@@ -0,0 +1,90 @@
+import numpy as np
+import scipy.sparse as sp
+from unittest.mock import MagicMock
+from echoseed.ai.artist_graph import ArtistGraph
+from echoseed.ai.playlist_generator import PlaylistGenerator
+from echoseed.model.playlist import Playlist
+
+def build(playlists):
+    graph = ArtistGraph()
+    graph.update_playlists((playlist_id, artists, "s1") for playlist_id, artists in playlists.items())
+    return graph
+
+def dense(graph, names):
+    ids = [graph.index[name] for name in names]
+    return graph.matrix.toarray()[np.ix_(ids, ids)]
+
+def test_counts_and_incremental_update_match_a_rebuild():
+    graph = build({"p1": ["A", "B", "C"], "p2": ["A", "B"], "p3": ["C", "D"]})
+    assert dense(graph, "AB").tolist() == [[2, 2], [2, 2]]
+    assert graph.degrees()[graph.index["C"]] == 2
+
+    assert not graph.update_playlist("p1", ["A", "B", "C"], "s1")
+    assert graph.update_playlist("p1", ["A", "D"], "s2")
+    graph.remove_playlists(["p3"])
+
+    expected = build({"p1": ["A", "D"], "p2": ["A", "B"]})
+    names = ["A", "B", "D"]
+    assert dense(graph, names).tolist() == dense(expected, names).tolist()
+    assert graph.degrees()[graph.index["C"]] == 0
+    assert isinstance(graph.matrix, sp.csr_matrix)
+
+def test_neighbours_and_rank():
+    graph = build({"p1": ["A", "B"], "p2": ["A", "B"], "p3": ["A", "C"], "p4": ["D", "E"], "p5": ["E"]})
+
+    neighbours = graph.neighbours(["A"], k=5)
+    assert [name for name, _ in neighbours] == ["B", "C"]
+    assert graph.expand(["A", "Z"], k=1) == ["A", "Z", "B"]
+    assert graph.neighbours(["Z"]) == []
+
+    assert graph.rank(["unknown", "D", "E", "A"]) == ["A", "E", "D", "unknown"]
+    assert graph.rank(["D", "B", "C"], seeds=["A"]) == ["B", "C", "D"]
+
+def test_save_and_load_round_trip(tmp_path):
+    graph = build({"p1": ["A", "B"], "p2": ["B", "C"]})
+    path = tmp_path / "graph.npz"
+    graph.save(path)
+
+    loaded = ArtistGraph.load(path)
+    assert loaded.names == graph.names
+    assert (loaded.matrix != graph.matrix).nnz == 0
+    assert loaded.playlists["p1"][0] == "s1"
+    assert not loaded.update_playlist("p1", ["A", "B"], "s1")
+    assert ArtistGraph.load_or_create(tmp_path / "missing.npz").playlists == {}
+
+def test_sync_reads_only_changed_playlists():
+    service = MagicMock()
+    playlists = [Playlist("p1", "One", "u", "s1"), Playlist("p2", "Two", "u", "s1")]
+    tracks = {
+        "p1": [{"artists": [{"name": "A"}, {"name": "B"}]}],
+        "p2": [{"artists": [{"name": "B"}]}, {"artists": [{"name": "C"}]}],
+    }
+    service.iter_user_playlists.side_effect = lambda: iter(playlists)
+    service.iter_playlist_items.side_effect = lambda playlist_id: iter(tracks[playlist_id])
+    graph = ArtistGraph()
+
+    assert graph.sync(service) == 2
+    assert graph.neighbours(["A"]) and graph.neighbours(["A"])[0][0] == "B"
+
+    service.iter_playlist_items.reset_mock()
+    playlists[:] = [Playlist("p2", "Two", "u", "s2")]
+    tracks["p2"] = [{"artists": [{"name": "C"}, {"name": "D"}]}]
+    assert graph.sync(service) == 1
+    service.iter_playlist_items.assert_called_once_with("p2")
+    assert set(graph.playlists) == {"p2"}
+    assert graph.degrees()[graph.index["A"]] == 0
+    assert [name for name, _ in graph.neighbours(["C"])] == ["D"]
+
+def test_prompt_artists_are_trimmed_with_the_graph(tmp_path, monkeypatch):
+    from echoseed.ai import playlist_generator
+    from echoseed.ai.artifacts import ArtifactRegistry
+
+    registry = ArtifactRegistry(root=tmp_path)
+    monkeypatch.setattr(playlist_generator, "get_registry", lambda: registry)
+    monkeypatch.setattr(playlist_generator, "MAX_PROMPT_ARTISTS", 2)
+    generator = PlaylistGenerator(MagicMock(), "chill", user={"id": "u"}, ai_client=MagicMock())
+
+    assert generator.select_prompt_artists(["C", "B", "A"]) == ["C", "B", "A"]
+
+    build({"p1": ["A", "B"], "p2": ["A", "C"], "p3": ["A"]}).save(registry.path("artist_graph"))
+    assert generator.select_prompt_artists(["C", "B", "A"]) == ["A", "C"]
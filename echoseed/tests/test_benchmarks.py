@@ -0,0 +1,30 @@
+import json
+import pandas as pd
+from echoseed.benchmarks import pipeline
+
+def test_synthetic_catalog_has_realistic_noise(tmp_path):
+    df = pd.read_csv(pipeline.write_synthetic_catalog(tmp_path / "catalog.csv", 5000, seed=1))
+
+    assert len(df) == 5000
+    assert df["track_id"].is_unique
+    assert 0 < df["energy"].isna().sum() + (df["energy"] == 0).sum() < 150
+    assert df.duplicated(["track_name", "artists"]).sum() > 50
+    assert df["tempo"].between(50, 210).all()
+
+def test_pipeline_run_records_every_stage_and_flags_regressions(tmp_path):
+    baseline = tmp_path / "baseline.json"
+
+    report = pipeline.run(["1500"], baseline, save_baseline=True, max_k=2)
+
+    stages = report["sizes"]["1500"]["stages"]
+    assert list(stages) == list(pipeline.STAGES)
+    assert all(set(metrics) == {"seconds", "peak_rss_mb", "tracemalloc_peak_mb"} for metrics in stages.values())
+    assert report["regressions"] == []
+    assert json.loads(baseline.read_text())["sizes"]["1500"]["stages"] == stages
+
+    slower = {"sizes": {"1500": {"stages": {"cluster": {"seconds": 10.0, "peak_rss_mb": 100.0}}}}}
+    fast = {"sizes": {"1500": {"stages": {"cluster": {"seconds": 0.01, "peak_rss_mb": 100.0}}}}}
+    current = {"sizes": {"1500": {"stages": {"cluster": {"seconds": 2.0, "peak_rss_mb": 110.0}}}}}
+    assert pipeline.compare(current, slower) == []
+    regressions = pipeline.compare(current, fast, threshold=0.25)
+    assert [(r["stage"], r["metric"]) for r in regressions] == [("cluster", "seconds")]
@@ -0,0 +1,32 @@
+import threading
+import urllib.error
+import urllib.request
+import pytest
+from echoseed.api.callback_server import OAuthCallbackServer
+
+def test_callback_hands_over_code_and_shuts_down():
+    server = OAuthCallbackServer(port=0)
+    server.start()
+    port = server.port
+
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/callback?code=abc123") as response:
+        assert response.status == 200
+
+    assert server.wait_for_code(timeout=1) == "abc123"
+    server.stop()
+
+    assert not any(t.name == "oauth-callback" for t in threading.enumerate())
+    with pytest.raises(urllib.error.URLError):
+        urllib.request.urlopen(f"http://127.0.0.1:{port}/callback?code=again", timeout=1)
+
+def test_callback_without_code_raises():
+    with OAuthCallbackServer(port=0) as server:
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"http://127.0.0.1:{server.port}/callback?error=access_denied")
+
+        with pytest.raises(RuntimeError, match="access_denied"):
+            server.wait_for_code(timeout=1)
+
+def test_wait_for_code_times_out():
+    with OAuthCallbackServer(port=0) as server:
+        assert server.wait_for_code(timeout=0.05) is None
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import MagicMock
+from sklearn.preprocessing import MinMaxScaler
+from echoseed.ai.catalog_query import CatalogIndex, get_catalog_index, parse_query
+from echoseed.ai.preprocessing.normalize_features import FEATURES
+
+def make_catalog(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    raw = np.column_stack([rng.uniform(60, 200, n), rng.uniform(0, 1, (n, 3))])
+    scaler = MinMaxScaler(feature_range=(1, 10)).fit(raw)
+    df = pd.DataFrame(scaler.transform(raw), columns=FEATURES)
+    df.insert(0, "track_id", [f"t{i}" for i in range(n)])
+    df["cluster"] = rng.integers(0, 4, n)
+    return df, raw, scaler
+
+def test_parse_query():
+    assert parse_query("energy > 7, tempo 120–130; mood chill, limit 30") == {
+        "where": {"energy": (np.nextafter(7.0, np.inf), None), "tempo": (120.0, 130.0)},
+        "mood": "chill",
+        "limit": 30,
+    }
+    assert parse_query("valence >= 2, valence < 5, cluster 1 3, near energy=8 tempo=125") == {
+        "where": {"valence": (2.0, np.nextafter(5.0, -np.inf))},
+        "clusters": [1, 3],
+        "near": {"energy": 8.0, "tempo": 125.0},
+    }
+    assert parse_query("near valence 8 tempo=125") == {"near": {"valence": 8.0, "tempo": 125.0}}
+    for bad in ("loudness > 3", "chill", "late night", "near valence high"):
+        with pytest.raises(ValueError):
+            parse_query(bad)
+
+def test_range_cluster_and_mood_filters_match_a_scan():
+    df, raw, scaler = make_catalog()
+    index = CatalogIndex.from_frame(df, {"0": "chill", "2": "chill", "1": "hype"}, scaler)
+
+    rows = index.query_rows(where={"energy": (7, None), "tempo": (120, 130)}, mood="chill")
+    expected = np.flatnonzero(
+        (df["energy"] >= 7) & (raw[:, 0] >= 120) & (raw[:, 0] <= 130) & df["cluster"].isin([0, 2])
+    )
+    assert rows.tolist() == expected.tolist()
+    assert len(rows) > 0
+
+    assert index.query_rows(clusters=[1], limit=5).tolist() == np.flatnonzero(df["cluster"] == 1)[:5].tolist()
+    assert index.query(where={"danceability": (11, None)}) == []
+    assert index.query_rows(mood="unknown").tolist() == []
+
+def test_near_ranks_by_distance_over_the_given_features():
+    df, _, scaler = make_catalog()
+    index = CatalogIndex.from_frame(df, scaler=scaler)
+
+    rows = index.query_rows(where={"valence": (5, None)}, near={"energy": 8, "danceability": 3}, limit=10)
+    candidates = df[df["valence"] >= 5]
+    distances = np.hypot(candidates["energy"] - 8, candidates["danceability"] - 3)
+    assert rows.tolist() == candidates.index[np.argsort(distances.to_numpy(), kind="stable")][:10].tolist()
+
+def test_search_and_cached_index():
+    df, _, scaler = make_catalog(200)
+    registry = MagicMock()
+    registry.load.side_effect = lambda name: {"dataset": df, "mood_map": {"1": "hype"}, "scaler": scaler}[name]
+
+    index = get_catalog_index(registry)
+    assert get_catalog_index(registry) is index
+    ids = index.search("mood hype, energy >= 5", limit=3)
+    assert len(ids) == 3
+    assert all(df.set_index("track_id").loc[ids, "cluster"] == 1)
+
+def test_generator_serves_query_moods_locally(monkeypatch):
+    from echoseed.ai import playlist_generator
+    from echoseed.ai.playlist_generator import PlaylistGenerator
+
+    df, _, scaler = make_catalog(500)
+    index = CatalogIndex.from_frame(df, scaler=scaler)
+    monkeypatch.setattr(playlist_generator, "get_catalog_index", lambda: index)
+    spotify = MagicMock()
+    spotify.user_playlist_create.return_value = {"id": "p1"}
+    ai_client = MagicMock()
+    ai_client.chat.completions.create.return_value.choices[0].message.content = "Fast Lane"
+    generator = PlaylistGenerator(spotify, "energy > 8, tempo 100-180", user={"id": "u"}, ai_client=ai_client)
+
+    result = generator.generate_playlist(limit=5, source="query", ordering="ramp_up")
+
+    uris = spotify.playlist_add_items.call_args[0][1]
+    picked = df.set_index("track_id").loc[[uri.rsplit(":", 1)[1] for uri in uris]]
+    assert result["served_by"]["tracks"] == "query"
+    assert len(uris) == 5
+    assert (picked["energy"] > 8).all()
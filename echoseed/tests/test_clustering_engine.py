@@ -0,0 +1,104 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from echoseed.ai.artifacts import ArtifactIntegrityError, ArtifactRegistry
+from echoseed.ai.clustering import clustering_engine
+
+def make_raw(n, seed=0, start=0, tempo=(60, 180), spread=(0.1, 0.9)):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "track_id": [f"t{i}" for i in range(start, start + n)],
+        "tempo": rng.uniform(*tempo, n),
+        "danceability": rng.uniform(*spread, n),
+        "energy": rng.uniform(*spread, n),
+        "valence": rng.uniform(*spread, n),
+    })
+
+@pytest.fixture(autouse=True)
+def registry(tmp_path, monkeypatch):
+    registry = ArtifactRegistry(root=tmp_path)
+    monkeypatch.setattr(clustering_engine, "registry", registry)
+    return registry
+
+def test_assign_appends_only_new_tracks(registry):
+    base = make_raw(200)
+    clustering_engine.cluster_features(audio_features=base)
+
+    update = pd.concat([base.iloc[:50], make_raw(30, seed=1, start=200, tempo=(80, 160), spread=(0.2, 0.8))])
+    new_df, drift = clustering_engine.assign_new_tracks(update)
+
+    stored = pd.read_csv(registry.path("dataset"))
+    assert len(new_df) == 30
+    assert len(stored) == 230
+    assert stored["track_id"].is_unique
+    assert set(stored["cluster"]) <= {0, 1, 2, 3}
+    assert not drift["drifted"]
+    assert registry.manifest()["version"] == 1
+    assert registry.verify()["dataset"]
+
+def test_assign_rebuilds_published_mood_pools(registry):
+    from echoseed.ai.mood_pools import MoodPools, refresh_mood_pools
+
+    clustering_engine.cluster_features(audio_features=make_raw(200))
+    registry.path("mood_map").write_text(json.dumps({"0": "calm", "1": "calm", "2": "hype", "3": "hype"}))
+    assert refresh_mood_pools(registry)
+    registry.publish()
+
+    clustering_engine.assign_new_tracks(make_raw(30, seed=1, start=200, tempo=(80, 160), spread=(0.2, 0.8)))
+
+    pools = MoodPools.load(registry)
+    pooled = set(pools.pool("calm")[0]) | set(pools.pool("hype")[0])
+    assert pooled == {f"t{i}" for i in range(230)}
+    assert registry.manifest()["version"] == 2
+    assert all(registry.verify().values())
+
+def test_registry_rejects_artifacts_that_changed_since_publish(registry):
+    clustering_engine.cluster_features(audio_features=make_raw(200))
+    registry.publish(("model", "dataset"))
+    with open(registry.path("dataset"), "a") as f:
+        f.write("t999,1,1,1,1,0\n")
+
+    with pytest.raises(ArtifactIntegrityError):
+        registry.load("dataset")
+    assert registry.load("model").n_clusters == 4
+
+    clustering_engine.cluster_features(audio_features=make_raw(200, seed=1))
+    assert len(registry.load("dataset")) == 200
+    assert set(registry.manifest()["artifacts"]) == set()
+
+def test_assign_flags_drift_outside_scaler_range():
+    clustering_engine.cluster_features(audio_features=make_raw(200))
+
+    _, drift = clustering_engine.assign_new_tracks(make_raw(20, seed=2, start=500, tempo=(200, 240)))
+
+    assert drift["drifted"]
+    assert drift["per_feature"]["tempo"] == 20
+
+def test_batch_predict_matches_model_across_worker_processes(registry, tmp_path, monkeypatch):
+    from echoseed.ai.clustering import batch_predict
+
+    monkeypatch.setattr(batch_predict, "get_registry", lambda: registry)
+    monkeypatch.setattr(batch_predict, "CHUNK_ROWS", 900)
+    _, model = clustering_engine.cluster_features(audio_features=make_raw(300))
+    raw = make_raw(5000, seed=3)
+    raw.loc[10, "energy"] = 0
+    raw.to_csv(tmp_path / "catalog.csv", index=False)
+
+    result = batch_predict.batch_predict(tmp_path / "catalog.csv", workers=2, raw=True, shard_rows=700)
+
+    labelled = pd.read_csv(result["output"])
+    expected = clustering_engine.filter_audio_features(raw)
+    scaled = registry.load("scaler").transform(expected[clustering_engine.FEATURES]).astype(np.float32)
+    scaled = pd.DataFrame(scaled.astype(np.float64), columns=clustering_engine.FEATURES)
+    assert result["output"] == str(registry.path("dataset").parent / "catalog_clustered.csv")
+    assert result["rows"] == len(labelled) == 4999
+    assert labelled["track_id"].tolist() == expected["track_id"].tolist()
+    assert labelled["cluster"].tolist() == model.predict(scaled).tolist()
+    assert sum(result["clusters"].values()) == 4999
+    assert not list(tmp_path.glob("batch_predict_*"))
+
+    normalized = tmp_path / "normalized.csv"
+    labelled.drop(columns="cluster").to_csv(normalized, index=False)
+    again = batch_predict.batch_predict(normalized, tmp_path / "out.csv", workers=1)
+    assert pd.read_csv(again["output"])["cluster"].tolist() == labelled["cluster"].tolist()
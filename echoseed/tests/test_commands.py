@@ -0,0 +1,88 @@
+import io
+import json
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock
+from echoseed.ui import commands
+
+def run(argv, monkeypatch, service=None):
+    context = commands._Context()
+    context._spotify = MagicMock()
+    context.service = service
+    monkeypatch.setattr(commands, "_Context", lambda: context)
+    out = io.StringIO()
+    code = commands.main(argv, out=out)
+    return code, [json.loads(line) for line in out.getvalue().splitlines()]
+
+def test_randomize_batch_from_file_emits_json_per_job(monkeypatch, tmp_path):
+    service = MagicMock()
+    service.randomize_playlist.side_effect = lambda name, ordering=None: None if name == "missing" else 12
+    batch = tmp_path / "jobs.txt"
+    batch.write_text('Slow Drift\n\n{"playlist": "Gym", "ordering": "ramp_up"}\nmissing\n')
+
+    code, records = run(["randomize", "--batch", str(batch)], monkeypatch, service)
+
+    assert code == 1
+    assert [r["ok"] for r in records] == [True, True, False]
+    assert records[1]["result"] == {"playlist": "Gym", "tracks": 12}
+    assert records[1]["job"]["ordering"] == "ramp_up"
+    assert "not found" in records[2]["error"]
+    assert all("seconds" in r for r in records)
+
+def test_missing_required_name_is_reported(monkeypatch):
+    code, records = run(["generate"], monkeypatch)
+
+    assert code == 1
+    assert records[0]["error"] == "--mood is required"
+
+def test_benchmark_reports_timings(monkeypatch):
+    code, records = run(["benchmark", "--tracks", "300", "--time-budget", "0.05"], monkeypatch)
+
+    assert code == 0
+    assert set(records[0]["result"]["ordering_seconds"]) == {"smooth", "ramp_up", "cool_down"}
+
+def test_profile_flag_writes_stage_report(monkeypatch, tmp_path):
+    monkeypatch.setattr(commands.profiling, "REPORT_DIR", tmp_path)
+
+    code, _ = run(["--profile", "benchmark", "--tracks", "200", "--time-budget", "0.01"], monkeypatch)
+
+    report = json.loads(next(tmp_path.glob("profile-*.json")).read_text())
+    assert code == 0
+    assert commands.profiling.active() is None
+    assert "order_tracks" in report["stages"]
+
+def test_randomize_path_does_not_import_heavy_subsystems():
+    root = Path(__file__).resolve().parents[2]
+    script = (
+        "import sys, echoseed.ui.commands, echoseed.api.playlist_service\n"
+        "heavy = [m for m in ('sklearn', 'openai', 'google.genai') if m in sys.modules]\n"
+        "print(','.join(heavy))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], cwd=root, capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == ""
+
+def test_generate_keeps_the_default_budget_unless_given(monkeypatch):
+    from echoseed.ai import playlist_generator
+
+    generator = MagicMock()
+    generator.return_value.generate_playlist.return_value = {"id": "p1"}
+    monkeypatch.setattr(playlist_generator, "PlaylistGenerator", generator)
+
+    run(["generate", "--mood", "chill"], monkeypatch)
+    run(["generate", "--mood", "chill", "--budget", "3"], monkeypatch)
+
+    assert "latency_budget" not in generator.call_args_list[0].kwargs
+    assert generator.call_args_list[1].kwargs["latency_budget"] == 3.0
+
+def test_generate_rejects_a_malformed_query_before_authenticating(monkeypatch):
+    context = commands._Context()
+    monkeypatch.setattr(commands, "_Context", lambda: context)
+    monkeypatch.setattr(commands, "_spotify_client", MagicMock(side_effect=AssertionError("authenticated")))
+    out = io.StringIO()
+
+    code = commands.main(["generate", "--source", "query", "--mood", "chill"], out=out)
+
+    assert code == 1
+    assert "Cannot parse" in json.loads(out.getvalue())["error"]
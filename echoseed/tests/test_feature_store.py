@@ -0,0 +1,71 @@
+import threading
+import numpy as np
+from unittest.mock import MagicMock
+from echoseed.ai.feature_store import FeatureStore
+
+def fake_spotify(calls):
+    spotify = MagicMock()
+    lock = threading.Lock()
+
+    def audio_features(batch):
+        with lock:
+            calls.append(list(batch))
+        return [
+            {"id": track_id, "tempo": 100.0 + i, "danceability": 0.5, "energy": 0.6, "valence": 0.7}
+            if not track_id.startswith("missing") else None
+            for i, track_id in enumerate(batch)
+        ]
+
+    spotify.audio_features.side_effect = audio_features
+    return spotify
+
+def test_fetch_batches_dedupes_and_persists(tmp_path):
+    calls = []
+    ids = [f"track{i:05d}" for i in range(250)]
+    store = FeatureStore(tmp_path)
+
+    features = store.fetch(fake_spotify(calls), ids + ids[:50] + ["missing1"])
+
+    assert sorted(len(batch) for batch in calls) == [51, 100, 100]
+    assert len(features) == 250
+    assert len(store) == 250
+
+    reopened = FeatureStore(tmp_path)
+    found, values = reopened.lookup(["track00001", "nope"])
+    assert found.tolist() == [True, False]
+    assert np.isnan(values[1]).all()
+    assert isinstance(reopened._ids, np.memmap)
+
+def test_fetch_only_requests_unknown_ids(tmp_path):
+    calls = []
+    store = FeatureStore(tmp_path)
+    store.fetch(fake_spotify(calls), ["a", "b"])
+    store.fetch(fake_spotify(calls), ["a", "b", "c"])
+
+    assert calls == [["a", "b"], ["c"]]
+    assert store.to_frame(["c", "a", "zzz"])["track_id"].tolist() == ["c", "a"]
+    assert len(list(tmp_path.glob("ids-*.npy"))) == 1
+
+def test_concurrent_fetches_keep_every_row(tmp_path):
+    stores = [FeatureStore(tmp_path), FeatureStore(tmp_path)]
+    id_sets = [[f"t{worker}-{i:05d}" for i in range(3000)] for worker in range(4)]
+    errors = []
+
+    def fetch(worker):
+        try:
+            stores[worker % 2].fetch(fake_spotify([]), id_sets[worker])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=fetch, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    reopened = FeatureStore(tmp_path)
+    found, _ = reopened.lookup([track_id for ids in id_sets for track_id in ids])
+    assert errors == []
+    assert len(reopened) == 12000
+    assert found.all()
+    assert not list(tmp_path.glob("*.tmp"))
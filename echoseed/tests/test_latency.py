@@ -0,0 +1,104 @@
+import threading
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+from echoseed.ai import latency
+from echoseed.ai.latency import DeadlineExceeded, NAME_TEMPLATES, call_with_deadline, template_name
+from echoseed.ai.playlist_generator import PlaylistGenerator
+
+def test_fast_call_is_served_by_first_attempt():
+    assert call_with_deadline(lambda: "ok", 1.0) == ("ok", 1)
+
+def test_slow_call_is_hedged():
+    calls = []
+    lock = threading.Lock()
+
+    def flaky():
+        with lock:
+            calls.append(1)
+            first = len(calls) == 1
+        time.sleep(1.0 if first else 0.01)
+        return "hedged" if not first else "slow"
+
+    started = time.perf_counter()
+    result = call_with_deadline(flaky, 0.4, hedge=True, hedge_after=0.25)
+
+    assert result == ("hedged", 2)
+    assert time.perf_counter() - started < 0.3
+
+def test_deadline_and_errors():
+    with pytest.raises(DeadlineExceeded):
+        call_with_deadline(lambda: time.sleep(0.5), 0.05)
+    with pytest.raises(ZeroDivisionError):
+        call_with_deadline(lambda: 1 / 0, 1.0)
+
+def settle_abandoned_calls(timeout=2.0):
+    """Wait for calls abandoned by earlier tests to finish."""
+    deadline = time.perf_counter() + timeout
+    while latency.abandoned_calls() and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    return latency.abandoned_calls()
+
+def test_abandoned_calls_are_bounded_on_a_saturated_executor(monkeypatch):
+    assert settle_abandoned_calls() == 0
+    executor = ThreadPoolExecutor(max_workers=3)
+    monkeypatch.setattr(latency, "_executor", executor)
+    monkeypatch.setattr(latency, "MAX_ABANDONED", 2)
+    release = threading.Event()
+    calls = []
+
+    def hung():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(5)
+        return "hedged"
+
+    assert call_with_deadline(hung, 0.2, hedge=True, hedge_after=0.1) == ("hedged", 2)
+    with pytest.raises(DeadlineExceeded):
+        call_with_deadline(lambda: release.wait(5), 0.05)
+    assert latency.abandoned_calls() == 2
+
+    started = time.perf_counter()
+    with pytest.raises(DeadlineExceeded, match="abandoned"):
+        call_with_deadline(lambda: "ok", 1.0)
+    assert time.perf_counter() - started < 0.05
+
+    release.set()
+    assert settle_abandoned_calls() == 0
+    assert call_with_deadline(lambda: "ok", 1.0) == ("ok", 1)
+    executor.shutdown()
+
+def test_template_name_uses_mood():
+    name = template_name("late night", rng=MagicMock(choice=lambda options: options[0]))
+    assert name == NAME_TEMPLATES[0].format(Mood="Late Night")
+
+def test_budget_falls_back_to_local_tracks_and_template_name(monkeypatch):
+    spotify = MagicMock()
+    spotify.user_playlist_create.return_value = {"id": "p1"}
+    ai_client = MagicMock()
+    ai_client.chat.completions.create.side_effect = lambda **kwargs: time.sleep(1.0)
+    generator = PlaylistGenerator(spotify, "chill", user={"id": "u"}, ai_client=ai_client, latency_budget=0.1)
+    monkeypatch.setattr(generator, "get_artists_from_playlists", lambda: ["A"])
+    monkeypatch.setattr(generator, "get_pool_tracks", lambda limit, ordering=None: ["spotify:track:local"])
+
+    started = time.perf_counter()
+    result = generator.generate_playlist(limit=5)
+
+    assert time.perf_counter() - started < 0.5
+    assert result["served_by"] == {"name": "template", "tracks": "local"}
+    assert result["tracks"] == 1
+    spotify.playlist_add_items.assert_called_once_with("p1", ["spotify:track:local"])
+
+def test_local_sources_without_budget_skip_the_llm(monkeypatch):
+    spotify = MagicMock()
+    spotify.user_playlist_create.return_value = {"id": "p1"}
+    ai_client = MagicMock()
+    generator = PlaylistGenerator(spotify, "chill", user={"id": "u"}, ai_client=ai_client, latency_budget=0)
+    monkeypatch.setattr(generator, "get_pool_tracks", lambda limit, ordering=None: ["spotify:track:local"])
+
+    result = generator.generate_playlist(limit=5, source="pool")
+
+    assert result["served_by"] == {"name": "template", "tracks": "pool"}
+    assert "Chill" in result["name"]
+    ai_client.chat.completions.create.assert_not_called()
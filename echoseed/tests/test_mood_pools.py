@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+from echoseed.ai.artifacts import ArtifactRegistry
+from echoseed.ai.mood_pools import MoodPools, build_mood_pools, save_mood_pools
+
+def make_catalog(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "track_id": [f"id{i}" for i in range(n)],
+        "tempo": rng.uniform(1, 10, n),
+        "danceability": rng.uniform(1, 10, n),
+        "energy": rng.uniform(1, 10, n),
+        "valence": rng.uniform(1, 10, n),
+        "cluster": rng.integers(0, 4, n),
+    })
+
+def test_pools_are_ordered_by_centroid_distance():
+    df = make_catalog()
+    centroids = df.groupby("cluster")[["tempo", "danceability", "energy", "valence"]].mean().to_numpy()
+    pools = MoodPools(build_mood_pools(df, {"0": "chill", "1": "hype", "2": "chill", "3": "sad"}, centroids))
+
+    ids, distances, features = pools.pool("chill")
+
+    assert pools.moods() == ["chill", "hype", "sad"]
+    assert len(ids) == int(df["cluster"].isin([0, 2]).sum())
+    assert np.all(np.diff(distances) >= 0)
+    assert features.shape == (len(ids), 4)
+
+def test_sample_is_unique_and_prefers_close_tracks():
+    df = make_catalog()
+    centroids = df.groupby("cluster")[["tempo", "danceability", "energy", "valence"]].mean().to_numpy()
+    pools = MoodPools(build_mood_pools(df, {"0": "chill", "1": "hype", "2": "sad", "3": "sad"}, centroids))
+
+    picks = pools.sample_indices("sad", 20, rng=np.random.default_rng(1))
+    ids, _, _ = pools.pool("sad")
+
+    assert len(picks) == 20
+    assert len(set(ids[picks])) == 20
+    assert picks.max() < 20 * 4
+
+def test_saved_pools_load_through_the_registry(tmp_path):
+    df = make_catalog()
+    centroids = df.groupby("cluster")[["tempo", "danceability", "energy", "valence"]].mean().to_numpy()
+    arrays = build_mood_pools(df, {"0": "chill", "1": "hype", "2": "sad", "3": "sad"}, centroids)
+    registry = ArtifactRegistry(root=tmp_path)
+    save_mood_pools(arrays, registry.path("mood_pools"))
+
+    pools = MoodPools.load(registry)
+
+    assert pools.moods() == ["chill", "hype", "sad"]
+    assert pools.pool("sad")[0].tolist() == arrays["sad:ids"].tolist()
@@ -0,0 +1,91 @@
+import json
+import re
+import threading
+import numpy as np
+import pandas as pd
+from unittest.mock import MagicMock
+from echoseed.ai.artifacts import ArtifactRegistry
+from echoseed.ai.tagging.mood_tagger import MoodTagger
+from echoseed.ai.tagging.sampling import representative_indices
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+def make_clusters(n):
+    track = {"tempo": 5.0, "danceability": 5.0, "energy": 5.0, "valence": 5.0}
+    return {cluster: [track] * 3 for cluster in range(n)}
+
+def test_tag_clusters_batches_prompts():
+    client = MagicMock()
+    calls = []
+    lock = threading.Lock()
+
+    def fake_generate(model, contents, config=None):
+        ids = re.findall(r"Playlist (\d+):", contents)
+        with lock:
+            calls.append(ids)
+        return FakeResponse(json.dumps({i: "Chill" for i in ids}))
+
+    client.models.generate_content.side_effect = fake_generate
+    tagger = MoodTagger(client=client, registry=MagicMock())
+
+    labels = tagger.tag_clusters(make_clusters(120))
+
+    assert len(calls) == 3
+    assert labels == {cluster: "chill" for cluster in range(120)}
+
+def test_tag_clusters_fans_out_for_missing_labels(monkeypatch):
+    client = MagicMock()
+    client.models.generate_content.return_value = FakeResponse(json.dumps({"0": "sad"}))
+    tagger = MoodTagger(client=client, registry=MagicMock())
+    monkeypatch.setattr(tagger, "get_gpt_label", lambda prompt: "hype")
+
+    labels = tagger.tag_clusters(make_clusters(3))
+
+    assert labels == {0: "sad", 1: "hype", 2: "hype"}
+
+def test_main_writes_cache_once(tmp_path, monkeypatch):
+    registry = ArtifactRegistry(root=tmp_path)
+    pd.DataFrame({
+        "tempo": [1.0, 2.0, 3.0], "danceability": [1.0, 2.0, 3.0],
+        "energy": [1.0, 2.0, 3.0], "valence": [1.0, 2.0, 3.0], "cluster": [0, 1, 2]
+    }).to_csv(registry.path("dataset"), index=False)
+    registry.path("mood_cache").write_text(json.dumps({"0": "chill"}))
+
+    tagger = MoodTagger(client=MagicMock(), registry=registry)
+    monkeypatch.setattr(tagger, "get_batch_labels", lambda clusters: {c: "hype" for c in clusters})
+    writes = []
+    original_write = tagger.write_json
+    monkeypatch.setattr(tagger, "write_json", lambda data, path: (writes.append(path), original_write(data, path)))
+
+    tagger.main()
+
+    assert writes.count(registry.path("mood_cache")) == 1
+    assert json.loads(registry.path("mood_map").read_text()) == {"0": "chill", "1": "hype", "2": "hype"}
+    assert registry.manifest()["version"] == 1
+
+def test_representative_indices_prefers_tracks_near_centroid():
+    features = np.array([[0.0], [10.0], [1.0], [5.0], [9.0], [2.0], [100.0]])
+    labels = np.array([0, 0, 0, 1, 1, 1, 1])
+    centroids = np.array([[1.0], [6.0]])
+
+    samples = representative_indices(features, labels, centroids, n_closest=1, n_spread=2)
+
+    assert samples[0].tolist() == [2, 0, 1]
+    assert samples[1][0] == 3
+    assert set(samples[1][1:]) == {4, 6}
+
+def test_get_clusters_puts_sample_first(tmp_path):
+    registry = ArtifactRegistry(root=tmp_path)
+    tempos = [1.0, 2.0, 3.0, 4.0, 5.0, 9.0, 9.5, 10.0]
+    pd.DataFrame({
+        "tempo": tempos, "danceability": [5.0] * 8, "energy": [5.0] * 8, "valence": [5.0] * 8,
+        "cluster": [0, 0, 0, 0, 0, 1, 1, 1]
+    }).to_csv(registry.path("dataset"), index=False)
+
+    clusters = MoodTagger(client=MagicMock(), registry=registry).get_clusters()
+
+    assert clusters[0][0]["tempo"] == 3.0
+    assert len(clusters[0]) == 5
+    assert clusters[1][0]["tempo"] == 9.5
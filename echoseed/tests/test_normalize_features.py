@@ -0,0 +1,54 @@
+import time
+import numpy as np
+import pandas as pd
+from echoseed.ai.preprocessing.normalize_features import FEATURES, dedupe_tracks, normalize_audio_features
+
+def make_catalog():
+    return pd.DataFrame([
+        ("a1", "Blue Monday", "New Order", 130.0, 0.70, 0.80, 0.50),
+        ("a2", "Blue Monday - 2015 Remaster", "New Order", 130.2, 0.70, 0.81, 0.50),
+        ("a3", "blue monday (feat. Someone)", "NEW ORDER", 130.0, 0.70, 0.80, 0.50),
+        ("a4", "Blue Monday", "New Order", 95.0, 0.40, 0.30, 0.20),
+        ("a1", "Blue Monday", "New Order", 130.0, 0.70, 0.80, 0.50),
+        ("b1", "Blue Monday", "Other Band", 130.0, 0.70, 0.80, 0.50),
+        ("c1", "Ceremony", "New Order", 60.0, 0.20, 0.10, 0.90),
+    ], columns=["track_id", "track_name", "artists"] + FEATURES)
+
+def test_dedupe_removes_exact_and_near_copies_only():
+    deduped, report = dedupe_tracks(make_catalog(), return_report=True)
+
+    assert deduped["track_id"].tolist() == ["a1", "a4", "b1", "c1"]
+    assert report == {"rows_in": 7, "exact_duplicates": 2, "near_duplicates": 1, "rows_out": 4, "shrink": 0.4286}
+
+def test_dedupe_without_text_columns_only_drops_exact_copies():
+    catalog = make_catalog().drop(columns=["track_name", "artists"])
+
+    deduped, report = dedupe_tracks(catalog, return_report=True)
+
+    assert deduped["track_id"].tolist() == ["a1", "a2", "a3", "a4", "b1", "c1"]
+    assert report["exact_duplicates"] == 1
+    assert report["near_duplicates"] == 0
+
+def test_near_duplicate_blocks_stay_linear_in_block_size():
+    rng = np.random.default_rng(0)
+    n = 20000
+    catalog = pd.DataFrame({
+        "track_id": [f"t{i}" for i in range(n)],
+        "track_name": "Intro",
+        "artists": "Various Artists",
+        **{feature: rng.uniform(1, 100, n) for feature in FEATURES},
+    })
+
+    started = time.perf_counter()
+    deduped, report = dedupe_tracks(catalog, return_report=True)
+
+    assert time.perf_counter() - started < 2.0
+    assert report["near_duplicates"] > 0
+    assert len(deduped) > n * 0.8
+
+def test_normalization_scales_before_dropping_duplicates():
+    df, scaler = normalize_audio_features(make_catalog(), return_scaler=True)
+
+    assert df["track_id"].tolist() == ["a1", "a4", "b1", "c1"]
+    assert scaler.data_max_[0] == 130.2
+    assert len(normalize_audio_features(make_catalog(), dedupe=False)) == 7
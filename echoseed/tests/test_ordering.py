@@ -0,0 +1,51 @@
+import time
+import numpy as np
+import pytest
+from unittest.mock import MagicMock
+from echoseed.ai.feature_store import FeatureStore
+from echoseed.ai.ordering import order_track_uris, order_tracks
+
+def path_length(features, order):
+    points = features[order][:, [0, 2, 3]]
+    points = (points - points.min(axis=0)) / np.ptp(points, axis=0)
+    return np.linalg.norm(np.diff(points, axis=0), axis=1).sum()
+
+def make_features(n, seed=0):
+    return np.random.default_rng(seed).uniform(1, 10, size=(n, 4))
+
+def test_smooth_order_is_a_shorter_permutation():
+    features = make_features(200)
+    order = order_tracks(features, "smooth")
+
+    assert sorted(order.tolist()) == list(range(200))
+    assert path_length(features, order) < 0.5 * path_length(features, np.arange(200))
+
+@pytest.mark.parametrize("mode, rising", [("ramp_up", True), ("cool_down", False)])
+def test_energy_arc_modes(mode, rising):
+    features = make_features(120, seed=1)
+    order = order_tracks(features, mode, segments=4)
+
+    band_energy = [band.mean() for band in np.array_split(features[order, 2], 4)]
+    assert band_energy == sorted(band_energy, reverse=not rising)
+
+def test_large_playlist_respects_time_budget():
+    features = make_features(5000, seed=2)
+    started = time.perf_counter()
+    order = order_tracks(features, "smooth", time_budget=0.5)
+
+    assert len(np.unique(order)) == 5000
+    assert time.perf_counter() - started < 1.5
+
+def test_order_track_uris_keeps_tracks_without_features(tmp_path):
+    spotify = MagicMock()
+    spotify.audio_features.return_value = [
+        {"id": "a", "tempo": 90, "danceability": 0.5, "energy": 0.9, "valence": 0.5},
+        {"id": "b", "tempo": 100, "danceability": 0.5, "energy": 0.1, "valence": 0.5},
+        {"id": "c", "tempo": 95, "danceability": 0.5, "energy": 0.5, "valence": 0.5},
+        None,
+    ]
+    uris = ["spotify:track:a", "spotify:track:b", "spotify:track:c", "spotify:track:x"]
+
+    ordered = order_track_uris(spotify, uris, "ramp_up", store=FeatureStore(tmp_path))
+
+    assert ordered == ["spotify:track:b", "spotify:track:c", "spotify:track:a", "spotify:track:x"]
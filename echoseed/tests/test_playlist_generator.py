@@ -132,7 +132,7 @@ def test_generate_playlist_creates_and_adds(monkeypatch):
     # Patch name and rec calls separately
     monkeypatch.setattr(generator.ai_client.chat.completions, "create", fake_create_name)
     # Patch get_recommended_tracks to directly use FakeRecResponse
-    monkeypatch.setattr(generator, "get_recommended_tracks", lambda limit=25: [
+    monkeypatch.setattr(generator, "get_recommended_tracks", lambda limit=25, artists=None: [
         "Drake - Hotline Bling",
         "Kanye West - Stronger"
     ])
@@ -198,7 +198,7 @@ def test_cli_to_generator_integration(monkeypatch, tmp_path):
         "tracks": {"items": [{"uri": f"spotify:track:{q.replace(' ', '_')}"}]}
     })
     monkeypatch.setattr(generator.ai_client.chat.completions, "create", fake_create_name)
-    monkeypatch.setattr(generator, "get_recommended_tracks", lambda limit=25: [
+    monkeypatch.setattr(generator, "get_recommended_tracks", lambda limit=25, artists=None: [
         "J Cole -  Apparently",
         "Kanye West - Stronger",
         "Earl Sweatshirt - Sunday"
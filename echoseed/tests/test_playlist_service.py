@@ -0,0 +1,151 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock
+from echoseed.api import playlist_index
+from echoseed.api.playlist_index import PlaylistIndex
+from echoseed.api.playlist_service import SpotifyPlaylistService
+
+@pytest.fixture(autouse=True)
+def fresh_indexes(monkeypatch):
+    monkeypatch.setattr(playlist_index, "_indexes", {})
+
+def paged(items, limit, offset):
+    page = items[offset:offset + limit]
+    return {"items": page, "next": "more" if offset + limit < len(items) else None, "total": len(items)}
+
+def make_service(playlists=(), tracks=()):
+    spotify = MagicMock()
+    spotify.me.return_value = {"id": "user"}
+    spotify.user_playlists.side_effect = lambda user, limit, offset: paged(list(playlists), limit, offset)
+    spotify.current_user_playlists.side_effect = lambda limit, offset: paged(list(playlists), limit, offset)
+    spotify.playlist_items.side_effect = lambda playlist_id, limit, offset, **kwargs: paged(list(tracks), limit, offset)
+    return SpotifyPlaylistService(spotify), spotify
+
+def make_tracks(n):
+    return [{"track": {"id": f"t{i}", "name": f"Song {i}", "uri": f"spotify:track:t{i}", "artists": [{"name": "A"}]}}
+            for i in range(n)] + [{"track": None}]
+
+def test_playlist_tracks_are_streamed_across_pages():
+    service, spotify = make_service(tracks=make_tracks(250))
+
+    tracks = service.get_playlist_tracks("p")
+
+    assert len(tracks) == 250
+    assert tracks[249].id == "t249"
+    assert spotify.playlist_items.call_count == 3
+
+def make_playlists(n):
+    return [{"id": f"p{i}", "name": f"List {i}", "owner": {"id": "user"}, "snapshot_id": "s1"} for i in range(n)]
+
+def test_iter_user_playlists_stops_paging_when_closed():
+    service, spotify = make_service(playlists=make_playlists(500))
+
+    first = next(p for p in service.iter_user_playlists("user") if p.name == "List 3")
+
+    assert first.id == "p3"
+    # The first page plus at most one prefetched page.
+    assert spotify.user_playlists.call_count <= 2
+
+def test_get_playlist_id_uses_index_past_first_page():
+    playlists = make_playlists(120)
+    playlists[110]["name"] = "Ｓlow Drift"
+    service, spotify = make_service(playlists=playlists)
+    spotify.playlist.return_value = {"name": "Ｓlow Drift", "snapshot_id": "s1"}
+
+    assert service.get_playlist_id("slow drift") == "p110"
+    assert service.get_playlist_id("SLOW  DRIFT") == "p110"
+    assert spotify.user_playlists.call_count == 3
+    assert service.get_playlist_id("missing") is None
+    assert spotify.user_playlists.call_count == 3
+
+def test_renamed_playlist_triggers_rebuild():
+    playlists = make_playlists(10)
+    service, spotify = make_service(playlists=playlists)
+    spotify.playlist.return_value = {"name": "List 2", "snapshot_id": "s1"}
+    assert service.get_playlist_id("List 2") == "p2"
+
+    playlists[2].update(name="Renamed", snapshot_id="s2")
+    spotify.playlist.return_value = {"name": "Renamed", "snapshot_id": "s2"}
+
+    assert service.get_playlist_id("List 2") is None
+    assert service.get_playlist_id("renamed") == "p2"
+    assert len(PlaylistIndex.for_user("user")) == 10
+
+def test_async_iterator_yields_tracks_and_closes_early():
+    service, spotify = make_service(tracks=make_tracks(1000))
+
+    async def first(n):
+        names = []
+        async for track in service.aiter_playlist_tracks("p"):
+            names.append(track.name)
+            if len(names) == n:
+                break
+        return names
+
+    assert asyncio.run(first(3)) == ["Song 0", "Song 1", "Song 2"]
+    assert spotify.playlist_items.call_count <= 2
+
+def track_item(track_id, name=None):
+    return {"track": {"id": track_id, "name": name or f"Song {track_id}", "artists": [{"name": "A"}]}}
+
+def make_library(spotify, playlists):
+    """Back playlist reads and writes with in-memory lists keyed by playlist id."""
+    spotify.user_playlists.side_effect = lambda user, limit, offset: paged(
+        [{"id": pid, "name": pid, "snapshot_id": "s"} for pid in playlists], limit, offset)
+    spotify.playlist.side_effect = lambda pid, fields: {"name": pid, "snapshot_id": "s"}
+    spotify.playlist_items.side_effect = lambda pid, limit, offset, **kwargs: paged(playlists[pid], limit, offset)
+
+    def remove(pid, items):
+        for position in sorted((p for item in items for p in item["positions"]), reverse=True):
+            del playlists[pid][position]
+    spotify.playlist_remove_specific_occurrences_of_items.side_effect = remove
+    spotify.playlist_add_items.side_effect = lambda pid, uris: playlists[pid].extend(
+        track_item(uri.rsplit(":", 1)[-1]) for uri in uris)
+
+def test_dedupe_removes_only_repeated_occurrences():
+    service, spotify = make_service()
+    items = [track_item(f"t{i % 9000}") for i in range(10000)] + [{"track": None}]
+    library = {"big": items}
+    make_library(spotify, library)
+
+    assert service.dedupe_playlist("big") == 1000
+    ids = [item["track"]["id"] for item in library["big"] if item["track"]]
+    assert ids == [f"t{i}" for i in range(9000)]
+    assert spotify.playlist_remove_specific_occurrences_of_items.call_count == 10
+    assert spotify.playlist_items.call_count == 101
+
+def test_dedupe_by_title_and_difference():
+    service, spotify = make_service()
+    library = {
+        "a": [track_item("x", "Intro"), track_item("y", "Intro (Remastered 2011)"), track_item("z")],
+        "b": [track_item("z")],
+    }
+    make_library(spotify, library)
+
+    assert list(service.playlist_difference("a", "b").ids) == ["x", "y"]
+    assert service.dedupe_playlist("a", by="title") == 1
+    assert [item["track"]["id"] for item in library["a"]] == ["x", "z"]
+
+def test_merge_adds_only_new_tracks_to_existing_target():
+    service, spotify = make_service()
+    library = {
+        "a": [track_item("1"), track_item("2")],
+        "b": [track_item("2"), track_item("3")],
+        "target": [track_item("3")],
+    }
+    make_library(spotify, library)
+
+    assert service.merge_playlists(["a", "b"], "target") == "target"
+    assert [item["track"]["id"] for item in library["target"]] == ["3", "1", "2"]
+    spotify.user_playlist_create.assert_not_called()
+
+def test_merge_by_title_skips_titles_already_in_target():
+    service, spotify = make_service()
+    library = {
+        "a": [track_item("1", "Intro (Remastered 2011)"), track_item("2")],
+        "target": [track_item("9", "Intro")],
+    }
+    make_library(spotify, library)
+
+    service.merge_playlists(["a"], "target", by="title")
+    assert [item["track"]["id"] for item in library["target"]] == ["9", "2"]
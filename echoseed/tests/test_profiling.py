@@ -0,0 +1,42 @@
+import threading
+import time
+from echoseed import profiling
+
+def test_spans_split_cpu_from_wait_and_nest(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "_active", None)
+
+    @profiling.profiled("inner")
+    def inner():
+        time.sleep(0.05)
+
+    @profiling.profiled("outer")
+    def outer():
+        deadline = time.thread_time() + 0.03
+        while time.thread_time() < deadline:
+            pass
+        inner()
+
+    profiler = profiling.enable(sample_interval=0.005)
+    outer()
+    stages = profiler.summary()
+    path = profiling.finish(tmp_path)
+
+    assert stages["inner"]["wait"] >= 0.04
+    assert stages["outer"]["cpu"] >= 0.03
+    assert stages["outer"]["self"] < stages["outer"]["wall"] - 0.04
+    assert path.exists() and path.with_suffix(".folded").exists()
+    assert profiling.active() is None
+
+def test_disabled_profiler_records_nothing(monkeypatch):
+    monkeypatch.setattr(profiling, "_active", None)
+    calls = []
+
+    @profiling.profiled()
+    def stage(value):
+        calls.append(threading.current_thread().name)
+        return value * 2
+
+    assert stage(21) == 42
+    with profiling.span("unused"):
+        pass
+    assert profiling.active() is None and len(calls) == 1
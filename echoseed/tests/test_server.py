@@ -0,0 +1,94 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+from echoseed.api.server import Coalescer, ServiceState, WorkerPool, create_app
+
+def make_app(workers=2, queue=2):
+    spotify = MagicMock()
+    spotify.me.return_value = {"id": "user"}
+    state = ServiceState(spotify, ai_client=MagicMock())
+    state.playlist_service = MagicMock()
+    pool = WorkerPool(workers, queue)
+    return create_app(state, pool, timeout=5), state, pool
+
+def blocking_randomize(state, release):
+    started = threading.Event()
+
+    def randomize(name, ordering=None):
+        started.set()
+        release.wait(5)
+        return 10
+    state.playlist_service.randomize_playlist.side_effect = randomize
+    return started
+
+def post(app, path, payload):
+    return app.test_client().post(path, json=payload)
+
+def test_identical_requests_share_one_job():
+    app, state, _ = make_app()
+    release = threading.Event()
+    started = blocking_randomize(state, release)
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        responses = [executor.submit(post, app, "/randomize", {"playlist": name}) for name in ("Mix", "mix", "MIX")]
+        started.wait(5)
+        time.sleep(0.1)
+        release.set()
+        results = [future.result() for future in responses]
+
+    assert [r.status_code for r in results] == [200, 200, 200]
+    assert {r.get_json()["result"]["tracks"] for r in results} == {10}
+    assert state.playlist_service.randomize_playlist.call_count == 1
+
+def test_full_queue_answers_503_with_retry_after():
+    app, state, pool = make_app(workers=1, queue=0)
+    release = threading.Event()
+    started = blocking_randomize(state, release)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        first = executor.submit(post, app, "/randomize", {"playlist": "A"})
+        started.wait(5)
+        busy = post(app, "/randomize", {"playlist": "B"})
+        release.set()
+        assert first.result().status_code == 200
+
+    assert busy.status_code == 503
+    assert busy.headers["Retry-After"] == "5"
+    assert pool.stats()["pending"] == 0
+
+def test_bad_requests_and_missing_playlists():
+    app, state, _ = make_app()
+    state.playlist_service.randomize_playlist.return_value = None
+
+    assert post(app, "/generate", {}).status_code == 400
+    assert post(app, "/generate", {"mood": "chill", "ordering": "sideways"}).status_code == 400
+    assert post(app, "/generate", {"mood": "chill", "source": "radio"}).status_code == 400
+    bad_query = post(app, "/generate", {"mood": "chill", "source": "query"})
+    assert bad_query.status_code == 400
+    assert "Cannot parse" in bad_query.get_json()["error"]
+    for payload in ({"mood": "chill", "limit": "lots"}, {"mood": "chill", "limit": 0},
+                    {"mood": "chill", "budget": "soon"}, {"mood": "chill", "budget": -1}, ["chill"]):
+        response = post(app, "/generate", payload)
+        assert response.status_code == 400
+        assert "error" in response.get_json()
+    assert post(app, "/randomize", {"playlist": "Nope"}).status_code == 404
+    assert app.test_client().get("/health").get_json()["pool"]["workers"] == 2
+
+def test_coalescer_runs_concurrent_calls_once():
+    coalescer = Coalescer()
+    release = threading.Event()
+    calls = []
+
+    def expensive():
+        calls.append(1)
+        release.wait(5)
+        return ["song"]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(coalescer.run, ("recommend", "chill"), expensive) for _ in range(4)]
+        time.sleep(0.1)
+        release.set()
+        assert [future.result() for future in futures] == [["song"]] * 4
+
+    assert calls == [1] and len(coalescer) == 0
@@ -0,0 +1,54 @@
+import json
+import numpy as np
+import pandas as pd
+from echoseed.ai.preprocessing.load_datasets import load_spotify_dataset, resolve_raw_inputs
+from echoseed.ai.preprocessing.normalize_features import normalize_audio_features
+from echoseed.ai.preprocessing.shards import ShardManifest, preprocess_shards
+
+def write_shard(path, n, seed, tempo=(60, 180)):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "track_id": [f"{path.stem}-{i}" for i in range(n)],
+        "name": "x",
+        "tempo": rng.uniform(*tempo, n),
+        "danceability": rng.uniform(0, 1, n),
+        "energy": rng.uniform(0, 1, n),
+        "valence": rng.uniform(0, 1, n),
+    })
+    df.loc[0, "energy"] = 0
+    df.loc[1, "valence"] = np.nan
+    df.to_csv(path, index=False)
+    return df
+
+def test_shards_match_single_file_normalization_and_rerun_only_new_shards(tmp_path):
+    raw_dir = tmp_path / "raw"
+    raw_dir.mkdir()
+    cache_dir = tmp_path / "cache"
+    write_shard(raw_dir / "2024-01-02.csv", 300, 1, tempo=(50, 150))
+    write_shard(raw_dir / "2024-01-01.csv", 200, 0)
+
+    df, scaler = preprocess_shards(str(raw_dir / "*.csv"), workers=2, cache_dir=cache_dir)
+    expected, expected_scaler = normalize_audio_features(load_spotify_dataset(str(raw_dir / "*.csv")), return_scaler=True)
+    assert df.equals(expected)
+    assert np.array_equal(scaler.data_min_, expected_scaler.data_min_)
+    assert np.array_equal(scaler.data_max_, expected_scaler.data_max_)
+    assert scaler.n_samples_seen_ == expected_scaler.n_samples_seen_ == 496
+
+    cached = {path.name: path.stat().st_mtime_ns for path in cache_dir.glob("*.npz")}
+    write_shard(raw_dir / "2024-01-03.csv", 100, 2, tempo=(40, 220))
+    df, scaler = preprocess_shards(raw_dir, cache_dir=cache_dir)
+
+    expected = normalize_audio_features(load_spotify_dataset(raw_dir))
+    assert df.equals(expected)
+    assert len(ShardManifest(cache_dir).entries) == 3
+    assert all((cache_dir / name).stat().st_mtime_ns == mtime for name, mtime in cached.items())
+    assert scaler.data_min_[0] >= 40 and scaler.data_max_[0] <= 220
+
+def test_manifest_lists_resolve_relative_to_the_manifest(tmp_path):
+    for name in ("a.csv", "b.csv", "c.csv"):
+        write_shard(tmp_path / name, 5, 0)
+    (tmp_path / "shards.json").write_text(json.dumps(["b.csv", "a.csv"]))
+    (tmp_path / "shards.txt").write_text("c.csv\n\n[ab].csv\n")
+
+    assert resolve_raw_inputs(tmp_path / "shards.json") == [tmp_path / "a.csv", tmp_path / "b.csv"]
+    assert resolve_raw_inputs(tmp_path / "shards.txt") == [tmp_path / name for name in ("a.csv", "b.csv", "c.csv")]
@@ -0,0 +1,42 @@
+import time
+import pytest
+from echoseed.ai.stages import StageDAG
+
+def sleeper(seconds, value):
+    def stage(**kwargs):
+        time.sleep(seconds)
+        return value
+    return stage
+
+def test_independent_stages_overlap_and_critical_path_is_recorded():
+    dag = StageDAG()
+    dag.add("name", sleeper(0.2, "Mix"))
+    dag.add("artists", sleeper(0.1, ["A"]))
+    dag.add("recommended", lambda artists: artists + ["B"], ["artists"])
+    dag.add("playlist", lambda name, recommended: (name, recommended), ["name", "recommended"])
+
+    started = time.perf_counter()
+    results = dag.run()
+
+    assert results["playlist"] == ("Mix", ["A", "B"])
+    assert time.perf_counter() - started < 0.28
+    assert dag.critical_path == ["name", "playlist"]
+    assert 0.2 <= dag.critical_path_seconds < 0.28
+
+def test_failure_skips_dependents_and_reraises():
+    ran = []
+    dag = StageDAG()
+    dag.add("artists", lambda: 1 / 0)
+    dag.add("name", lambda: ran.append("name") or "Mix")
+    dag.add("recommended", lambda artists: ran.append("recommended"), ["artists"])
+    dag.add("playlist", lambda name, recommended: ran.append("playlist"), ["name", "recommended"])
+
+    with pytest.raises(ZeroDivisionError):
+        dag.run()
+
+    assert ran == ["name"]
+    assert sorted(dag.skipped) == ["playlist", "recommended"]
+
+def test_unknown_dependency_is_rejected():
+    with pytest.raises(ValueError):
+        StageDAG().add("playlist", lambda name: name, ["name"])
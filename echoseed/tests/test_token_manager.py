@@ -42,7 +42,7 @@ def test_rotate_key():
                 secret = lines[i]
                 break
 
-        assert secret == f"SECRET_KEY={new_key.decode("utf-8")}"
+        assert secret == f"SECRET_KEY={new_key.decode('utf-8')}"
         assert tm.fernet.decrypt(rotated).decode() == token["access_token"]
 
 def test_fail_decrypt_with_wrong_key():
@@ -52,6 +52,27 @@ def test_fail_decrypt_with_wrong_key():
     tm2 = TokenManager(Fernet.generate_key())
     assert not tm2.load_token()
 
+def test_rotate_key_reencrypts_saved_token(tmp_path, monkeypatch):
+    monkeypatch.delenv("SECRET_KEY_PREVIOUS", raising=False)
+    paths = {"store_path": tmp_path / "tokens.db", "token_file_path": tmp_path / "tokens.json.enc",
+             "env_path": tmp_path / ".env"}
+    old_key = Fernet.generate_key()
+    manager = TokenManager(old_key, **paths)
+    manager.save_token({"access_token": "persisted"})
+    manager.save_account_token("alice", {"access_token": "a"})
+
+    manager.rotate_key(Fernet.generate_key())
+    manager.token_data = None
+    assert manager.get_token()["access_token"] == "persisted"
+
+    # A manager that never opened the account store rotates it as well.
+    newest_key = Fernet.generate_key()
+    TokenManager(manager.encryption_key, **paths).rotate_key(newest_key)
+    rotated = TokenManager(newest_key, **paths)
+    assert rotated.get_token()["access_token"] == "persisted"
+    assert rotated.get_account_token("alice") == {"access_token": "a"}
+    assert not TokenManager(old_key, **paths).get_token()
+
 """def test_refresh_token():
     old_token = {"access_token": "old_token"}
     tm.save_token(old_token)
@@ -64,4 +85,16 @@ def test_fail_decrypt_with_wrong_key():
     loaded = tm.load_token()
 
     assert loaded["access_token"] == "new_token"
-"""
\ No newline at end of file
+"""
+def test_rotate_key_from_new_manager_reencrypts_account_store(tmp_path, monkeypatch):
+    monkeypatch.delenv("SECRET_KEY_PREVIOUS", raising=False)
+    paths = {"store_path": tmp_path / "tokens.db", "token_file_path": tmp_path / "tokens.json.enc",
+             "env_path": tmp_path / ".env"}
+    old_key = Fernet.generate_key()
+    TokenManager(old_key, **paths).save_account_token("alice", {"access_token": "a"})
+
+    new_key = Fernet.generate_key()
+    TokenManager(old_key, **paths).rotate_key(new_key)
+
+    assert (tmp_path / ".env").read_text() == f"SECRET_KEY={new_key.decode()}"
+    assert TokenManager(new_key, **paths).get_account_token("alice") == {"access_token": "a"}
@@ -0,0 +1,73 @@
+import pytest
+from cryptography.fernet import Fernet
+from echoseed.security.key_rotation import KeyRotationJob
+from echoseed.security.token_store import TokenStore
+
+def test_put_and_get_round_trip(tmp_path):
+    store = TokenStore(Fernet.generate_key(), tmp_path / "tokens.db")
+    store.put_many({f"user{i}": {"access_token": f"tok{i}"} for i in range(50)})
+
+    assert len(store) == 50
+    assert store.get("user7") == {"access_token": "tok7"}
+    assert store.get("missing") is None
+
+def test_lru_is_bounded(tmp_path):
+    store = TokenStore(Fernet.generate_key(), tmp_path / "tokens.db", cache_size=3)
+    for i in range(10):
+        store.put(f"user{i}", {"access_token": str(i)})
+
+    assert len(store._cache) == 3
+    assert store.get("user0") == {"access_token": "0"}
+
+def test_other_connection_writes_invalidate_cache(tmp_path):
+    key = Fernet.generate_key()
+    first = TokenStore(key, tmp_path / "tokens.db")
+    second = TokenStore(key, tmp_path / "tokens.db")
+
+    first.put("alice", {"access_token": "old"})
+    assert second.get("alice") == {"access_token": "old"}
+
+    first.put("alice", {"access_token": "new"})
+    assert second.get("alice") == {"access_token": "new"}
+
+def test_rotate_reencrypts_all_rows(tmp_path):
+    old_key, new_key = Fernet.generate_key(), Fernet.generate_key()
+    store = TokenStore(old_key, tmp_path / "tokens.db")
+    store.put_many({"alice": {"access_token": "a"}, "bob": {"access_token": "b"}})
+
+    assert store.rotate(new_key) == 2
+
+    reopened = TokenStore(new_key, tmp_path / "tokens.db")
+    assert reopened.get("alice") == {"access_token": "a"}
+    assert reopened.get("bob") == {"access_token": "b"}
+
+def test_background_rotation_resumes_and_retires_old_key(tmp_path):
+    old_key, new_key = Fernet.generate_key(), Fernet.generate_key()
+    store = TokenStore(old_key, tmp_path / "tokens.db")
+    store.put_many({f"user{i:03d}": {"access_token": str(i)} for i in range(25)})
+
+    interrupted = KeyRotationJob(store, new_key, batch_size=10)
+    calls = []
+    original = interrupted._rotate_batch
+
+    def fail_after_first_batch(conn, multi_fernet, after):
+        if calls:
+            raise RuntimeError("crash")
+        calls.append(after)
+        return original(conn, multi_fernet, after)
+
+    interrupted._rotate_batch = fail_after_first_batch
+    interrupted.start()
+    with pytest.raises(RuntimeError, match="crash"):
+        interrupted.wait(timeout=5)
+    assert store.get("user020") == {"access_token": "20"}
+
+    completed = []
+    job = KeyRotationJob(store, new_key, batch_size=10, on_complete=lambda: completed.append(True))
+    job.start()
+    assert job.wait(timeout=5)
+
+    assert job.rotated == 15
+    assert completed == [True]
+    assert store.keys == [new_key]
+    assert TokenStore(new_key, tmp_path / "tokens.db").get("user000") == {"access_token": "0"}
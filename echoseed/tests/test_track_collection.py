@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from dataclasses import FrozenInstanceError
+from echoseed.model.track import Track
+from echoseed.model.track_collection import TrackCollection, normalize_text
+
+def make_collection():
+    return TrackCollection.from_rows([
+        ("a", "Song One", "Artist"),
+        ("b", "Song Two (2011 Remaster)", "Artist"),
+        ("a", "Song One", "Artist"),
+        ("c", "Song Two", "Artist"),
+        ("d", "Café feat. Someone", "Other"),
+    ])
+
+def test_rows_share_interned_vocabularies():
+    tracks = make_collection()
+
+    assert len(tracks) == 5
+    assert tracks[0] == Track(id="a", name="Song One", artist="Artist")
+    assert len(tracks.artists) == 2
+    assert tracks.artist_codes.dtype == np.int32
+    with pytest.raises(FrozenInstanceError):
+        tracks[0].name = "changed"
+
+def test_dedupe_by_id_and_by_title():
+    tracks = make_collection()
+
+    assert list(tracks.dedupe().ids) == ["a", "b", "c", "d"]
+    assert list(tracks.dedupe(by="title").ids) == ["a", "b", "d"]
+    assert normalize_text("Café feat. Someone") == "cafe"
+
+def test_set_operations_and_filtering():
+    tracks = make_collection()
+    other = TrackCollection.from_rows([("c", "Song Two", "Artist"), ("a", "Song One", "Artist"), ("z", "New", "X")])
+
+    assert list(tracks.difference(other).ids) == ["b", "d"]
+    assert list(tracks.intersection(other).ids) == ["a", "c"]
+    assert list(tracks.union(other).ids) == ["a", "b", "c", "d", "z"]
+    assert list(tracks.by_artist("Other").ids) == ["d"]
+    assert tracks[1:3].names is tracks.names
+
+def test_to_pandas_uses_codes_as_categories():
+    tracks = make_collection()
+    df = tracks.to_pandas()
+
+    assert list(df["id"]) == list(tracks.ids)
+    assert df["artist"].dtype == "category"
+    assert list(df["artist"].cat.codes) == list(tracks.artist_codes)
+    assert df["name"].iloc[4] == "Café feat. Someone"
+
+def test_concat_merges_vocabularies_without_rebuilding_rows():
+    tracks = make_collection()
+    other = TrackCollection.from_rows([("z", "New", "X"), ("e", "Song One", "Artist"), (None, "Local", "X")])
+
+    merged = TrackCollection.concat([tracks[3:], other, tracks[:2]])
+
+    assert list(merged.ids) == ["c", "d", "z", "e", None, "a", "b"]
+    assert [track.name for track in merged] == ["Song Two", "Café feat. Someone", "New", "Song One", "Local",
+                                                "Song One", "Song Two (2011 Remaster)"]
+    assert list(merged.to_pandas()["artist"]) == ["Artist", "Other", "X", "Artist", "X", "Artist", "Artist"]
+    assert list(merged.dedupe(by="title").ids) == ["c", "d", "z", "e", None]
+    assert merged.title_keys() is merged.title_keys()
+    assert list(merged.filter(merged.duplicate_mask(by="title")).title_keys()) == ["song one|artist", "song two|artist"]
@@ -1,23 +1,20 @@
-import json
-from pathlib import Path
 from spotipy import Spotify
 from ..api.auth import SpotifyAuthService
+from ..ai.artifacts import get_registry
 
-base_dir = Path(__file__).resolve().parents[2]
-clustered_tracks_file = base_dir / "echoseed" / "data" / "processed" / "clustered_tracks.csv"
-mood_labels_file = base_dir / "cluster_mood_map.json"
+clustered_tracks_file = get_registry().path("dataset")
+mood_labels_file = get_registry().path("mood_map")
 
 class PlaylistCLI:
     def __init__(self, sp_client: Spotify):
         self.spotify = sp_client
-        with open(clustered_tracks_file, "r") as f:
-            self.clustered_tracks = f.read()
-
-        with open(mood_labels_file, "r") as f:
-            self.mood_labels = json.load(f)
-
+        self.mood_labels = get_registry().read(mood_labels_file, "json")
         self.selected_mood_label = ""
 
+    @property
+    def clustered_tracks(self):
+        return get_registry().read(clustered_tracks_file, "csv")
+
     def display_menu(self):
         print("=== Echo Seed ===")
         print("...Cultivating Soundscapes...")
@@ -0,0 +1,260 @@
+import argparse
+import contextlib
+import json
+import logging
+import sys
+import time
+from echoseed import profiling
+
+logger = logging.getLogger("echoseed.commands")
+
+ORDERINGS = ("smooth", "ramp_up", "cool_down")
+
+
+def _spotify_client():
+    from echoseed.api.auth import SpotifyAuthService
+
+    auth_service = SpotifyAuthService()
+    auth_service.authenticate()
+    return auth_service.get_spotify_client()
+
+
+def run_generate(job, context):
+    from echoseed.ai.catalog_query import parse_query
+    from echoseed.ai.playlist_generator import PlaylistGenerator
+
+    if job["source"] == "query":
+        # Reject a malformed query before authenticating or creating anything.
+        parse_query(job["mood"])
+    options = {"hedge": job["hedge"]}
+    # Without --budget the generator keeps its default, ECHOSEED_LATENCY_BUDGET.
+    if job.get("budget") is not None:
+        options["latency_budget"] = job["budget"]
+    generator = PlaylistGenerator(context.spotify(), job["mood"], **options)
+    return generator.generate_playlist(job["limit"], source=job["source"], ordering=job["ordering"])
+
+def run_randomize(job, context):
+    from echoseed.api.playlist_service import SpotifyPlaylistService
+
+    if context.service is None:
+        context.service = SpotifyPlaylistService(context.spotify())
+    count = context.service.randomize_playlist(job["playlist"], ordering=job["ordering"])
+    if count is None:
+        raise LookupError(f"Playlist '{job['playlist']}' not found or empty")
+    return {"playlist": job["playlist"], "tracks": count}
+
+def run_tag(job, context):
+    from echoseed.ai.artifacts import get_registry
+    from echoseed.ai.tagging.mood_tagger import MoodTagger
+
+    MoodTagger().main(batch=job["batch_prompts"])
+    return {"version": get_registry().manifest()["version"]}
+
+def run_cluster(job, context):
+    from echoseed.ai.clustering import clustering_engine
+    from echoseed.ai.preprocessing.load_datasets import load_spotify_dataset
+
+    if job["assign"] is None:
+        clustering_engine.cluster_features(n_clusters=job["clusters"], audio_features=job["input"])
+        return {"clusters": job["clusters"]}
+    new_df, drift = clustering_engine.assign_new_tracks(load_spotify_dataset(job["assign"] or None))
+    return {"assigned": len(new_df), "drift": drift}
+
+def run_predict(job, context):
+    from echoseed.ai.clustering.batch_predict import batch_predict
+
+    return batch_predict(job["input"], job["output"], job["workers"], job["raw"])
+
+def run_benchmark(job, context):
+    import numpy as np
+    from echoseed.ai.ordering import order_tracks
+
+    if job["pipeline"]:
+        from echoseed.benchmarks import pipeline
+
+        report = pipeline.run(job["pipeline"], job["baseline"] or pipeline.BASELINE_FILE, job["threshold"],
+                              job["save_baseline"], max_k=job["max_k"], trace=job["trace"])
+        if report["regressions"]:
+            raise RuntimeError("regressions over baseline: " + "; ".join(
+                f"{r['size']} {r['stage']} {r['metric']} {r['baseline']} -> {r['current']}"
+                for r in report["regressions"]
+            ))
+        return report
+
+    features = np.random.default_rng(0).uniform(1, 10, size=(job["tracks"], 4))
+    timings = {}
+    for mode in ORDERINGS:
+        started = time.perf_counter()
+        order_tracks(features, mode, time_budget=job["time_budget"])
+        timings[mode] = round(time.perf_counter() - started, 4)
+    return {"tracks": job["tracks"], "ordering_seconds": timings}
+
+def run_graph(job, context):
+    from echoseed.ai.artist_graph import ArtistGraph
+    from echoseed.api.playlist_service import SpotifyPlaylistService
+
+    if context.service is None:
+        context.service = SpotifyPlaylistService(context.spotify())
+    graph = ArtistGraph() if job["rebuild"] else ArtistGraph.load_or_create()
+    updated = graph.sync(context.service)
+    graph.save()
+    return {"playlists": len(graph.playlists), "updated": updated, "artists": len(graph)}
+
+def run_serve(job, context):
+    from echoseed.api import server
+
+    server.serve(job["host"], job["port"], job["workers"] or server.MAX_WORKERS, job["queue"] or server.MAX_QUEUE)
+    return {"stopped": True}
+
+
+class _Context:
+    """State shared by every job in one invocation, so a batch authenticates once."""
+
+    def __init__(self):
+        self._spotify = None
+        self.service = None
+
+    def spotify(self):
+        if self._spotify is None:
+            self._spotify = _spotify_client()
+        return self._spotify
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="echoseed", description="Scriptable EchoSeed commands")
+    parser.add_argument("--profile", action="store_true",
+                        help="record per-stage wall/CPU time and write a report (also ECHOSEED_PROFILE=1)")
+    parser.add_argument("--profile-samples", type=float, default=0.0, metavar="SECONDS",
+                        help="with --profile, also sample stacks at this interval for a flame graph")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def with_batch(command):
+        command.add_argument("--batch", metavar="FILE",
+                             help="run one job per line of FILE ('-' for stdin); lines are JSON objects "
+                                  "overriding the arguments, or a bare mood/playlist name")
+        return command
+
+    generate = with_batch(commands.add_parser("generate", help="create a playlist for a mood"))
+    generate.add_argument("--mood")
+    generate.add_argument("--limit", type=int, default=25)
+    generate.add_argument("--source", choices=("llm", "pool", "query"), default="llm")
+    generate.add_argument("--ordering", choices=ORDERINGS)
+    generate.add_argument("--budget", type=float, metavar="SECONDS",
+                          help="stop waiting on the LLM after this long and fall back to local tracks and names")
+    generate.add_argument("--hedge", action="store_true", help="send a second LLM request when the first is slow")
+    generate.set_defaults(handler=run_generate, name_field="mood")
+
+    randomize = with_batch(commands.add_parser("randomize", help="shuffle or reorder an existing playlist"))
+    randomize.add_argument("--playlist")
+    randomize.add_argument("--ordering", choices=ORDERINGS)
+    randomize.set_defaults(handler=run_randomize, name_field="playlist")
+
+    tag = commands.add_parser("tag", help="label clusters with moods and rebuild track pools")
+    tag.add_argument("--no-batch-prompts", dest="batch_prompts", action="store_false",
+                     help="send one prompt per cluster")
+    tag.set_defaults(handler=run_tag)
+
+    cluster = commands.add_parser("cluster", help="fit the clustering model, or assign new tracks to it")
+    cluster.add_argument("--clusters", type=int, default=4)
+    cluster.add_argument("--assign", nargs="?", const="", metavar="RAW_CSV")
+    cluster.add_argument("--input", metavar="RAW",
+                         help="raw catalog to fit on: a CSV, a directory or glob of shard CSVs, or a shard list "
+                              "(.txt/.json); shards are preprocessed in parallel and cached between runs")
+    cluster.set_defaults(handler=run_cluster)
+
+    predict = commands.add_parser("predict", help="label a large catalog with the saved model across processes")
+    predict.add_argument("input", metavar="CSV", help="normalized features (raw ones with --raw)")
+    predict.add_argument("--output", help="merged labelled CSV (default: <name>_clustered.csv next to the catalog)")
+    predict.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    predict.add_argument("--raw", action="store_true", help="filter and scale raw audio features first")
+    predict.set_defaults(handler=run_predict)
+
+    benchmark = commands.add_parser("benchmark", help="time the ordering engine or the clustering pipeline offline")
+    benchmark.add_argument("--tracks", type=int, default=10000)
+    benchmark.add_argument("--time-budget", type=float, default=0.5)
+    benchmark.add_argument("--pipeline", nargs="+", metavar="SIZE",
+                           help="instead, run the offline clustering pipeline on synthetic catalogs of these sizes "
+                                "(10k, 1m, 10m or a row count) and compare against the stored baseline")
+    benchmark.add_argument("--baseline", metavar="FILE",
+                           help="baseline JSON (default: echoseed/benchmarks/baseline.json)")
+    benchmark.add_argument("--threshold", type=float, default=0.25, help="relative growth reported as a regression")
+    benchmark.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    benchmark.add_argument("--max-k", type=int, default=6, help="largest k tried by the elbow search")
+    benchmark.add_argument("--no-trace", dest="trace", action="store_false",
+                           help="skip the tracemalloc re-run of each stage")
+    benchmark.set_defaults(handler=run_benchmark)
+
+    graph = commands.add_parser("graph", help="update the artist co-occurrence graph from your playlists")
+    graph.add_argument("--rebuild", action="store_true", help="discard the saved graph and read every playlist")
+    graph.set_defaults(handler=run_graph)
+
+    serve = commands.add_parser("serve", help="run the HTTP service (blocks until interrupted)")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8080)
+    serve.add_argument("--workers", type=int)
+    serve.add_argument("--queue", type=int)
+    serve.set_defaults(handler=run_serve)
+
+    return parser
+
+
+def read_jobs(args) -> list:
+    """Expand --batch input into one argument dict per job; without --batch there is a single job."""
+    defaults = {key: value for key, value in vars(args).items()
+                if key not in ("command", "handler", "name_field", "batch", "profile", "profile_samples")}
+    source = getattr(args, "batch", None)
+    if not source:
+        return [defaults]
+
+    if source == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(source) as f:
+            lines = f.read().splitlines()
+
+    jobs = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        overrides = json.loads(line) if line.startswith("{") else {args.name_field: line}
+        jobs.append({**defaults, **overrides})
+    return jobs
+
+
+def main(argv=None, out=None) -> int:
+    """Run one subcommand and write a JSON line per job to out. Returns the process exit code."""
+    args = build_parser().parse_args(argv)
+    out = out or sys.stdout
+    if args.profile:
+        profiling.enable(args.profile_samples)
+    context = _Context()
+    failures = 0
+
+    for job in read_jobs(args):
+        name_field = getattr(args, "name_field", None)
+        record = {"command": args.command, "job": job}
+        started = time.perf_counter()
+        try:
+            if name_field and not job.get(name_field):
+                raise ValueError(f"--{name_field} is required")
+            # Library code prints progress; keep stdout for results only.
+            with contextlib.redirect_stdout(sys.stderr):
+                record["result"] = args.handler(job, context)
+            record["ok"] = True
+        except Exception as e:
+            logger.error("[Commands] %s failed: %s", args.command, e)
+            record["ok"] = False
+            record["error"] = str(e)
+            failures += 1
+        record["seconds"] = round(time.perf_counter() - started, 4)
+        out.write(json.dumps(record, default=str) + "\n")
+        out.flush()
+
+    if profiling.active():
+        print(f"Profile report: {profiling.finish()}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
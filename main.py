@@ -1,18 +1,20 @@
 import os
+import sys
 import logging
 from dotenv import load_dotenv
-from echoseed.api.auth import SpotifyAuthService
-from echoseed.security.token_manager import TokenManager
-from echoseed.security.network_monitor import NetworkMonitor
-from echoseed.ai.playlist_generator import PlaylistGenerator
-from echoseed.ui.cli import PlaylistCLI
 
 load_dotenv()
 logger = logging.getLogger("echoseed.main")
-secret_key = os.getenv("SECRET_KEY").encode()
 
-def main():
+def interactive():
+    from echoseed.api.auth import SpotifyAuthService
+    from echoseed.security.token_manager import TokenManager
+    from echoseed.security.network_monitor import NetworkMonitor
+    from echoseed.ai.playlist_generator import PlaylistGenerator
+    from echoseed.ui.cli import PlaylistCLI
+
     try:
+        secret_key = os.getenv("SECRET_KEY").encode()
         auth_service = SpotifyAuthService()
         auth_service.authenticate()
         spotify_client = auth_service.get_spotify_client()
@@ -36,5 +38,14 @@ def main():
         logger.error(f"Error generating playlist {e}")
         exit(1)
 
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        interactive()
+        return
+
+    from echoseed.ui.commands import main as run_command
+    sys.exit(run_command(argv))
+
 if __name__ == "__main__":
     main()